@@ -0,0 +1,204 @@
+# filename: account_cache.py
+"""
+In-process cache of account summaries: each account's row (with its current
+balance) and a ring buffer of its newest transactions, plus which accounts
+belong to which user. User.get_accounts() and BankAccount.get_transactions()
+read through it, so dashboards and balance checks on hot accounts do not touch
+the database.
+
+It is write-through: models.py reports every balance change and ledger row
+once its transaction has committed (DB.after_commit), and the cached balance and
+ring buffer are updated in place. Accounts are evicted least recently used
+first, and entries expire after ACCOUNT_CACHE_TTL seconds so changes made by
+other processes are eventually picked up.
+
+A load and a write to the same account may race. Every write takes a ticket
+from a counter before it runs, and every load notes the counter when it
+starts and is only stored if no write started while it ran. A committed write
+is applied to an entry loaded before the write started. If the entry was
+loaded after that, the load may or may not have seen the write, so the entry
+is dropped instead.
+
+Reads made inside a transaction bypass the cache (models.py checks
+DB.in_transaction()), as DB.query() bypasses the query cache: they must see the
+transaction's own writes, and a load that may yet be rolled back is never stored.
+
+Rows handed out are shared with the cache and must not be modified.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from itertools import islice
+
+from config import ACCOUNT_CACHE_SIZE, ACCOUNT_CACHE_RECENT, ACCOUNT_CACHE_TTL
+
+
+class _Entry:
+    # The row and the ring buffer are loaded separately, each noting the write counter
+    # when its load started.
+    __slots__ = ("row", "row_ticket", "recent", "recent_ticket", "loaded_at")
+
+    def __init__(self):
+        self.row = None  # Account row, once loaded
+        self.row_ticket = 0
+        self.recent = None  # Newest transactions first, once loaded
+        self.recent_ticket = 0
+        self.loaded_at = time.monotonic()
+
+
+class AccountSummaryCache:
+    """Thread-safe LRU of account rows and recent-transaction ring buffers."""
+
+    def __init__(self, size=ACCOUNT_CACHE_SIZE, recent_size=ACCOUNT_CACHE_RECENT, ttl=ACCOUNT_CACHE_TTL):
+        self.size = size
+        self.recent_size = recent_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # account id -> _Entry, least recently used first
+        self._users = {}  # user id -> account ids, oldest first
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def accounts_of(self, user_id, load):
+        """The account rows of ``user_id``, oldest first; ``load()`` fetches them on a miss."""
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None:
+                entries = [self._get(account_id) for account_id in cached]
+                if all(entry is not None and entry.row is not None for entry in entries):
+                    self.hits += 1
+                    return [entry.row for entry in entries]
+            self.misses += 1
+            ticket = self._writes
+        rows = load()
+        with self._lock:
+            if ticket == self._writes:
+                for row in rows:
+                    entry = self._entry(row["id"])
+                    entry.row, entry.row_ticket = row, ticket
+                self._users[user_id] = tuple(row["id"] for row in rows)
+                self._evict()
+        return rows
+
+    def recent_transactions(self, account_id, limit, load):
+        """Up to ``limit`` (at most recent_size) newest transactions of an account.
+
+        On a miss ``load(recent_size)`` fetches the newest recent_size rows, newest first.
+        """
+        with self._lock:
+            entry = self._get(account_id)
+            if entry is not None and entry.recent is not None:
+                self.hits += 1
+                return list(islice(entry.recent, limit))
+            self.misses += 1
+            ticket = self._writes
+        rows = load(self.recent_size)
+        with self._lock:
+            if ticket == self._writes:
+                entry = self._entry(account_id)
+                entry.recent, entry.recent_ticket = deque(rows, maxlen=self.recent_size), ticket
+                self._evict()
+        return rows[:limit]
+
+    # -----------------------------
+    # Write-through
+    # -----------------------------
+    def write_started(self):
+        """Takes a ticket for a write about to run; pass it to the matching update below."""
+        with self._lock:
+            self._writes += 1
+            return self._writes
+
+    def balance_changed(self, account_id, delta, ticket):
+        """A committed write changed an account's balance by ``delta``."""
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None or entry.row is None:
+                return
+            if entry.row_ticket >= ticket:
+                entry.row = None  # Loaded after the write started; it may already include it
+                return
+            entry.row = dict(entry.row, balance=round(float(entry.row["balance"]) + float(delta), 2))
+
+    def transaction_added(self, row, ticket):
+        """A committed write recorded ledger ``row`` (a dict of TRANSACTION_COLUMNS)."""
+        with self._lock:
+            entry = self._entries.get(row["account_id"])
+            if entry is None or entry.recent is None:
+                return
+            if entry.recent_ticket >= ticket:
+                entry.recent = None
+                return
+            # Commits of concurrent writers may be reported out of order; keep newest first.
+            key = (str(row["timestamp"]), row["id"])
+            position = next((i for i, other in enumerate(entry.recent)
+                             if (str(other["timestamp"]), other["id"]) < key), len(entry.recent))
+            if position == self.recent_size:
+                return  # Older than everything in a full buffer
+            if len(entry.recent) == self.recent_size:
+                entry.recent.pop()
+            entry.recent.insert(position, row)
+
+    def user_changed(self, user_id):
+        """Forgets a user's account list (and, if the user was deleted, their accounts)."""
+        with self._lock:
+            self._writes += 1
+            self._users.pop(user_id, None)
+            for account_id in [i for i, entry in self._entries.items()
+                               if entry.row is not None and entry.row["user_id"] == user_id]:
+                del self._entries[account_id]
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+            self._users.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"accounts": len(self._entries), "users": len(self._users), "hits": self.hits,
+                    "misses": self.misses}
+
+    # -----------------------------
+    # Internals (called with the lock held)
+    # -----------------------------
+    def _get(self, account_id):
+        entry = self._entries.get(account_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl:
+            del self._entries[account_id]
+            return None
+        self._entries.move_to_end(account_id)
+        return entry
+
+    def _entry(self, account_id):
+        entry = self._entries.get(account_id)
+        if entry is None:
+            entry = self._entries[account_id] = _Entry()
+        self._entries.move_to_end(account_id)
+        return entry
+
+    def _evict(self):
+        while len(self._entries) > self.size:
+            _, entry = self._entries.popitem(last=False)
+            if entry.row is not None:
+                self._users.pop(entry.row["user_id"], None)
+
+
+_CACHES = weakref.WeakKeyDictionary()
+_CACHES_LOCK = threading.Lock()
+
+
+def cache_for(db):
+    """The AccountSummaryCache of ``db`` (one per DB instance)."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(db)
+        if cache is None:
+            cache = _CACHES[db] = AccountSummaryCache()
+        return cache
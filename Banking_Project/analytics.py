@@ -0,0 +1,264 @@
+# filename: analytics.py
+"""
+In-process analytics over every account and transaction.
+
+AnalyticsEngine streams the columns the admin analytics need (account balances;
+transaction amounts, kinds and timestamps) into NumPy arrays once, and from then
+on refresh() only fetches transactions with an id above the last one loaded,
+plus the current balance of the accounts they touched. Percentiles, histograms,
+daily/monthly volumes and top-K are then vectorized array operations, with no
+SQL aggregation:
+
+    engine = AnalyticsEngine(db)
+    engine.refresh()
+    engine.balance_percentiles()        # {50: ..., 90: ..., 99: ...}
+    engine.volume("month")              # per-month counts, deposits, withdrawals
+    engine.top_users(5, by="volume")
+
+Transaction ids are assumed to be committed in order, which holds on SQLite. On
+MySQL a transaction committed after a later id was loaded is missed until the
+next reload(); balances are unaffected, since they are re-read.
+"""
+import threading
+from itertools import islice
+
+import numpy as np
+
+from config import ANALYTICS_BATCH_SIZE
+
+# Transaction kinds as stored in the kind column
+DEPOSIT, WITHDRAW, OTHER = 1, -1, 0
+
+ACCOUNTS_QUERY = "SELECT id, user_id, balance FROM accounts WHERE id > %s ORDER BY id"
+TRANSACTIONS_QUERY = """
+    SELECT id, account_id, amount,
+           CASE type WHEN 'DEPOSIT' THEN 1 WHEN 'WITHDRAW' THEN -1 ELSE 0 END AS kind, timestamp
+    FROM transactions
+    WHERE id > %s
+    ORDER BY id
+"""
+ACCOUNT_DTYPES = (np.int64, np.int64, np.float64)
+TRANSACTION_DTYPES = (np.int64, np.int64, np.float64, np.int8, "datetime64[s]")
+
+
+def _load_columns(rows, dtypes, chunk=ANALYTICS_BATCH_SIZE):
+    # Converts streamed row tuples to one array per column, a chunk at a time, so the rows
+    # never all exist as Python objects at once.
+    parts = [[] for _ in dtypes]
+    while True:
+        batch = list(islice(rows, chunk))
+        if not batch:
+            break
+        for part, values, dtype in zip(parts, zip(*batch), dtypes):
+            part.append(np.array(values, dtype=dtype))
+    return [np.concatenate(part) if part else np.empty(0, dtype) for part, dtype in zip(parts, dtypes)]
+
+
+class _Snapshot:
+    """One consistent set of column arrays. Never modified; refresh() builds a new one."""
+
+    def __init__(self, accounts, transactions):
+        self.account_ids, self.account_users, self.balances = accounts
+        self.txn_ids, self.txn_accounts, self.amounts, self.kinds, self.times = transactions
+
+    def txn_users(self):
+        # Owner of each transaction's account (-1 if the account has since been deleted)
+        if not len(self.account_ids):
+            return np.full(len(self.txn_accounts), -1, dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.account_ids, self.txn_accounts), len(self.account_ids) - 1)
+        return np.where(self.account_ids[index] == self.txn_accounts, self.account_users[index], -1)
+
+
+class AnalyticsEngine:
+    """Columnar copy of the accounts and transactions tables for the admin analytics.
+
+    Thread-safe: refresh() swaps in a new snapshot, and queries read whichever snapshot
+    was current when they started.
+    """
+
+    def __init__(self, db, batch_size=ANALYTICS_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self._data = None
+        self._lock = threading.Lock()  # One refresh at a time
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def reload(self):
+        """Loads everything from scratch."""
+        with self._lock:
+            self._data = _Snapshot(self._stream(ACCOUNTS_QUERY, 0, ACCOUNT_DTYPES),
+                                   self._stream(TRANSACTIONS_QUERY, 0, TRANSACTION_DTYPES))
+            return len(self._data.txn_ids)
+
+    def refresh(self):
+        """Brings the arrays up to date; returns how many new transactions were loaded."""
+        data = self._data
+        if data is None or self._accounts_deleted(data):
+            return self.reload()
+        with self._lock:
+            data = self._data
+            last_txn = int(data.txn_ids[-1]) if len(data.txn_ids) else 0
+            last_account = int(data.account_ids[-1]) if len(data.account_ids) else 0
+            new_txns = self._stream(TRANSACTIONS_QUERY, last_txn, TRANSACTION_DTYPES)
+            new_accounts = self._stream(ACCOUNTS_QUERY, last_account, ACCOUNT_DTYPES)
+
+            balances = data.balances
+            touched = np.unique(new_txns[1])
+            touched = touched[touched <= last_account]  # New accounts were loaded with their balance
+            if len(touched):
+                balances = balances.copy()
+                ids, values = self._current_balances(touched.tolist())
+                index = np.searchsorted(data.account_ids, ids)
+                balances[index] = values
+
+            self._data = _Snapshot(
+                [np.concatenate(pair) for pair in zip((data.account_ids, data.account_users, balances), new_accounts)],
+                [np.concatenate(pair) for pair in zip((data.txn_ids, data.txn_accounts, data.amounts, data.kinds,
+                                                       data.times), new_txns)])
+            return len(new_txns[0])
+
+    def _stream(self, sql, after, dtypes):
+        rows = self.db.iter_query(sql, (after,), batch_size=self.batch_size, as_tuples=True)
+        try:
+            return _load_columns(rows, dtypes, self.batch_size)
+        finally:
+            rows.close()
+
+    def _accounts_deleted(self, data):
+        # Accounts only disappear when their user is deleted, which also removes their
+        # transactions; fewer accounts up to the last loaded id means a full reload.
+        if not len(data.account_ids):
+            return False
+        count = self.db.query("SELECT COUNT(*) AS n FROM accounts WHERE id <= %s", (int(data.account_ids[-1]),))
+        return count[0]["n"] != len(data.account_ids)
+
+    def _current_balances(self, account_ids):
+        ids, values = [], []
+        chunk = min(self.db.backend.max_params, 1000)
+        for start in range(0, len(account_ids), chunk):
+            part = account_ids[start:start + chunk]
+            for row in self.db.query(f"SELECT id, balance FROM accounts WHERE id IN ({', '.join(['%s'] * len(part))})",
+                                     tuple(part)):
+                ids.append(row["id"])
+                values.append(float(row["balance"]))
+        return np.array(ids, dtype=np.int64), np.array(values, dtype=np.float64)
+
+    def _snapshot(self):
+        if self._data is None:
+            self.refresh()
+        return self._data
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def summary(self):
+        data = self._snapshot()
+        times = data.times[~np.isnat(data.times)]
+        return {
+            "accounts": len(data.account_ids),
+            "customers": len(np.unique(data.account_users)),
+            "total_balance": float(data.balances.sum()),
+            "transactions": len(data.txn_ids),
+            "deposits": float(data.amounts[data.kinds == DEPOSIT].sum()),
+            "withdrawals": float(data.amounts[data.kinds == WITHDRAW].sum()),
+            "first_transaction": times.min().item() if len(times) else None,
+            "last_transaction": times.max().item() if len(times) else None,
+        }
+
+    def balance_percentiles(self, percentiles=(50, 90, 99), per_user=False):
+        """Balance at each percentile, of accounts or (``per_user``) of customers' totals."""
+        balances = self._user_balances()[1] if per_user else self._snapshot().balances
+        return self._percentiles(balances, percentiles)
+
+    def amount_percentiles(self, percentiles=(50, 90, 99), kind=None):
+        """Transaction amount at each percentile, optionally only of one kind (DEPOSIT/WITHDRAW)."""
+        return self._percentiles(self._amounts(kind), percentiles)
+
+    def balance_histogram(self, bins=20, per_user=False):
+        """(counts, bin edges) of account or customer balances."""
+        balances = self._user_balances()[1] if per_user else self._snapshot().balances
+        return np.histogram(balances, bins=bins)
+
+    def amount_histogram(self, bins=20, kind=None):
+        """(counts, bin edges) of transaction amounts."""
+        return np.histogram(self._amounts(kind), bins=bins)
+
+    def volume(self, period="day", start=None, end=None):
+        """Transactions per day or month that had any, oldest first.
+
+        Returns a dict of equal-length arrays: "period" (datetime64), "count", "deposits" and
+        "withdrawals". ``start`` (inclusive) and ``end`` (exclusive) are dates or datetimes.
+        """
+        unit = {"day": "D", "month": "M"}[period]
+        data = self._snapshot()
+        periods = data.times.astype(f"datetime64[{unit}]")
+        keep = ~np.isnat(periods)
+        if start is not None:
+            keep &= data.times >= np.datetime64(start, "s")
+        if end is not None:
+            keep &= data.times < np.datetime64(end, "s")
+        # Periods are consecutive integers, so bincount groups them in one pass without sorting
+        slots = periods[keep].astype(np.int64)
+        if not len(slots):
+            empty = np.empty(0)
+            return {"period": np.empty(0, f"datetime64[{unit}]"), "count": empty.astype(np.int64),
+                    "deposits": empty, "withdrawals": empty}
+        first = slots.min()
+        slots -= first
+        amounts, kinds = data.amounts[keep], data.kinds[keep]
+        count = np.bincount(slots)
+        deposits = np.bincount(slots, weights=np.where(kinds == DEPOSIT, amounts, 0.0))
+        withdrawals = np.bincount(slots, weights=np.where(kinds == WITHDRAW, amounts, 0.0))
+        active = np.flatnonzero(count)
+        return {"period": (active + first).astype(f"datetime64[{unit}]"), "count": count[active],
+                "deposits": deposits[active], "withdrawals": withdrawals[active]}
+
+    def top_users(self, k=5, by="balance"):
+        """The ``k`` customers with the highest total "balance", transaction "count" or "volume".
+
+        Returns dicts with user_id, fullname and the value, highest first.
+        """
+        data = self._snapshot()
+        if by == "balance":
+            users, values = self._user_balances()
+        else:
+            owners = data.txn_users()
+            known = owners >= 0
+            weights = data.amounts[known] if by == "volume" else None
+            totals = np.bincount(owners[known], weights=weights)
+            users = np.flatnonzero(totals)
+            values = totals[users]
+        if not len(users):
+            return []
+        top = np.argpartition(-values, min(k, len(values)) - 1)[:k]
+        top = top[np.argsort(-values[top], kind="stable")]
+        names = self._names(users[top].tolist())
+        return [{"user_id": int(user), "fullname": names.get(int(user)), by: value.item()}
+                for user, value in zip(users[top], values[top])]
+
+    def _user_balances(self):
+        data = self._snapshot()
+        totals = np.bincount(data.account_users, weights=data.balances)
+        users = np.unique(data.account_users)
+        return users, totals[users]
+
+    def _amounts(self, kind):
+        data = self._snapshot()
+        return data.amounts if kind is None else data.amounts[data.kinds == kind]
+
+    @staticmethod
+    def _percentiles(values, percentiles):
+        if not len(values):
+            return {p: None for p in percentiles}
+        return dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+
+    def _names(self, user_ids):
+        rows = self.db.query(f"SELECT id, fullname FROM users WHERE id IN ({', '.join(['%s'] * len(user_ids))})",
+                             tuple(user_ids))
+        return {row["id"]: row["fullname"] for row in rows}
@@ -0,0 +1,251 @@
+# filename: backends.py
+"""
+Database backends used by DB.
+
+The application writes its SQL once, in MySQL dialect with %s placeholders.
+Each backend knows how to open connections for its engine and how to adapt
+that SQL (placeholders, DDL keywords, locking clauses) before it is executed.
+"""
+import re
+import sqlite3
+from functools import lru_cache
+
+try:
+    import mysql.connector
+    from mysql.connector import errorcode
+except ImportError:  # MySQL support is optional when running on SQLite
+    mysql = None
+
+
+class Backend:
+    """Base class describing what DB needs from a database engine."""
+
+    name = None
+    Error = Exception
+    IntegrityError = Exception
+    max_connections = None  # Upper bound on the pool size, if the engine needs one
+    max_params = 999  # Most placeholders a single statement may carry
+    for_update = ""  # Suffix making a SELECT lock the rows it reads; empty if writers lock more coarsely
+    consecutive_ids = True  # Whether a multi-row INSERT is always given one consecutive block of ids
+
+    def connect(self):
+        raise NotImplementedError
+
+    def is_alive(self, conn):
+        return True
+
+    def translate(self, sql):
+        """Adapts an application SQL statement to this backend's dialect."""
+        return sql
+
+    def begin(self, conn):
+        raise NotImplementedError
+
+    def inserted_ids(self, cursor, count):
+        """Ids generated by the multi-row INSERT just run on ``cursor``.
+
+        Only valid while ``consecutive_ids`` holds (or for a single-row INSERT).
+        """
+        raise NotImplementedError
+
+    def describe_error(self, err):
+        return str(err)
+
+    # Streaming reads
+    def stream_cursor(self, conn):
+        """A cursor that fetches rows from the server as they are read instead of all at once."""
+        return conn.cursor()
+
+    def close_stream(self, conn, cursor):
+        """Closes a stream_cursor(), even if its rows were not all read."""
+        cursor.close()
+
+    # Upserts
+    def add_on_conflict(self, key, columns):
+        """Clause appended to an INSERT so that, when a row with the same ``key`` already
+        exists, the inserted values of ``columns`` are added to it instead."""
+        raise NotImplementedError
+
+    # Query plans
+    explain_prefix = "EXPLAIN "
+
+    def plan_findings(self, plan):
+        """Lists the problems (full scans, sorts) in rows returned by ``explain_prefix + sql``."""
+        return []
+
+
+class MySQLBackend(Backend):
+    name = "mysql"
+    max_params = 65535
+    for_update = " FOR UPDATE"
+
+    def __init__(self, config, database):
+        if mysql is None:
+            raise ImportError("mysql-connector-python is required for the MySQL backend")
+        self.config = config
+        self.database = database
+        self.Error = mysql.connector.Error
+        self.IntegrityError = mysql.connector.IntegrityError
+        self.consecutive_ids = None  # Known once the first connection has read the server's setting
+
+    def connect(self):
+        # Pooled connections run in autocommit mode so a connection that has only served
+        # reads never holds an old REPEATABLE READ snapshot when it is handed out again.
+        try:
+            conn = mysql.connector.connect(database=self.database, autocommit=True, **self.config)
+        except mysql.connector.Error as err:
+            if err.errno != errorcode.ER_BAD_DB_ERROR:
+                raise
+            # First run against this server: create the database, then connect to it.
+            self._create_database()
+            conn = mysql.connector.connect(database=self.database, autocommit=True, **self.config)
+        if self.consecutive_ids is None:
+            self.consecutive_ids = self._autoinc_lock_mode(conn) in (0, 1)
+        return conn
+
+    @staticmethod
+    def _autoinc_lock_mode(conn):
+        # 0 (traditional) and 1 (consecutive) give a multi-row INSERT one block of ids. 2 (interleaved,
+        # the MySQL 8 default) lets concurrent inserts interleave theirs.
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT @@innodb_autoinc_lock_mode")
+            return int(cursor.fetchone()[0])
+        except mysql.connector.Error:
+            return None
+        finally:
+            cursor.close()
+
+    def _create_database(self):
+        conn = mysql.connector.connect(**self.config)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database} DEFAULT CHARACTER SET 'utf8'")
+        cursor.close()
+        conn.close()
+
+    def is_alive(self, conn):
+        return conn.is_connected()
+
+    def begin(self, conn):
+        conn.start_transaction()
+
+    def inserted_ids(self, cursor, count):
+        # lastrowid is the first id of the statement. With innodb_autoinc_lock_mode 0 or 1 InnoDB
+        # allocates one consecutive block for a multi-row INSERT; see consecutive_ids.
+        return range(cursor.lastrowid, cursor.lastrowid + count)
+
+    def describe_error(self, err):
+        if getattr(err, "errno", None) == errorcode.ER_ACCESS_DENIED_ERROR:
+            return "Access Denied: Please check your username or password in config.py"
+        return str(err)
+
+    def stream_cursor(self, conn):
+        return conn.cursor(buffered=False)
+
+    def add_on_conflict(self, key, columns):
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = {c} + VALUES({c})" for c in columns)
+
+    def close_stream(self, conn, cursor):
+        # An unbuffered result must be drained before the connection can run anything else.
+        if conn.unread_result:
+            conn.consume_results()
+        cursor.close()
+
+    def plan_findings(self, plan):
+        findings = []
+        for row in plan:
+            if row.get("type") == "ALL":
+                findings.append(f"full table scan of {row['table']}")
+            elif row.get("type") == "index":
+                findings.append(f"full index scan of {row['table']} ({row['key']})")
+            if "filesort" in (row.get("Extra") or ""):
+                findings.append(f"filesort on {row['table']}")
+        return findings
+
+
+class SQLiteBackend(Backend):
+    """Embedded SQLite backend running in WAL mode, so readers never block the writer."""
+
+    name = "sqlite"
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+    max_params = 32766  # SQLITE_MAX_VARIABLE_NUMBER since SQLite 3.32
+
+    def __init__(self, path):
+        self.path = path
+        self._uri = False
+        if path == ":memory:":
+            # Pooled connections must all see the same in-memory database. Shared-cache
+            # connections take table locks that ignore the busy timeout, so use only one.
+            self.path = "file:banking_app_memdb?mode=memory&cache=shared"
+            self._uri = True
+            self.max_connections = 1
+
+    def connect(self):
+        # isolation_level=None puts the sqlite3 module in autocommit mode, matching the
+        # MySQL backend; explicit transactions are started with begin().
+        conn = sqlite3.connect(self.path, uri=self._uri, check_same_thread=False,
+                               isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def translate(self, sql):
+        return _translate_for_sqlite(sql)
+
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+    def plan_findings(self, plan):
+        findings = []
+        for row in plan:
+            detail = row["detail"]
+            if detail.startswith("SCAN "):
+                table = detail.split()[1]
+                if "USING" in detail and "INDEX" in detail:
+                    findings.append(f"full index scan of {table} ({detail.split()[-1]})")
+                else:
+                    findings.append(f"full table scan of {table}")
+            elif detail.startswith("USE TEMP B-TREE"):
+                findings.append(detail.lower())
+        return findings
+
+    def begin(self, conn):
+        # Take the write lock up front so two writers cannot deadlock upgrading read locks.
+        conn.execute("BEGIN IMMEDIATE")
+
+    def add_on_conflict(self, key, columns):
+        return f"ON CONFLICT ({key}) DO UPDATE SET " + ", ".join(f"{c} = {c} + excluded.{c}" for c in columns)
+
+    def inserted_ids(self, cursor, count):
+        # Inside a BEGIN IMMEDIATE transaction no other writer can interleave, so the rows
+        # got consecutive rowids ending at lastrowid.
+        return range(cursor.lastrowid - count + 1, cursor.lastrowid + 1)
+
+
+_SQLITE_REWRITES = [
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),
+]
+# Splits a statement into quoted literals (kept as-is) and the code around them.
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+@lru_cache(maxsize=512)
+def _translate_for_sqlite(sql):
+    parts = _QUOTED.split(sql)
+    for i in range(0, len(parts), 2):  # even indexes are outside quotes
+        part = parts[i].replace("%s", "?")
+        for pattern, replacement in _SQLITE_REWRITES:
+            part = pattern.sub(replacement, part)
+        parts[i] = part
+    return "".join(parts)
+
+
+def create_backend(name, config, database, sqlite_path):
+    """Builds the backend selected by ``DB_BACKEND`` in config.py."""
+    if name == "mysql":
+        return MySQLBackend(config, database)
+    if name == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    raise ValueError(f"Unknown database backend: {name!r}")
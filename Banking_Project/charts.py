@@ -0,0 +1,72 @@
+# filename: charts.py
+"""
+Bar charts rendered off the Tk thread.
+
+A BarChart owns one matplotlib Figure, drawn by the Agg (pure raster) backend
+rather than pyplot, so nothing is added to pyplot's global figure registry and
+nothing touches Tk. update() changes the bar heights and labels in place; the
+bars are only rebuilt when their number changes. render() draws the figure at a
+pixel size and returns a PIL image, which the GUI pastes into a PhotoImage on
+the Tk thread:
+
+    chart = BarChart("Top 5 Customers by Balance", "Balance (₹)")
+    chart.update(names, balances)       # worker thread
+    image = chart.render(600, 400)      # worker thread
+    photo.paste(image)                  # Tk thread
+"""
+import threading
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+DPI = 100
+
+
+class BarChart:
+    """One reusable figure showing one or more bar series over the same labels.
+
+    Every series is drawn from zero, so a series of negative values (e.g. withdrawals)
+    hangs below the axis. Methods may be called from any thread, one at a time per chart.
+    """
+
+    def __init__(self, title, ylabel="", series=(("", "#3b8ed0"),), rotate_labels=True):
+        self.series = series  # (legend label, colour) per series
+        self.rotate_labels = rotate_labels
+        self.figure = Figure(dpi=DPI, layout="tight")
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title(title)
+        self.ax.set_ylabel(ylabel)
+        self._bars = []  # One BarContainer per series
+        self._lock = threading.Lock()
+
+    def update(self, labels, *values):
+        """Shows ``values`` (one sequence per series) against ``labels``."""
+        with self._lock:
+            if not self._bars or len(self._bars[0]) != len(labels):
+                self._rebuild(len(labels))
+            for container, heights in zip(self._bars, values):
+                for bar, height in zip(container, heights):
+                    bar.set_height(float(height))
+            self.ax.set_xticks(range(len(labels)), [str(label) for label in labels],
+                               rotation=30 if self.rotate_labels else 0, ha="right" if self.rotate_labels else "center")
+            self.ax.relim()
+            self.ax.autoscale_view()
+
+    def _rebuild(self, count):
+        for container in self._bars:
+            container.remove()
+        self._bars = [self.ax.bar(range(count), [0] * count, color=colour, label=label or None)
+                      for label, colour in self.series]
+        if any(label for label, _ in self.series):
+            self.ax.legend(loc="upper left")
+
+    def render(self, width, height):
+        """Draws the chart at ``width`` x ``height`` pixels; returns an RGBA PIL image."""
+        with self._lock:
+            self.figure.set_size_inches(max(width, 100) / DPI, max(height, 100) / DPI)
+            self.canvas.draw()
+            # The canvas reuses its buffer on the next draw, so the image gets its own copy
+            return Image.frombuffer("RGBA", self.canvas.get_width_height(), self.canvas.buffer_rgba(),
+                                    "raw", "RGBA", 0, 1).copy()
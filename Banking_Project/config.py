@@ -13,4 +13,97 @@ DB_CONFIG = {
 }
 
 # The name of the database that the application will use.
-DB_NAME = 'banking_app_db'
\ No newline at end of file
+DB_NAME = 'banking_app_db'
+
+# Which database engine to use: 'mysql' (uses DB_CONFIG / DB_NAME above) or 'sqlite'
+# (an embedded database file, no server required - handy for local runs and CI).
+DB_BACKEND = 'mysql'
+
+# Database file used by the 'sqlite' backend. ':memory:' keeps everything in RAM.
+SQLITE_PATH = 'banking_app.db'
+
+# Connection pool settings.
+# DB_POOL_SIZE          - maximum number of open connections shared by the whole app.
+# DB_POOL_TIMEOUT       - seconds a caller waits for a free connection before giving up.
+# DB_POOL_PING_INTERVAL - seconds a connection may sit idle before it is health-checked
+#                         on checkout (0 checks on every checkout).
+DB_POOL_SIZE = 5
+DB_POOL_TIMEOUT = 10
+DB_POOL_PING_INTERVAL = 30
+
+# Read-through cache for DB.query(..., cache=True), used by the admin dashboard.
+# QUERY_CACHE_TTL      - seconds a cached result may be served before it is re-read.
+# QUERY_CACHE_SIZE     - maximum number of cached results (least recently used are evicted).
+# QUERY_CACHE_MAX_ROWS - results with more rows than this are not cached.
+# Entries are also dropped as soon as a write through DB touches a table they read.
+QUERY_CACHE_TTL = 60
+QUERY_CACHE_SIZE = 128
+QUERY_CACHE_MAX_ROWS = 50000
+
+# SQL instrumentation (instrumentation.py), available as db.stats.
+# QUERY_STATS_ENABLED  - time every statement and keep per-statement histograms.
+# SLOW_QUERY_MS        - statements at least this slow go to the slow-query log with their EXPLAIN plan.
+# SLOW_QUERY_LOG_SIZE  - number of most recent slow queries kept.
+# QUERY_STATS_EXPORT   - if set, main.py writes the statistics here on exit (.json, or .txt for a report).
+QUERY_STATS_ENABLED = True
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG_SIZE = 100
+QUERY_STATS_EXPORT = ''
+
+# Background work for the GUI (tasks.py): database calls run on this many worker
+# threads, and the Tk main thread checks for finished work every TASK_POLL_MS ms.
+TASK_WORKERS = 4
+TASK_POLL_MS = 30
+
+# Startup. Screens are built the first time they are shown; with PREWARM_FRAMES the
+# rest are then built one at a time in idle moments, PREWARM_INTERVAL_MS apart.
+# STARTUP_REPORT prints how long each startup step took once the first screen is drawn;
+# a diagnostic, so off by default (like python main.py --import-profile).
+PREWARM_FRAMES = True
+PREWARM_INTERVAL_MS = 250
+STARTUP_REPORT = False
+
+# Welcome-screen slideshow: resized images are cached per SLIDE_WIDTH_BUCKET pixels of
+# width (at most SLIDE_CACHE_SIZE of them), and window resizes are applied once they have
+# paused for SLIDE_RESIZE_DEBOUNCE_MS.
+SLIDE_CACHE_SIZE = 12
+SLIDE_WIDTH_BUCKET = 50
+SLIDE_RESIZE_DEBOUNCE_MS = 150
+
+# Transaction tables page through the database as the user scrolls: TXN_PAGE_SIZE rows per
+# query, at most TXN_WINDOW_ROWS kept in the table, inserted TXN_INSERT_CHUNK per idle slot.
+TXN_PAGE_SIZE = 200
+TXN_WINDOW_ROWS = 1000
+TXN_INSERT_CHUNK = 50
+
+# Admin customer/account tables: rows per page, and how long typing in the search box
+# must pause before the query runs.
+ADMIN_PAGE_SIZE = 50
+ADMIN_SEARCH_DEBOUNCE_MS = 300
+
+# Admin analytics (analytics.py) stream accounts and transactions into NumPy arrays
+# ANALYTICS_BATCH_SIZE rows at a time.
+ANALYTICS_BATCH_SIZE = 50000
+
+# Account summary cache (account_cache.py): balances of up to ACCOUNT_CACHE_SIZE accounts and
+# their ACCOUNT_CACHE_RECENT newest transactions, kept current by this process's own writes and
+# re-read after ACCOUNT_CACHE_TTL seconds to pick up changes made by other processes.
+ACCOUNT_CACHE_SIZE = 1024
+ACCOUNT_CACHE_RECENT = 100
+ACCOUNT_CACHE_TTL = 60
+
+# Analytics summaries (summaries.py): each day's volume is split over DAILY_VOLUME_SHARDS rows
+# (by account id) so concurrent payments do not all lock the same row. Readers add the shards up,
+# so the number can be changed at any time.
+DAILY_VOLUME_SHARDS = 16
+
+# Group commit (payment_queue.py): with PAYMENT_QUEUE_ENABLED, deposits, withdrawals and transfers
+# not already inside a transaction are committed in batches by PAYMENT_WORKERS threads. A batch
+# holds up to PAYMENT_BATCH_SIZE operations and waits at most PAYMENT_BATCH_DELAY_MS for them.
+# Each worker holds a pooled connection while it commits, so keep it below DB_POOL_SIZE.
+# Opt-in: it pays off where every commit waits for a durable log flush (MySQL/InnoDB). On SQLite
+# in WAL mode commits are cheap and the hand-off to a worker roughly halves throughput.
+PAYMENT_QUEUE_ENABLED = False
+PAYMENT_BATCH_SIZE = 64
+PAYMENT_BATCH_DELAY_MS = 2
+PAYMENT_WORKERS = 2
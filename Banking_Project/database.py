@@ -1,342 +1,673 @@
 # filename: database.py
-import mysql.connector
-from mysql.connector import errorcode
-import hashlib
-import random
-import string
-from datetime import datetime
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
 
-from config import DB_CONFIG, DB_NAME
+from backends import create_backend
+from config import (DB_CONFIG, DB_NAME, DB_BACKEND, SQLITE_PATH,
+                    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL,
+                    QUERY_CACHE_TTL, QUERY_CACHE_SIZE, QUERY_CACHE_MAX_ROWS, QUERY_STATS_ENABLED)
+from instrumentation import QueryStats
+from migrations import DEPENDENT_TABLES, migrate
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of database connections.
+
+    Connections are created lazily by ``factory`` up to ``size``. Callers that find the
+    pool exhausted wait up to ``timeout`` seconds for a connection to be returned.
+    A connection that has been idle for longer than ``ping_interval`` seconds is checked
+    with ``validate`` before it is handed out, and replaced if it has gone stale.
+    """
+
+    def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 validate=None, ping_interval=DB_POOL_PING_INTERVAL):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._factory = factory
+        self._validate = validate
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = deque()  # (connection, time it was returned), most recently used on the right
+        self._created = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # Statistics
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._checkout_time = 0.0
+        self._max_checkout_time = 0.0
+
+    def acquire(self, timeout=None):
+        """Borrows a connection, waiting for one to be returned if the pool is exhausted."""
+        start = time.perf_counter()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    # Reserve a slot now, open the connection outside the lock.
+                    self._created += 1
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(f"No database connection became free within {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+            if waited:
+                self._waits += 1
+
+        try:
+            if conn is None:
+                conn = self._factory()
+            elif self._is_stale(conn, returned_at):
+                self._close(conn)
+                conn = self._factory()
+                with self._cond:
+                    self._replaced += 1
+        except BaseException:
+            with self._cond:
+                self._created -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_time += elapsed
+            self._max_checkout_time = max(self._max_checkout_time, elapsed)
+        return conn
+
+    def release(self, conn, discard=False):
+        """Returns a borrowed connection. Pass ``discard=True`` to close it instead of reusing it."""
+        if discard:
+            self._close(conn)
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._created -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Closes every idle connection. Borrowed connections are closed when they are released."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._created -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters."""
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "replaced": self._replaced,
+                "avg_checkout_ms": (self._checkout_time / self._checkouts * 1000) if self._checkouts else 0.0,
+                "max_checkout_ms": self._max_checkout_time * 1000,
+            }
+
+    def _is_stale(self, conn, returned_at):
+        if self._validate is None or time.monotonic() - returned_at < self.ping_interval:
+            return False
+        try:
+            return not self._validate(conn)
+        except Exception:
+            return True
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.I)
+_WRITE_TABLE = re.compile(r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+(\w+)", re.I)
+_DDL = re.compile(r"^\s*(?:CREATE|ALTER|DROP|TRUNCATE|RENAME)\b", re.I)
+
+
+@lru_cache(maxsize=512)
+def _tables_read(sql):
+    return frozenset(name.lower() for name in _READ_TABLES.findall(sql))
+
+
+@lru_cache(maxsize=512)
+def _tables_written(sql):
+    """Tables a statement changes, including cascades; None for DDL, which may change anything."""
+    if _DDL.match(sql):
+        return None
+    match = _WRITE_TABLE.match(sql)
+    if match is None:
+        return frozenset()
+    table = match.group(1).lower()
+    return frozenset((table,) + DEPENDENT_TABLES.get(table, ()))
+
+
+class QueryCache:
+    """A thread-safe LRU cache of query results with a TTL and per-table invalidation.
+
+    Each entry remembers the tables its query reads. invalidate() drops every entry that
+    reads one of the given tables and bumps those tables' versions, so a result read
+    before a write but stored after it is never cached.
+    """
+
+    def __init__(self, ttl=QUERY_CACHE_TTL, size=QUERY_CACHE_SIZE, max_rows=QUERY_CACHE_MAX_ROWS):
+        self.ttl = ttl
+        self.size = size
+        self.max_rows = max_rows
+        self._entries = OrderedDict()  # key -> (expires at, tables, rows), most recently used last
+        self._versions = {}  # table -> number of invalidations
+        self._lock = threading.Lock()
+
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        """Returns the cached rows for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def versions(self, tables):
+        """Snapshot to pass to put(); taken before the query runs."""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def put(self, key, tables, rows, versions):
+        if len(rows) > self.max_rows or self.size <= 0:
+            return
+        with self._lock:
+            if versions != tuple(self._versions.get(table, 0) for table in tables):
+                return  # A write to one of the tables landed while the query ran
+            self._entries[key] = (time.monotonic() + self.ttl, tables, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, (_, read, _) in self._entries.items() if not read.isdisjoint(tables)]
+            for key in stale:
+                del self._entries[key]
+            self._invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._versions = {table: version + 1 for table, version in self._versions.items()}
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+class _Transaction:
+    """Per-thread state of an open unit of work: the connection it is bound to and its savepoint depth."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+        self.written = set()  # Tables whose cached results must be dropped again once it ends
+        self.on_commit = []  # (fn, args) registered with DB.after_commit()
+        self.before_commit = []  # (fn, item) registered with DB.before_commit()
 
 
 class DB:
-    def __init__(self, config=DB_CONFIG):
+    def __init__(self, config=DB_CONFIG, backend=DB_BACKEND, autocommit=True):
         self.config = config
-        self.conn = None
+        self.backend = create_backend(backend, config, DB_NAME, SQLITE_PATH)
+        self.pool = None
+        self.cache = QueryCache()
+        # Per-statement timings and the slow-query log; see instrumentation.py.
+        self.stats = QueryStats(explain=self._explain_unmeasured, enabled=QUERY_STATS_ENABLED)
+        self.autocommit = True
+        self._local = threading.local()
         self._connect()
-        self.create_tables()
-        self._seed_admin()  # Add default admin user if one doesn't exist
-        self._seed_customers()  # Add default customer users if they don't exist
+        # Brings the schema up to date; a single version check when it already is.
+        migrate(self)
+        # With autocommit off, writes (transaction() blocks included) accumulate on a
+        # thread-bound connection until commit() or rollback() is called.
+        self.autocommit = autocommit
+
+    @property
+    def IntegrityError(self):
+        """The exception the active backend raises on UNIQUE/foreign key violations."""
+        return self.backend.IntegrityError
 
     def _connect(self):
         try:
-            self.conn = mysql.connector.connect(**self.config)
-            cursor = self.conn.cursor()
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME} DEFAULT CHARACTER SET 'utf8'")
+            size = min(DB_POOL_SIZE, self.backend.max_connections or DB_POOL_SIZE)
+            self.pool = ConnectionPool(self.backend.connect, size=size, validate=self.backend.is_alive)
+            # Open the first pooled connection now so bad credentials are reported at startup.
+            self.pool.release(self.pool.acquire())
+        except self.backend.Error as err:
+            # Reporting it and exiting is up to the application (main.py)
+            raise ConnectionError(self.backend.describe_error(err)) from err
+
+    def connection(self):
+        """Context manager that borrows a pooled connection for the duration of the block."""
+        return self.pool.connection()
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def close(self):
+        """Closes the pool's idle connections. An autocommit-off unit of work this thread left
+        open is rolled back first, releasing its connection and locks."""
+        self.rollback()
+        self.pool.close_all()
+
+    # -----------------------------
+    # Transactions
+    # -----------------------------
+    @contextmanager
+    def transaction(self):
+        """Runs the block as one unit of work that commits once when it exits.
+
+        Statements issued through execute()/query() on this thread inside the block share
+        one connection. Nested blocks become savepoints, so an inner failure only rolls
+        back the inner block. With autocommit off the block is a savepoint of the thread's
+        unit of work, which only commit() makes durable. Yields the bound connection.
+        """
+        txn = getattr(self._local, "txn", None)
+        if txn is None and not self.autocommit:
+            txn = self._begin()
+        if txn is not None:
+            with self._savepoint(txn):
+                yield txn.conn
+            return
+
+        txn = self._begin()
+        try:
+            yield txn.conn
+        except BaseException:
+            self._end(rollback=True)
+            raise
+        self._end()
+
+    @contextmanager
+    def _savepoint(self, txn):
+        txn.depth += 1
+        name = f"sp_{txn.depth}"
+        callbacks, deferred = len(txn.on_commit), len(txn.before_commit)
+        cursor = txn.conn.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {name}")
+            try:
+                yield
+            except BaseException:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                del txn.on_commit[callbacks:]  # Their writes were rolled back
+                del txn.before_commit[deferred:]
+                raise
+            finally:
+                cursor.execute(f"RELEASE SAVEPOINT {name}")
+        finally:
             cursor.close()
-            self.conn.database = DB_NAME
-        except mysql.connector.Error as err:
-            if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-                print("Access Denied: Please check your username or password in config.py")
+            txn.depth -= 1
+
+    def in_transaction(self):
+        return getattr(self._local, "txn", None) is not None
+
+    def after_commit(self, fn, *args):
+        """Calls ``fn(*args)`` once this thread's transaction commits, or now outside one.
+
+        Used to update in-process state (caches) only with writes that were really committed:
+        the call is dropped if the transaction, or the savepoint it was registered in, rolls back.
+        """
+        txn = getattr(self._local, "txn", None)
+        if txn is None:
+            fn(*args)
+        else:
+            txn.on_commit.append((fn, args))
+
+    def before_commit(self, fn, item):
+        """Adds ``item`` to the batch ``fn(db, items)`` receives just before this thread's transaction commits.
+
+        Writes to rows shared by many transactions (the analytics summaries) are merged this way and
+        applied once per transaction, in one order, at the very end, instead of locking the shared
+        rows statement by statement. Items added in a savepoint that rolls back are dropped; outside
+        a transaction ``fn(db, [item])`` runs now.
+        """
+        txn = getattr(self._local, "txn", None)
+        if txn is None:
+            fn(self, [item])
+        else:
+            txn.before_commit.append((fn, item))
+
+    def commit(self):
+        """Commits the writes grouped on this thread while autocommit is off."""
+        if self.in_transaction():
+            self._end()
+
+    def rollback(self):
+        """Discards the writes grouped on this thread while autocommit is off."""
+        if self.in_transaction():
+            self._end(rollback=True)
+
+    def _begin(self):
+        conn = self.pool.acquire()
+        try:
+            self.backend.begin(conn)
+        except BaseException:
+            self.pool.release(conn, discard=True)
+            raise
+        self._local.txn = _Transaction(conn)
+        return self._local.txn
+
+    def _end(self, rollback=False):
+        txn = self._local.txn
+        if not rollback and txn.before_commit:
+            try:
+                batches = {}  # fn -> items, in the order the functions were first registered
+                for fn, item in txn.before_commit:
+                    batches.setdefault(fn, []).append(item)
+                txn.before_commit = []
+                for fn, items in batches.items():
+                    fn(self, items)
+            except BaseException:
+                self._end(rollback=True)
+                raise
+        self._local.txn = None
+        try:
+            if rollback:
+                txn.conn.rollback()
             else:
-                print(err)
-            exit(1)
-
-    def create_tables(self):
-        cursor = self.conn.cursor()
-        # Customer-facing tables
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS users
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           username
-                           VARCHAR
-                       (
-                           255
-                       ) UNIQUE NOT NULL,
-                           fullname VARCHAR
-                       (
-                           255
-                       ),
-                           phone_number VARCHAR
-                       (
-                           20
-                       ) UNIQUE NOT NULL,
-                           pan_number VARCHAR
-                       (
-                           10
-                       ) UNIQUE NOT NULL,
-                           password_hash VARCHAR
-                       (
-                           255
-                       ) NOT NULL,
-                           upi_pin_hash VARCHAR
-                       (
-                           255
-                       ) NOT NULL,
-                           created_at VARCHAR
-                       (
-                           255
-                       )
-                           )""")
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS accounts
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           user_id
-                           INT
-                           NOT
-                           NULL,
-                           account_number
-                           VARCHAR
-                       (
-                           255
-                       ) UNIQUE NOT NULL,
-                           account_type VARCHAR
-                       (
-                           255
-                       ) NOT NULL,
-                           balance DECIMAL
-                       (
-                           15,
-                           2
-                       ) DEFAULT 0.00,
-                           interest_rate DECIMAL
-                       (
-                           5,
-                           4
-                       ) DEFAULT 0.0000,
-                           created_at VARCHAR
-                       (
-                           255
-                       ),
-                           FOREIGN KEY
-                       (
-                           user_id
-                       ) REFERENCES users
-                       (
-                           id
-                       ) ON DELETE CASCADE
-                           )""")
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS transactions
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           account_id
-                           INT
-                           NOT
-                           NULL,
-                           type
-                           VARCHAR
-                       (
-                           255
-                       ) NOT NULL,
-                           amount DECIMAL
-                       (
-                           15,
-                           2
-                       ) NOT NULL,
-                           timestamp VARCHAR
-                       (
-                           255
-                       ),
-                           note TEXT,
-                           related_account VARCHAR
-                       (
-                           255
-                       ),
-                           FOREIGN KEY
-                       (
-                           account_id
-                       ) REFERENCES accounts
-                       (
-                           id
-                       ) ON DELETE CASCADE
-                           )""")
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS feedback
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           user_id
-                           INT,
-                           message
-                           TEXT
-                           NOT
-                           NULL,
-                           timestamp
-                           VARCHAR
-                       (
-                           255
-                       ),
-                           status VARCHAR
-                       (
-                           50
-                       ) DEFAULT 'New',
-                           FOREIGN KEY
-                       (
-                           user_id
-                       ) REFERENCES users
-                       (
-                           id
-                       ) ON DELETE SET NULL
-                           )""")
-
-        # Admin table
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS admins
-                       (
-                           id
-                           INT
-                           AUTO_INCREMENT
-                           PRIMARY
-                           KEY,
-                           username
-                           VARCHAR
-                       (
-                           255
-                       ) UNIQUE NOT NULL,
-                           password_hash VARCHAR
-                       (
-                           255
-                       ) NOT NULL
-                           )""")
-
-        self.conn.commit()
-        cursor.close()
-
-    def _seed_admin(self):
-        """Creates a default admin user if no admins exist."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id FROM admins LIMIT 1")
-        if not cursor.fetchone():
-            print("Creating default admin user...")
-            username = "admin"
-            password = "password"
-            pw_hash = hashlib.sha256(password.encode("utf-8")).hexdigest()
-            cursor.execute("INSERT INTO admins (username, password_hash) VALUES (%s, %s)", (username, pw_hash))
-            self.conn.commit()
-            print("Default Admin Created -> Username: admin, Password: password")
-        cursor.close()
-
-    # Replace the existing _seed_customers method in database.py with this one
-
-    def _seed_customers(self):
-        """Creates 25 default customer users if the users table is empty."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id FROM users LIMIT 1")
-        if cursor.fetchone():
-            cursor.close()
-            return  # Skip seeding if users already exist
+                txn.conn.commit()
+        except BaseException:
+            # A connection that failed to commit or roll back is in an unknown state.
+            self.pool.release(txn.conn, discard=True)
+            raise
+        finally:
+            # Results cached by other threads while this transaction was open read the old rows.
+            self._invalidate(txn.written)
+        self.pool.release(txn.conn)
+        if not rollback:
+            for fn, args in txn.on_commit:
+                fn(*args)
+
+    @contextmanager
+    def _cursor(self, write=False):
+        """Yields a cursor on this thread's transaction connection, or on a pooled one."""
+        txn = getattr(self._local, "txn", None)
+        if txn is None and write and not self.autocommit:
+            # The unit of work starts at the first write: reads before it run on a pooled
+            # connection, so a read-only caller never holds the write lock (SQLite's BEGIN
+            # IMMEDIATE) while it sits idle.
+            txn = self._begin()
+        if txn is not None:
+            cursor = txn.conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
 
-        print("Seeding default customer data...")
+    def execute(self, query, params=()):
+        with self.stats.measure(query, params) as probe, self._cursor(write=True) as cursor:
+            cursor.execute(self.backend.translate(query), params)
+            probe.rows = cursor.rowcount
+            self._wrote(query)
+            return cursor.lastrowid
 
-        customer_names = [
-            "Akanksha Singh", "Akhil Dadhich", "Amisha Nath", "Aryan Nishen", "Bhavana Uliyar",
-            "Gaurav Kumar J", "Hareesh Nayak", "Kunaljit Roy", "Madhuchandra R", "Melvin Basutkar",
-            "Mohith Reddy PN", "Monisha K M", "Nanthitha M S", "Nikhil P", "Parvath J",
-            "Peram Varshitha", "Pratyush Jaishankar", "Rahul K S", "Ramya Hunagund", "Ritesh R",
-            "Siddalingesha G", "Sushma Dodamani", "Taran Vadivelan", "Vaishnavi M", "Vaishnavi Shrikanth"
-        ]
+    def execute_rowcount(self, query, params=()):
+        """Like execute(), but returns the number of rows the statement changed."""
+        with self.stats.measure(query, params) as probe, self._cursor(write=True) as cursor:
+            cursor.execute(self.backend.translate(query), params)
+            probe.rows = cursor.rowcount
+            self._wrote(query)
+            return cursor.rowcount
 
-        used_mobiles = set()
-        used_pans = set()
+    # -----------------------------
+    # Query cache
+    # -----------------------------
+    def _wrote(self, query):
+        """Drops cached results that read the tables ``query`` changed."""
+        tables = _tables_written(query)
+        if tables is None:
+            self.cache.clear()
+            return
+        if not tables:
+            return
+        self.cache.invalidate(tables)
+        txn = getattr(self._local, "txn", None)
+        if txn is not None:
+            txn.written.update(tables)
 
-        # Keep track of the first 5 users to add transactions for them
-        users_for_transactions = []
+    def _invalidate(self, tables):
+        if tables:
+            self.cache.invalidate(tables)
 
-        for full_name in customer_names:
-            # 1. Generate Username
-            name_parts = full_name.lower().split()
-            username = f"{name_parts[0]}.{name_parts[-1][0]}"
+    # -----------------------------
+    # Bulk writes
+    # -----------------------------
+    def execute_many(self, query, rows, chunk_size=1000):
+        """Runs ``query`` once per parameter tuple in ``rows`` using the driver's executemany.
 
-            # 2. Generate unique 10-digit mobile number
-            while True:
-                mobile = str(random.randint(6, 9)) + "".join([str(random.randint(0, 9)) for _ in range(9)])
-                if mobile not in used_mobiles:
-                    used_mobiles.add(mobile)
-                    break
+        ``rows`` may be any iterable (e.g. a generator); it is consumed ``chunk_size`` rows
+        at a time, so it never has to be materialized. All chunks commit together.
+        Returns the number of rows written.
+        """
+        sql = self.backend.translate(query)
+        rows = iter(rows)
+        total = 0
+        with self.transaction():
+            with self._cursor() as cursor:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    with self.stats.measure(query) as probe:
+                        cursor.executemany(sql, chunk)
+                        probe.rows = len(chunk)
+                    total += len(chunk)
+            self._wrote(query)
+        return total
+
+    def insert_many(self, table, columns, rows, chunk_size=1000, return_ids=False):
+        """Inserts ``rows`` into ``table`` with multi-row ``INSERT ... VALUES (..), (..)`` statements.
+
+        Rows are streamed from any iterable ``chunk_size`` at a time (capped so a statement
+        stays within the backend's placeholder limit) and all chunks commit together.
+        Returns the number of rows inserted, or the list of generated ids when ``return_ids``
+        is set. Ids are read off multi-row statements only if the backend hands them out in
+        one consecutive block (MySQL with innodb_autoinc_lock_mode 0 or 1); otherwise
+        ``return_ids`` inserts the rows one statement each.
+        """
+        columns = tuple(columns)
+        chunk_size = max(1, min(chunk_size, self.backend.max_params // len(columns)))
+        if return_ids and not self.backend.consecutive_ids:
+            chunk_size = 1
+        head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        group = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        statements = {}  # rows per statement -> translated SQL
 
-            # 3. Generate unique 10-digit PAN number
+        rows = iter(rows)
+        ids = []
+        total = 0
+        with self.transaction():
+            with self._cursor() as cursor:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    sql = statements.get(len(chunk))
+                    if sql is None:
+                        sql = statements[len(chunk)] = self.backend.translate(head + ", ".join([group] * len(chunk)))
+                    with self.stats.measure(head + group) as probe:
+                        cursor.execute(sql, [value for row in chunk for value in row])
+                        probe.rows = len(chunk)
+                    if return_ids:
+                        ids.extend(self.backend.inserted_ids(cursor, len(chunk)))
+                    total += len(chunk)
+            self._wrote(head)
+        return ids if return_ids else total
+
+    def explain(self, query, params=()):
+        """Returns the backend's query plan for ``query`` as a list of dicts."""
+        return self.query(self.backend.explain_prefix + query, params)
+
+    def iter_query(self, query, params=(), batch_size=1000, as_tuples=False):
+        """Generator version of query() for large result sets.
+
+        Rows are fetched ``batch_size`` at a time from a server-side (unbuffered) cursor, so
+        memory stays constant however many rows match. Yields dicts, or plain tuples in
+        column order when ``as_tuples`` is set. Outside a transaction the generator holds
+        its own pooled connection until it is exhausted or closed.
+        """
+        if not self.stats.enabled:
+            yield from self._iter_query(query, params, batch_size, as_tuples)
+            return
+        # Only time spent fetching is measured, not the time the consumer spends between rows.
+        rows = self._iter_query(query, params, batch_size, as_tuples)
+        count, elapsed, failed = 0, 0.0, False
+        try:
             while True:
-                pan = "".join(random.choices(string.ascii_uppercase, k=5)) + \
-                      "".join(random.choices(string.digits, k=4)) + \
-                      random.choice(string.ascii_uppercase)
-                if pan not in used_pans:
-                    used_pans.add(pan)
+                start = time.perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
                     break
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    elapsed += time.perf_counter() - start
+                count += 1
+                yield row
+        finally:
+            rows.close()
+            self.stats.record(query, elapsed * 1000, count, failed, params)
+
+    def _iter_query(self, query, params, batch_size, as_tuples):
+        txn = getattr(self._local, "txn", None)
+        conn = txn.conn if txn is not None else self.pool.acquire()
+        try:
+            cursor = self.backend.stream_cursor(conn)
+            try:
+                cursor.execute(self.backend.translate(query), params)
+                columns = [col[0] for col in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if as_tuples:
+                        yield from rows
+                    else:
+                        for row in rows:
+                            yield dict(zip(columns, row))
+            finally:
+                self.backend.close_stream(conn, cursor)
+        except GeneratorExit:
+            # Closed early by the consumer; close_stream() left the connection clean.
+            if txn is None:
+                self.pool.release(conn)
+            raise
+        except BaseException:
+            if txn is None:
+                self.pool.release(conn, discard=True)
+            raise
+        if txn is None:
+            self.pool.release(conn)
 
-            # 4. Create password and UPI PIN
-            password = f"{username}.123"
-            upi_pin = mobile[:4]
-            pw_hash = hashlib.sha256(password.encode("utf-8")).hexdigest()
-            upi_pin_hash = hashlib.sha256(upi_pin.encode("utf-8")).hexdigest()
-
-            # 5. Insert user into the database
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            user_sql = """INSERT INTO users (username, fullname, phone_number, pan_number, password_hash, \
-                                             upi_pin_hash, created_at)
-                          VALUES (%s, %s, %s, %s, %s, %s, %s)"""
-            cursor.execute(user_sql, (username, full_name, mobile, pan, pw_hash, upi_pin_hash, now))
-            user_id = cursor.lastrowid
-
-            # 6. Create a savings account with a balance of 32500
-            account_number = f"SAV{user_id:011d}"
-            account_sql = """INSERT INTO accounts (user_id, account_number, account_type, balance, created_at)
-                             VALUES (%s, %s, %s, %s, %s)"""
-            cursor.execute(account_sql, (user_id, account_number, "Savings", 32500.00, now))
-            account_id = cursor.lastrowid
-
-            # Store the first 5 account IDs to add transactions to them
-            if len(users_for_transactions) < 5:
-                users_for_transactions.append({'account_id': account_id, 'balance': 32500.00})
-
-        # --- NEW SECTION TO ADD SAMPLE TRANSACTIONS ---
-        print("Adding sample transactions for analytics...")
-        txn_sql = "INSERT INTO transactions (account_id, type, amount, timestamp, note) VALUES (%s, %s, %s, %s, %s)"
-
-        # User 1: 3 transactions
-        acc1 = users_for_transactions[0]
-        cursor.execute(txn_sql, (acc1['account_id'], 'DEPOSIT', 1500.00, now, 'Salary Credit'))
-        cursor.execute(txn_sql, (acc1['account_id'], 'WITHDRAW', 200.00, now, 'ATM Withdrawal'))
-        cursor.execute(txn_sql, (acc1['account_id'], 'DEPOSIT', 50.00, now, 'Cashback'))
-        cursor.execute("UPDATE accounts SET balance = %s WHERE id = %s",
-                       (acc1['balance'] + 1350.00, acc1['account_id']))
-
-        # User 2: 2 transactions
-        acc2 = users_for_transactions[1]
-        cursor.execute(txn_sql, (acc2['account_id'], 'DEPOSIT', 5000.00, now, 'Initial Deposit'))
-        cursor.execute(txn_sql, (acc2['account_id'], 'WITHDRAW', 1000.00, now, 'Online Shopping'))
-        cursor.execute("UPDATE accounts SET balance = %s WHERE id = %s",
-                       (acc2['balance'] + 4000.00, acc2['account_id']))
-
-        # User 3: 1 transaction
-        acc3 = users_for_transactions[2]
-        cursor.execute(txn_sql, (acc3['account_id'], 'WITHDRAW', 500.00, now, 'Bill Payment'))
-        cursor.execute("UPDATE accounts SET balance = %s WHERE id = %s",
-                       (acc3['balance'] - 500.00, acc3['account_id']))
-        # --- END OF NEW SECTION ---
-
-        self.conn.commit()
-        print(f"Successfully seeded {len(customer_names)} customers and added sample transactions.")
-        cursor.close()
+    def query(self, query, params=(), cache=False):
+        """Runs a SELECT and returns its rows as a list of dicts.
 
-    def execute(self, query, params=()):
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        self.conn.commit()
-        last_row_id = cursor.lastrowid
-        cursor.close()
-        return last_row_id
-
-    def query(self, query, params=()):
-        cursor = self.conn.cursor(dictionary=True)
-        cursor.execute(query, params)
-        result = cursor.fetchall()
-        cursor.close()
-        return result
\ No newline at end of file
+        With ``cache=True`` the result is served from, or stored in, the query cache until a
+        write to one of the tables it reads, or QUERY_CACHE_TTL passes. Cached rows are shared
+        between callers and must not be modified. Inside a transaction the cache is bypassed.
+        """
+        if not cache or self.in_transaction():
+            return self._measured_query(query, params)
+        key = (query, tuple(params))
+        rows = self.cache.get(key)
+        if rows is None:
+            tables = _tables_read(query)
+            versions = self.cache.versions(tables)
+            rows = self._measured_query(query, params)
+            self.cache.put(key, tables, rows, versions)
+        return rows
+
+    def _measured_query(self, query, params):
+        with self.stats.measure(query, params) as probe:
+            rows = self._query(query, params)
+            probe.rows = len(rows)
+            return rows
+
+    def _explain_unmeasured(self, query, params):
+        # Used by the slow-query log, so capturing a plan is not itself recorded as a query.
+        return self._query(self.backend.explain_prefix + query, params)
+
+    def _query(self, query, params):
+        with self._cursor() as cursor:
+            cursor.execute(self.backend.translate(query), params)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
\ No newline at end of file
@@ -3,37 +3,364 @@ import customtkinter as ctk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import os
-import csv
-from datetime import datetime
-
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from config import (PREWARM_FRAMES, PREWARM_INTERVAL_MS, STARTUP_REPORT,
+                    SLIDE_CACHE_SIZE, SLIDE_WIDTH_BUCKET, SLIDE_RESIZE_DEBOUNCE_MS,
+                    TXN_PAGE_SIZE, TXN_WINDOW_ROWS, TXN_INSERT_CHUNK, ADMIN_PAGE_SIZE, ADMIN_SEARCH_DEBOUNCE_MS)
 from database import DB
 from models import (User, Account, SavingsAccount, create_account_for_user, submit_feedback,
-                    admin_login, get_all_users, delete_user,
-                    get_users_by_balance, get_users_by_transaction_count)
-
+                    admin_login, delete_user, search_users, search_accounts, sort_key_of,
+                    get_users_by_balance, get_users_by_transaction_count, ACCOUNT_COLUMNS,
+                    USER_SORT_KEYS, ACCOUNT_SORT_KEYS)
+from services import TransferService, UPIPaymentService, PaymentResult
+from profiling import STARTUP
+from tasks import TaskRunner
+
+
+# matplotlib takes seconds to import and is only needed for admin analytics, so the charts
+# are built the first time analytics is opened (on a worker thread) and reused after that.
+@lru_cache(maxsize=None)
+def analytics_charts():
+    from charts import BarChart
+    return {
+        "monthly": BarChart('Monthly Volume (last 12 months)', 'Amount (₹)',
+                            series=(("Deposits", '#5cb85c'), ("Withdrawals", '#d9534f')), rotate_labels=False),
+        "balance": BarChart('Top 5 Customers by Balance', 'Balance (₹)'),
+        "activity": BarChart('Top 5 Most Active Customers', 'Number of Transactions', series=(("", '#5cb85c'),)),
+    }
+
+
+@lru_cache(maxsize=None)
+def analytics_engine(db):
+    # One columnar copy of the data per database, loaded in full once and refreshed incrementally
+    from analytics import AnalyticsEngine
+    return AnalyticsEngine(db)
+
+
+# The engine and the charts are shared, mutable objects. A replaced analytics task keeps
+# running on its worker, so each fetch holds this lock while it refreshes and renders.
+_ANALYTICS_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _open_slide(path):
+    image = Image.open(path)
+    image.load()  # Decode once; later resizes work from memory
+    return image
+
+
+def _render_slide(path, width):
+    """Decodes ``path`` and resizes it to ``width`` (at least 250px tall). Safe to run on a worker."""
+    original_img = _open_slide(path)
+    original_width, original_height = original_img.size
+
+    # Calculate the new height to maintain the aspect ratio
+    aspect_ratio = original_height / original_width
+    new_height = int(width * aspect_ratio)
+
+    # Ensure height is at least a minimum to prevent extremely thin images
+    min_image_height = 250  # Minimum height for the image
+    if new_height < min_image_height:
+        new_height = min_image_height
+        # Recalculate width to maintain aspect ratio if height was forced
+        width = int(new_height / aspect_ratio)
+    return original_img.resize((width, new_height), Image.LANCZOS)
+
+
+class SlideImageCache:
+    """LRU cache of resized slideshow CTkImages keyed by (path, width bucket).
+
+    Widths are rounded down to SLIDE_WIDTH_BUCKET pixels, so small resizes reuse the
+    cached image. prefetch() decodes and resizes on a worker thread; the CTkImage itself
+    is always created on the Tk thread.
+    """
+
+    def __init__(self, size=SLIDE_CACHE_SIZE, bucket=SLIDE_WIDTH_BUCKET):
+        self.size = size
+        self.bucket_width = bucket
+        self._images = OrderedDict()
+        self._pending = set()
+
+    def bucket(self, width):
+        return max(self.bucket_width, width - width % self.bucket_width)
+
+    def get(self, path, width):
+        key = (path, self.bucket(width))
+        image = self._images.get(key)
+        if image is None:
+            image = self._store(key, _render_slide(*key))
+        self._images.move_to_end(key)
+        return image
+
+    def prefetch(self, path, width, tasks):
+        key = (path, self.bucket(width))
+        if key in self._images or key in self._pending:
+            return
+        self._pending.add(key)
+
+        def done(rendered):
+            self._pending.discard(key)
+            if key not in self._images:
+                self._store(key, rendered)
+
+        def failed(error):
+            self._pending.discard(key)  # get() will retry (and report) synchronously
+
+        tasks.submit(_render_slide, *key, on_success=done, on_error=failed)
+
+    def _store(self, key, rendered):
+        image = self._images[key] = ctk.CTkImage(light_image=rendered, size=rendered.size)
+        while len(self._images) > self.size:
+            self._images.popitem(last=False)
+        return image
+
+
+class TransactionPager:
+    """Virtual scrolling for a transaction Treeview.
+
+    Only a window of at most ``max_rows`` rows is ever held in the tree. Scrolling near
+    the bottom fetches the next older page (keyset ``after`` the last row); once rows
+    have been dropped from the top, scrolling back up fetches newer pages again. Pages
+    are fetched on the task runner and inserted ``TXN_INSERT_CHUNK`` rows per idle slot.
+    """
+
+    def __init__(self, tree, scrollbar, tasks, fetch_page, format_row, page_size=TXN_PAGE_SIZE,
+                 max_rows=TXN_WINDOW_ROWS):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.tasks = tasks
+        self.fetch_page = fetch_page  # (after, before, limit) -> rows, newest first
+        self.format_row = format_row  # row dict -> Treeview values
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self._keys = deque()  # (timestamp, id) of each row in the tree, top to bottom
+        self._more_older = self._more_newer = False
+        self._loading = False
+        self._generation = 0  # Bumped by reset() so results of an earlier load are ignored
+        tree.configure(yscrollcommand=self._on_scroll)
+        scrollbar.configure(command=tree.yview)
+
+    def reset(self, fetch_page=None):
+        """Clears the table and loads the newest page (optionally from a new query)."""
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self._generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self._keys.clear()
+        self._more_older = self._more_newer = False
+        self._loading = False
+        self._load(older=True)
+
+    def prepend(self, row):
+        """Shows a just-recorded transaction at the top, if the window is showing the newest rows."""
+        if self._more_newer or self.tree.exists(str(row["id"])):
+            return  # Scrolled away from the top; the row is fetched when scrolling back up
+        self.tree.insert("", 0, iid=str(row["id"]), values=self.format_row(row))
+        self._keys.appendleft((row["timestamp"], row["id"]))
+        self._trim(older=False)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        if self._more_older and float(last) > 0.9:
+            self._load(older=True)
+        elif self._more_newer and float(first) < 0.1:
+            self._load(older=False)
+
+    def _load(self, older):
+        self._loading = True
+        generation = self._generation
+        after = self._keys[-1] if older and self._keys else None
+        before = self._keys[0] if not older else None
+        self.tasks.submit(self.fetch_page, after, before, self.page_size,
+                          on_success=lambda rows: self._loaded(generation, older, rows),
+                          on_error=lambda error: self._failed(generation, error),
+                          key=("transactions", id(self)), replace=True)
+
+    def _failed(self, generation, error):
+        if generation == self._generation:
+            self._loading = False
+            messagebox.showerror("Error", f"Could not load transactions: {error}")
+
+    def _loaded(self, generation, older, rows):
+        if generation != self._generation or not self.tree.winfo_exists():
+            return
+        if older:
+            self._more_older = len(rows) == self.page_size
+        else:
+            self._more_newer = len(rows) == self.page_size
+            rows = rows[::-1]  # Inserted one by one at the top, so newest goes in last
+        self._insert_chunk(generation, older, rows, 0)
 
-# --- NEW DATA FETCHING FUNCTION ---
-# This function retrieves all accounts and joins them with user details for the admin view.
-def get_all_accounts_details(db: DB):
-    """Fetches all customer accounts with their owner's name and balance."""
-    query = """
-            SELECT u.fullname, \
-                   a.account_number, \
-                   a.account_type, \
-                   a.balance
-            FROM accounts a \
-                     JOIN \
-                 users u ON a.user_id = u.id
-            ORDER BY u.fullname, a.account_type \
-            """
-    return db.query(query)
+    def _insert_chunk(self, generation, older, rows, offset):
+        if generation != self._generation or not self.tree.winfo_exists():
+            return
+        chunk = rows[offset:offset + TXN_INSERT_CHUNK]
+        for row in chunk:
+            key = (row["timestamp"], row["id"])
+            if self.tree.exists(str(row["id"])):
+                continue
+            if older:
+                self.tree.insert("", "end", iid=str(row["id"]), values=self.format_row(row))
+                self._keys.append(key)
+            else:
+                self.tree.insert("", 0, iid=str(row["id"]), values=self.format_row(row))
+                self._keys.appendleft(key)
+        if not older and chunk:
+            self.tree.yview_scroll(len(chunk), "units")  # Keep the rows the user is looking at in place
+        self._trim(older)
+        if offset + TXN_INSERT_CHUNK < len(rows):
+            self.tree.after_idle(self._insert_chunk, generation, older, rows, offset + TXN_INSERT_CHUNK)
+        else:
+            self._loading = False
 
+    def _trim(self, older):
+        # Drop rows from the end away from the scroll direction to keep the window bounded.
+        excess = len(self._keys) - self.max_rows
+        if excess <= 0:
+            return
+        children = self.tree.get_children()
+        if older:
+            self.tree.delete(*children[:excess])
+            for _ in range(excess):
+                self._keys.popleft()
+            self.tree.yview_scroll(-excess, "units")
+            self._more_newer = True
+        else:
+            self.tree.delete(*children[-excess:])
+            for _ in range(excess):
+                self._keys.pop()
+            self._more_older = True
+
+
+def transaction_table(parent, columns, height=None):
+    """A Treeview with a vertical scrollbar in its own frame; returns (frame, tree, scrollbar)."""
+    frame = ctk.CTkFrame(parent, fg_color="transparent")
+    tree = ttk.Treeview(frame, columns=columns, show="headings", **({"height": height} if height else {}))
+    scrollbar = ttk.Scrollbar(frame, orient="vertical")
+    scrollbar.pack(side="right", fill="y")
+    tree.pack(side="left", fill="both", expand=True)
+    return frame, tree, scrollbar
+
+
+class PagedTable:
+    """A sortable, searchable Treeview that shows one keyset page of a server-side query at a time.
+
+    ``fetch(text, sort, descending, after, limit)`` runs on the task runner and returns rows with
+    an "id"; ``sort_keys`` maps each sortable column to its keyset columns (see models.py).
+    Clicking a heading sorts by it (again to reverse), typing in the search box filters after a
+    short pause, and each new page is applied as a diff: only rows that changed are touched.
+    """
+
+    def __init__(self, parent, tasks, fetch, sort_keys, columns, format_row, sort, task_key,
+                 page_size=ADMIN_PAGE_SIZE):
+        self.tasks = tasks
+        self.fetch = fetch
+        self.sort_keys = sort_keys
+        self.format_row = format_row  # row dict -> Treeview values
+        self.task_key = task_key
+        self.page_size = page_size
+        self.sort, self.descending, self.text = sort, False, ""
+        self._starts = [None]  # Keyset start of each page visited so far; index = page number
+        self._page = 0
+        self._has_next = False
+        self._values = {}  # iid -> values currently shown, to skip unchanged rows
+        self._search_id = None
+
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+        self.search_entry = ctk.CTkEntry(self.frame, width=300, placeholder_text="Search...")
+        self.search_entry.pack(anchor="w")
+        self.search_entry.bind("<KeyRelease>", self._on_search_typed)
+        self.tree = ttk.Treeview(self.frame, columns=[name for name, _ in columns], show="headings")
+        for name, heading in columns:
+            if name in sort_keys:
+                self.tree.heading(name, text=heading, command=lambda n=name: self.sort_by(n))
+            else:
+                self.tree.heading(name, text=heading)
+        self.tree.pack(fill="both", expand=True, pady=10)
+        nav = ctk.CTkFrame(self.frame, fg_color="transparent")
+        nav.pack(fill="x")
+        self.prev_button = ctk.CTkButton(nav, text="< Previous", width=100, command=self.previous_page)
+        self.prev_button.pack(side="left")
+        self.page_label = ctk.CTkLabel(nav, text="")
+        self.page_label.pack(side="left", padx=15)
+        self.next_button = ctk.CTkButton(nav, text="Next >", width=100, command=self.next_page)
+        self.next_button.pack(side="left")
+
+    def refresh(self):
+        """Reloads the current page."""
+        self.page_label.configure(text=f"Page {self._page + 1} - loading...")
+        # One extra row tells whether there is a next page
+        self.tasks.submit(self.fetch, self.text, self.sort, self.descending, self._starts[self._page],
+                          self.page_size + 1, on_success=self._show, key=self.task_key, replace=True)
+
+    def sort_by(self, column):
+        self.descending = not self.descending if column == self.sort else False
+        self.sort = column
+        self._first_page()
+
+    def next_page(self):
+        if self._has_next:
+            del self._starts[self._page + 1:]
+            self._page += 1
+            self.refresh()
+
+    def previous_page(self):
+        if self._page > 0:
+            self._page -= 1
+            self.refresh()
+
+    def _first_page(self):
+        self._starts, self._page = [None], 0
+        self.refresh()
+
+    def _on_search_typed(self, event=None):
+        if self._search_id is not None:
+            self.frame.after_cancel(self._search_id)
+        self._search_id = self.frame.after(ADMIN_SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def _apply_search(self):
+        self._search_id = None
+        text = self.search_entry.get().strip()
+        if text != self.text:
+            self.text = text
+            self._first_page()
+
+    def _show(self, rows):
+        if not self.tree.winfo_exists():
+            return
+        self._has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self._has_next:
+            self._starts[self._page + 1:] = [sort_key_of(rows[-1], self.sort_keys[self.sort])]
+
+        # Apply the page as a diff against what is on screen
+        wanted = {str(row["id"]): row for row in rows}
+        stale = [iid for iid in self.tree.get_children() if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+        for iid in stale:
+            del self._values[iid]
+        for index, (iid, row) in enumerate(wanted.items()):
+            values = self.format_row(row)
+            if iid not in self._values:
+                self.tree.insert("", index, iid=iid, values=values)
+            else:
+                if self._values[iid] != values:
+                    self.tree.item(iid, values=values)
+                if self.tree.index(iid) != index:
+                    self.tree.move(iid, "", index)
+            self._values[iid] = values
+
+        self.page_label.configure(text=f"Page {self._page + 1}" + ("" if rows else " - no matches"))
+        self.prev_button.configure(state="normal" if self._page > 0 else "disabled")
+        self.next_button.configure(state="normal" if self._has_next else "disabled")
 
-# --- END OF NEW FUNCTION ---
 
 ctk.set_appearance_mode("Light")
 ctk.set_default_color_theme("blue")
@@ -96,6 +423,9 @@ class BankingApp(ctk.CTk):
         self.title("Ascendion Bank")
         self.geometry("1280x720")
         self.current_user = None
+        # Database calls run on worker threads; results come back to this (the Tk) thread.
+        self.tasks = TaskRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         try:
             # Resized logo for better fit in the new header
             logo_image_data = Image.open("logo.png")
@@ -103,29 +433,58 @@ class BankingApp(ctk.CTk):
             self.logo_image = ctk.CTkImage(logo_image_data, size=(350, 88))  # Adjusted logo size
         except FileNotFoundError:
             self.logo_image = ctk.CTkImage(Image.new('RGB', (280, 70), 'grey'), size=(280, 70))  # Adjusted placeholder
+        # Frames are built on first use (get_frame); only the welcome screen is built before the first paint.
         self.frames = {}
-        self._create_frames()
-        self.show_frame(WelcomeFrame)
-
-    def _create_frames(self):
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
-        for F in (WelcomeFrame, LoginFrame, RegisterFrame, DashboardFrame, QuickPayFrame,
-                  ViewBalanceFrame, CustomerCareFrame, ForgotPasswordFrame,
-                  AdminLoginFrame, AdminDashboardFrame):
-            frame = F(self, self.db, logo_image=self.logo_image)
-            self.frames[F] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        self.show_frame(WelcomeFrame)
+        self.after_idle(self._on_first_paint)
+
+    def get_frame(self, frame_class):
+        frame = self.frames.get(frame_class)
+        if frame is None:
+            with STARTUP.span(f"build {frame_class.__name__}"):
+                frame = frame_class(self, self.db, logo_image=self.logo_image)
+                frame.grid(row=0, column=0, sticky="nsew")
+                frame.lower()  # A new widget is stacked on top; keep the current screen visible
+            self.frames[frame_class] = frame
+        return frame
 
     def show_frame(self, frame_class):
-        frame = self.frames[frame_class]
+        frame = self.get_frame(frame_class)
         if hasattr(frame, 'on_show'):
             frame.on_show()
         frame.tkraise()
 
+    def _on_first_paint(self):
+        STARTUP.mark("first paint")
+        if STARTUP_REPORT:
+            print(STARTUP.report())
+        if PREWARM_FRAMES:
+            # Most likely next screens first
+            self._prewarm = [LoginFrame, DashboardFrame, QuickPayFrame, RegisterFrame, ViewBalanceFrame,
+                             CustomerCareFrame, ForgotPasswordFrame, AdminLoginFrame, AdminDashboardFrame]
+            self._schedule_prewarm()
+
+    def _schedule_prewarm(self):
+        self.after(PREWARM_INTERVAL_MS, lambda: self.after_idle(self._prewarm_next))
+
+    def _prewarm_next(self):
+        # Builds one not-yet-used frame per idle slot so input is never held up for long.
+        while self._prewarm:
+            frame_class = self._prewarm.pop(0)
+            if frame_class not in self.frames:
+                self.get_frame(frame_class)
+                self._schedule_prewarm()
+                return
+
+    def on_close(self):
+        self.tasks.shutdown()
+        self.destroy()
+
     def login_success(self, user: User):
         self.current_user = user
-        dashboard_frame = self.frames[DashboardFrame]
+        dashboard_frame = self.get_frame(DashboardFrame)
         dashboard_frame.set_user(user)
         self.show_frame(DashboardFrame)
 
@@ -137,6 +496,11 @@ class WelcomeFrame(ctk.CTkFrame):
         self.master = master
         self.image_paths = [];
         self.current_image_index = 0;
+        self.slide_cache = SlideImageCache()
+        self.update_slideshow_id = None  # Pending auto-advance
+        self._resize_id = None  # Pending debounced re-render
+        self._slide_width = 0  # Last width reported by <Configure>
+        self._shown_bucket = None  # Width bucket of the image on screen
 
         # Configure grid for new layout with header
         self.grid_rowconfigure(0, weight=0)  # Header row (fixed size)
@@ -190,47 +554,27 @@ class WelcomeFrame(ctk.CTkFrame):
         self.update_slideshow()  # Initial call
 
     def _on_slideshow_frame_configure(self, event=None):
-        # This function will be called whenever the slideshow_frame is resized
-        # We need to ensure images are re-rendered at the correct size
-        self.update_slideshow(force_resize=True)
+        # <Configure> fires continuously while the window is dragged; re-render only once the
+        # size has settled, and only if the width moved to a different size bucket.
+        self._slide_width = event.width if event is not None else self.slideshow_frame.winfo_width()
+        if self._resize_id is not None:
+            self.after_cancel(self._resize_id)
+        self._resize_id = self.after(SLIDE_RESIZE_DEBOUNCE_MS, self._apply_resize)
+
+    def _apply_resize(self):
+        self._resize_id = None
+        if self.image_paths and self.slide_cache.bucket(self._target_width()) != self._shown_bucket:
+            self._show_image(self.current_image_index)
 
     def admin_login(self):
         self.master.show_frame(AdminLoginFrame)
 
-    def _get_resized_image(self, path):
-        # Get the available width from the slideshow label's parent frame
-        # We call update_idletasks to ensure winfo_width returns the correct, updated value
-        self.slideshow_frame.update_idletasks()  # Ensure frame dimensions are up-to-date
-
-        # Consider a maximum desired width for the image if the frame gets too wide
-        max_image_width = 900  # Maximum width for the image within the frame
-
-        # Calculate available width within the slideshow_label's grid cell (accounting for padding/arrows)
-        # We use the slideshow_frame's actual width and subtract static elements if any
-        container_width = self.slideshow_frame.winfo_width() - 40  # Account for padx of arrows (2*10 for arrows)
-
-        if container_width <= 1:  # Fallback if window not fully drawn or too small
-            container_width = 800  # Default reasonable width
-
-        # Limit the image width to max_image_width, but don't exceed container_width
-        target_width = min(container_width, max_image_width)
-
-        original_img = Image.open(path)
-        original_width, original_height = original_img.size
-
-        # Calculate the new height to maintain the aspect ratio
-        aspect_ratio = original_height / original_width
-        new_height = int(target_width * aspect_ratio)
-
-        # Ensure height is at least a minimum to prevent extremely thin images
-        min_image_height = 250  # Minimum height for the image
-        if new_height < min_image_height:
-            new_height = min_image_height
-            # Recalculate width to maintain aspect ratio if height was forced
-            target_width = int(new_height / aspect_ratio)
-
-        # Create the CTkImage with the calculated size
-        return ctk.CTkImage(light_image=original_img, size=(target_width, new_height))
+    def _target_width(self):
+        # Available width minus the arrow buttons, capped at 900px; 800px until the frame is drawn.
+        container_width = self._slide_width - 40
+        if container_width <= 1:
+            container_width = 800
+        return min(container_width, 900)
 
     def _load_images(self):
         self.image_paths = []  # Store paths to reload on resize
@@ -245,64 +589,49 @@ class WelcomeFrame(ctk.CTkFrame):
         if not self.image_paths:
             print("No ad images found.")
 
+    def _show_image(self, index):
+        """Displays slide ``index`` at the current width and prefetches the one after it."""
+        self.current_image_index = index % len(self.image_paths)
+        width = self._target_width()
+        resized_image = self.slide_cache.get(self.image_paths[self.current_image_index], width)
+        self._shown_bucket = self.slide_cache.bucket(width)
+
+        # Configure the slideshow label to display the resized image
+        self.slideshow_label.configure(image=resized_image)
+        self.slideshow_label.image = resized_image  # Keep reference!
+
+        # Dynamically adjust the min height of the slideshow_frame to fit the image
+        # This helps prevent cutting if the frame is too short
+        self.slideshow_frame.grid_propagate(False)  # Stop frame from shrinking to label size
+        self.slideshow_frame.configure(height=resized_image._size[1] + 20)  # image height + padding
+        self.slideshow_frame.grid_propagate(True)  # Allow it to grow if needed
+
+        next_path = self.image_paths[(self.current_image_index + 1) % len(self.image_paths)]
+        self.slide_cache.prefetch(next_path, width, self.master.tasks)
+
+    def _restart_timer(self):
+        if self.update_slideshow_id is not None:
+            self.after_cancel(self.update_slideshow_id)
+        self.update_slideshow_id = self.after(4000, self.update_slideshow)
+
     def update_slideshow(self, force_resize=False):
         if self.image_paths:
-            # Only change image index if not a force_resize (which happens on window resize)
-            if not force_resize:
-                self.current_image_index = (self.current_image_index + 1) % len(self.image_paths)
-
-            path = self.image_paths[self.current_image_index]
-            resized_image = self._get_resized_image(path)
-
-            # Configure the slideshow label to display the resized image
-            self.slideshow_label.configure(image=resized_image)
-            self.slideshow_label.image = resized_image  # Keep reference!
-
-            # Dynamically adjust the min height of the slideshow_frame to fit the image
-            # This helps prevent cutting if the frame is too short
-            self.slideshow_frame.grid_propagate(False)  # Stop frame from shrinking to label size
-            self.slideshow_frame.configure(height=resized_image._size[1] + 20)  # image height + padding
-            self.slideshow_frame.grid_propagate(True)  # Allow it to grow if needed
+            # A force_resize (window resize) re-renders the current image instead of advancing
+            self._show_image(self.current_image_index if force_resize else self.current_image_index + 1)
 
         # Schedule the next update only if not a force_resize (to avoid double scheduling)
         if not force_resize:
-            self.after(4000, self.update_slideshow)
+            self._restart_timer()
 
     def next_image(self):
-        # Stop pending slideshow updates to prevent conflicts
-        self.after_cancel(self.update_slideshow_id) if hasattr(self, 'update_slideshow_id') else None
-
         if self.image_paths:
-            self.current_image_index = (self.current_image_index + 1) % len(self.image_paths)
-            path = self.image_paths[self.current_image_index]
-            resized_image = self._get_resized_image(path)
-            self.slideshow_label.configure(image=resized_image)
-            self.slideshow_label.image = resized_image  # Keep reference!
-            # Dynamically adjust the min height of the slideshow_frame to fit the image
-            self.slideshow_frame.grid_propagate(False)
-            self.slideshow_frame.configure(height=resized_image._size[1] + 20)
-            self.slideshow_frame.grid_propagate(True)
-
-        # Restart the slideshow timer
-        self.update_slideshow_id = self.after(4000, self.update_slideshow)
+            self._show_image(self.current_image_index + 1)
+        self._restart_timer()
 
     def prev_image(self):
-        # Stop pending slideshow updates to prevent conflicts
-        self.after_cancel(self.update_slideshow_id) if hasattr(self, 'update_slideshow_id') else None
-
         if self.image_paths:
-            self.current_image_index = (self.current_image_index - 1 + len(self.image_paths)) % len(self.image_paths)
-            path = self.image_paths[self.current_image_index]
-            resized_image = self._get_resized_image(path)
-            self.slideshow_label.configure(image=resized_image)
-            self.slideshow_label.image = resized_image  # Keep reference!
-            # Dynamically adjust the min height of the slideshow_frame to fit the image
-            self.slideshow_frame.grid_propagate(False)
-            self.slideshow_frame.configure(height=resized_image._size[1] + 20)
-            self.slideshow_frame.grid_propagate(True)
-
-        # Restart the slideshow timer
-        self.update_slideshow_id = self.after(4000, self.update_slideshow)
+            self._show_image(self.current_image_index - 1)
+        self._restart_timer()
 
 
 class LoginFrame(ctk.CTkFrame):
@@ -338,7 +667,8 @@ class LoginFrame(ctk.CTkFrame):
         ctk.CTkButton(form_frame, text="Forgot Password?", command=lambda: self.master.show_frame(ForgotPasswordFrame),
                       fg_color="transparent", text_color="#5dade2", hover=False).pack(anchor="e", padx=15, pady=(0, 10))
 
-        ctk.CTkButton(dark_frame, text="Login", command=self.login, width=250, height=35).pack(pady=10)
+        self.login_button = ctk.CTkButton(dark_frame, text="Login", command=self.login, width=250, height=35)
+        self.login_button.pack(pady=10)
         ctk.CTkButton(dark_frame, text="< Back to Home", command=lambda: self.master.show_frame(WelcomeFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
@@ -346,7 +676,10 @@ class LoginFrame(ctk.CTkFrame):
     def login(self):
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
-        user = User.login(self.db, username, password)
+        self.master.tasks.submit(User.login, self.db, username, password, on_success=self._on_login,
+                                 key="login", busy=self.login_button)
+
+    def _on_login(self, user):
         if user:
             self.master.login_success(user)
         else:
@@ -392,21 +725,25 @@ class RegisterFrame(ctk.CTkFrame):
             entry.grid(row=i, column=1, padx=15, pady=(10, 5))
             self.entries[label_text] = entry
 
-        ctk.CTkButton(dark_frame, text="Create Account", command=self.register, width=250, height=35).pack(pady=20)
+        self.register_button = ctk.CTkButton(dark_frame, text="Create Account", command=self.register, width=250,
+                                             height=35)
+        self.register_button.pack(pady=20)
         ctk.CTkButton(dark_frame, text="< Back to Home", command=lambda: self.master.show_frame(WelcomeFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
 
     def register(self):
-        # ... (register logic is unchanged) ...
         vals = {label: entry.get().strip() for label, entry in self.entries.items()}
         if not all(vals.values()): return messagebox.showerror("Error", "All fields are required.")
         if vals["Password"] != vals["Re-enter Password"]: return messagebox.showerror("Error",
                                                                                       "Passwords do not match.")
         if not vals["4-Digit UPI PIN"].isdigit() or len(vals["4-Digit UPI PIN"]) != 4: return messagebox.showerror(
             "Error", "UPI PIN must be 4 digits.")
-        success = User.register(self.db, vals["Username"], vals["Full Name"], vals["Phone Number"], vals["PAN Number"],
-                                vals["Password"], vals["4-Digit UPI PIN"])
+        self.master.tasks.submit(User.register, self.db, vals["Username"], vals["Full Name"], vals["Phone Number"],
+                                 vals["PAN Number"], vals["Password"], vals["4-Digit UPI PIN"],
+                                 on_success=self._on_registered, key="register", busy=self.register_button)
+
+    def _on_registered(self, success):
         if success:
             messagebox.showinfo("Success",
                                 "Account created successfully! A default Savings account has been added. You can now log in.")
@@ -422,6 +759,68 @@ class RegisterFrame(ctk.CTkFrame):
         self.clear_fields()
 
 
+def account_button_text(account):
+    return f"{account.account_type}\n₹{account.balance:,.2f}"
+
+
+class DashboardViewModel:
+    """The accounts DashboardFrame shows, keyed by id, and the widgets bound to them.
+
+    Widgets are created once and then updated in place: set_accounts() diffs the sidebar
+    buttons, and apply_transaction() pushes the balance and ledger row a model call
+    returned into the sidebar button, the balance label and the transaction table.
+    """
+
+    def __init__(self, accounts_frame, on_select):
+        self.accounts_frame = accounts_frame
+        self.on_select = on_select  # Called with the Account whose sidebar button was clicked
+        self.accounts = {}  # id -> Account, oldest first
+        self.buttons = {}  # id -> sidebar button
+        self.selected = None  # Account shown in the main content, with its balance label and pager
+        self.balance_label = None
+        self.pager = None
+
+    def set_accounts(self, accounts):
+        wanted = {acc.id: acc for acc in accounts}
+        for account_id in [i for i in self.buttons if i not in wanted]:
+            self.buttons.pop(account_id).destroy()
+        for acc in accounts:
+            if self.selected is not None and self.selected.id == acc.id:
+                # Keep the selected Account object, which the action buttons operate on
+                self.selected.balance = acc.balance
+                wanted[acc.id] = acc = self.selected
+            button = self.buttons.get(acc.id)
+            if button is None:
+                # Account ids only grow, so new buttons belong at the end
+                self.buttons[acc.id] = button = ctk.CTkButton(self.accounts_frame, anchor="w", height=50)
+                button.pack(fill="x", pady=(0, 5))
+            button.configure(text=account_button_text(acc), command=lambda a=acc: self.on_select(a))
+        self.accounts = wanted
+        if self.selected is not None:
+            self._show_balance(self.selected)
+
+    def bind_details(self, account, balance_label, pager):
+        self.selected, self.balance_label, self.pager = account, balance_label, pager
+
+    def unbind_details(self):
+        self.selected = self.balance_label = self.pager = None
+
+    def apply_transaction(self, account, balance, row=None):
+        """Shows ``account``'s new balance and, if it is the selected account, its new ledger row."""
+        account = self.accounts.get(account.id, account)
+        account.balance = balance
+        self._show_balance(account)
+        if row is not None and self.pager is not None and self.selected is account:
+            self.pager.prepend(row)
+
+    def _show_balance(self, account):
+        button = self.buttons.get(account.id)
+        if button is not None:
+            button.configure(text=account_button_text(account))
+        if self.balance_label is not None and self.selected is account:
+            self.balance_label.configure(text=f"₹{account.balance:,.2f}")
+
+
 class DashboardFrame(ctk.CTkFrame):
     # ... (This class is unchanged) ...
     def __init__(self, master, db: DB, logo_image):
@@ -461,6 +860,7 @@ class DashboardFrame(ctk.CTkFrame):
                                                                                                                sticky="ew")
         self.accounts_frame = ctk.CTkFrame(self.sidebar_frame, fg_color="transparent");
         self.accounts_frame.grid(row=3, column=0, sticky="nsew", padx=10)
+        self.view = DashboardViewModel(self.accounts_frame, self._display_account_details)
         ctk.CTkButton(self.sidebar_frame, text="＋ Create New Account", command=self.create_account_dialog).grid(row=5,
                                                                                                                 column=0,
                                                                                                                 padx=20,
@@ -477,12 +877,18 @@ class DashboardFrame(ctk.CTkFrame):
         if result:
             account_type, initial_deposit = result
             interest_rate = 0.00
-            new_account = create_account_for_user(self.db, self.user.id, account_type, initial_deposit, interest_rate)
-            messagebox.showinfo("Success",
-                                f"{account_type} account created successfully with number {new_account.account_number}.")
-            self.refresh_accounts()
+            user = self.user
+            self.master.tasks.submit(create_account_for_user, self.db, user.id, account_type, initial_deposit,
+                                     interest_rate, on_success=lambda account: self._on_account_created(user, account),
+                                     key=("create-account", user.id))
+
+    def _on_account_created(self, user, new_account):
+        messagebox.showinfo("Success",
+                            f"{new_account.account_type} account created successfully with number {new_account.account_number}.")
+        self._show_accounts(user, self.accounts + [new_account])
 
     def _clear_main_content(self):
+        self.view.unbind_details()
         for widget in self.main_content_frame.winfo_children(): widget.destroy()
 
     def _display_welcome_message(self):
@@ -506,8 +912,8 @@ class DashboardFrame(ctk.CTkFrame):
         balance_frame.pack(fill="x", pady=(0, 20))
         ctk.CTkLabel(balance_frame, text="Available Balance", font=ctk.CTkFont(size=14)).pack(pady=(10, 0), padx=20,
                                                                                               anchor="w")
-        ctk.CTkLabel(balance_frame, text=f"₹{acc.balance:,.2f}", font=ctk.CTkFont(size=32, weight="bold")).pack(
-            pady=(0, 10), padx=20, anchor="w")
+        balance_label = ctk.CTkLabel(balance_frame, text=f"₹{acc.balance:,.2f}", font=ctk.CTkFont(size=32, weight="bold"))
+        balance_label.pack(pady=(0, 10), padx=20, anchor="w")
         btn_frame = ctk.CTkFrame(self.main_content_frame, fg_color="transparent");
         btn_frame.pack(pady=5, fill="x")
         actions = {"＋ Deposit": self.deposit_dialog, "－ Withdraw": self.withdraw_dialog,
@@ -519,8 +925,8 @@ class DashboardFrame(ctk.CTkFrame):
                                                                                                                       10))
         ctk.CTkLabel(self.main_content_frame, text="Recent Transactions",
                      font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(20, 10), anchor="w")
-        self.txn_table = ttk.Treeview(self.main_content_frame, columns=("time", "type", "amount", "note"),
-                                      show="headings", height=15)
+        table_frame, self.txn_table, scrollbar = transaction_table(self.main_content_frame,
+                                                                   ("time", "type", "amount", "note"), height=15)
         self.txn_table.heading("time", text="Timestamp");
         self.txn_table.heading("type", text="Type");
         self.txn_table.heading("amount", text="Amount");
@@ -529,22 +935,26 @@ class DashboardFrame(ctk.CTkFrame):
         self.txn_table.column("type", width=100);
         self.txn_table.column("amount", width=120, anchor="e");
         self.txn_table.column("note", width=300)
-        self.txn_table.pack(fill="both", expand=True)
+        table_frame.pack(fill="both", expand=True)
+        self.txn_pager = TransactionPager(self.txn_table, scrollbar, self.master.tasks, None,
+                                          lambda r: (r["timestamp"], r["type"], f"₹{r['amount']:,.2f}", r["note"] or ""))
+        self.view.bind_details(acc, balance_label, self.txn_pager)
         self.load_transactions(acc)
 
     def refresh_accounts(self):
-        for widget in self.accounts_frame.winfo_children(): widget.destroy()
-        self.accounts = self.user.get_accounts()
-        for acc in self.accounts:
-            btn = ctk.CTkButton(self.accounts_frame, text=f"{acc.account_type}\n₹{acc.balance:,.2f}", anchor="w",
-                                command=lambda a=acc: self._display_account_details(a), height=50)
-            btn.pack(fill="x", pady=(0, 5))
+        # Repeated refreshes while one is loading share its result.
+        user = self.user
+        self.master.tasks.submit(user.get_accounts, on_success=lambda accounts: self._show_accounts(user, accounts),
+                                 key=("accounts", user.id))
+
+    def _show_accounts(self, user, accounts):
+        if user is not self.user: return  # Logged out (or another user logged in) while loading
+        self.view.set_accounts(accounts)
+        self.accounts = list(self.view.accounts.values())
 
     def load_transactions(self, acc: Account):
-        for i in self.txn_table.get_children(): self.txn_table.delete(i)
-        for r in acc.get_transactions(100): self.txn_table.insert("", "end", values=(r["timestamp"], r["type"],
-                                                                                     f"₹{r['amount']:,.2f}",
-                                                                                     r["note"] or ""))
+        self.txn_pager.reset(lambda after, before, limit: acc.get_transactions_page(after=after, before=before,
+                                                                                     limit=limit))
 
     def style_treeview(self):
         style = ttk.Style()
@@ -569,78 +979,123 @@ class DashboardFrame(ctk.CTkFrame):
 
     def deposit_dialog(self):
         if not self.selected_account: return messagebox.showwarning("Warning", "Select an account first.")
+        account = self.selected_account
         amt_str = self._get_input("Deposit", "Enter amount to deposit:")
         note = self._get_input("Note", "Optional note:")
         try:
             amt = float(amt_str)
-            self.selected_account.deposit(amt, note)
-            messagebox.showinfo("Success", "Deposit completed.")
-            self.refresh_accounts();
-            self._display_account_details(self.selected_account)
         except (ValueError, TypeError):
-            messagebox.showerror("Error", "Invalid amount.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+            return messagebox.showerror("Error", "Invalid amount.")
+        self.master.tasks.submit(account.deposit, amt, note,
+                                 on_success=lambda row: self._on_posted(account, row, "Deposit completed."),
+                                 on_error=lambda e: messagebox.showerror("Error", str(e)))
 
     def withdraw_dialog(self):
         if not self.selected_account: return messagebox.showwarning("Warning", "Select an account first.")
+        account = self.selected_account
         amt_str = self._get_input("Withdraw", "Enter amount to withdraw:")
         note = self._get_input("Note", "Optional note:")
         try:
-            self.selected_account.withdraw(float(amt_str), note)
-            messagebox.showinfo("Success", "Withdrawal completed.")
-            self.refresh_accounts();
-            self._display_account_details(self.selected_account)
+            amt = float(amt_str)
         except (ValueError, TypeError) as e:
-            messagebox.showerror("Error", str(e))
+            return messagebox.showerror("Error", str(e))
+        self.master.tasks.submit(account.withdraw, amt, note,
+                                 on_success=lambda row: self._on_posted(account, row, "Withdrawal completed."),
+                                 on_error=lambda e: messagebox.showerror("Error", str(e)))
+
+    # Deposits, withdrawals and transfers run on the task runner (with the payment queue, a call
+    # waits for its batch to commit); the dashboard is updated when they finish.
+    def _on_posted(self, account, row, message):
+        self.view.apply_transaction(account, account.balance, row)
+        messagebox.showinfo("Success", message)
 
     def transfer_dialog(self):
         if not self.selected_account: return messagebox.showwarning("Warning", "Select an account first.")
+        source = self.selected_account
         target_num = self._get_input("Transfer", "Enter target account number:")
         amt_str = self._get_input("Amount", "Enter amount to transfer:")
         note = self._get_input("Note", "Optional note:")
         try:
             amt = float(amt_str)
-            rows = self.db.query("SELECT * FROM accounts WHERE account_number = %s", (target_num,))
-            if not rows: raise ValueError("Target account not found.")
-            target_acc = Account.from_row(self.db, rows[0])
-            self.selected_account.withdraw(amt, f"Transfer to {target_acc.account_number}. {note or ''}")
-            target_acc.deposit(amt, f"Transfer from {self.selected_account.account_number}. {note or ''}")
-            messagebox.showinfo("Success", "Transfer completed.")
-            self.refresh_accounts();
-            self._display_account_details(self.selected_account)
         except (ValueError, TypeError) as e:
-            messagebox.showerror("Transfer Failed", str(e))
+            return messagebox.showerror("Transfer Failed", str(e))
+        self.master.tasks.submit(self._transfer, source, target_num, amt, note, on_success=self._on_transferred,
+                                 on_error=lambda e: messagebox.showerror("Transfer Failed", str(e)))
+
+    # Runs on a worker thread
+    def _transfer(self, source, target_num, amt, note):
+        rows = self.db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE account_number = %s", (target_num,))
+        if not rows: raise ValueError("Target account not found.")
+        target_acc = Account.from_row(self.db, rows[0])
+        result = TransferService(self.db).transfer(source, target_acc, amt,
+                                                   f"Transfer to {target_acc.account_number}. {note or ''}",
+                                                   f"Transfer from {source.account_number}. {note or ''}")
+        return source, target_acc, result
+
+    def _on_transferred(self, outcome):
+        source, target_acc, result = outcome
+        self.view.apply_transaction(source, result.source_balance, result.source_transaction)
+        # Only shown if the target is another of this user's accounts
+        if target_acc.id in self.view.accounts:
+            self.view.apply_transaction(target_acc, result.target_balance, result.target_transaction)
+        messagebox.showinfo("Success", "Transfer completed.")
 
     def apply_interest_selected(self):
         if not self.selected_account: return messagebox.showwarning("Warning", "Select an account first.")
         if self.selected_account.account_type.lower() != 'savings': return messagebox.showinfo("Info",
                                                                                                "Interest only applies to Savings accounts.")
-        sav = SavingsAccount(self.db, self.selected_account.id, self.selected_account.user_id,
-                             self.selected_account.account_number, self.selected_account.account_type,
-                             self.selected_account.balance, self.selected_account.interest_rate)
-        interest = sav.apply_interest()
+        account = self.selected_account
+        sav = SavingsAccount(self.db, account.id, account.user_id, account.account_number, account.account_type,
+                             account.balance, account.interest_rate)
+        self.master.tasks.submit(sav.apply_interest,
+                                 on_success=lambda interest: self._on_interest(account, sav, interest))
+
+    def _on_interest(self, account, sav, interest):
         if interest > 0:
+            self.view.apply_transaction(account, sav.balance, sav.last_transaction)
             messagebox.showinfo("Interest Applied", f"₹{interest:,.2f} has been applied.")
-            self.refresh_accounts();
-            self._display_account_details(self.selected_account)
         else:
             messagebox.showinfo("No Interest", "No interest was applied.")
 
     def show_statement(self):
         if not self.selected_account: return messagebox.showwarning("Warning", "Select an account first.")
+        account = self.selected_account
         win = ctk.CTkToplevel(self);
-        win.title(f"Statement - {self.selected_account.account_number}");
+        win.title(f"Statement - {account.account_number}");
         win.geometry("800x600")
-        tree = ttk.Treeview(win, columns=("time", "type", "amount", "note", "related"), show='headings');
-        tree.pack(fill='both', expand=True, padx=10, pady=10)
+        # Optional date range (inclusive); filtering is done by an index range scan in the DB
+        filter_frame = ctk.CTkFrame(win, fg_color="transparent");
+        filter_frame.pack(fill="x", padx=10, pady=(10, 0))
+        ctk.CTkLabel(filter_frame, text="From (YYYY-MM-DD)").pack(side="left", padx=(0, 5))
+        from_entry = ctk.CTkEntry(filter_frame, width=120);
+        from_entry.pack(side="left")
+        ctk.CTkLabel(filter_frame, text="To").pack(side="left", padx=5)
+        to_entry = ctk.CTkEntry(filter_frame, width=120);
+        to_entry.pack(side="left")
+        table_frame, tree, scrollbar = transaction_table(win, ("time", "type", "amount", "note", "related"))
+        table_frame.pack(fill='both', expand=True, padx=10, pady=10)
         self.style_treeview()
         for col in tree["columns"]: tree.heading(col, text=col.title())
-        for r in self.selected_account.get_transactions(limit=1000): tree.insert('', 'end',
-                                                                                 values=(r['timestamp'], r['type'],
-                                                                                         f"₹{r['amount']:,.2f}",
-                                                                                         r['note'] or '',
-                                                                                         r['related_account'] or ''))
+        # Pages through the whole statement as the user scrolls, holding a bounded window of rows
+        pager = TransactionPager(tree, scrollbar, self.master.tasks, None,
+                                 lambda r: (r['timestamp'], r['type'], f"₹{r['amount']:,.2f}", r['note'] or '',
+                                            r['related_account'] or ''))
+
+        def load():
+            try:
+                start = datetime.strptime(from_entry.get().strip(), "%Y-%m-%d") if from_entry.get().strip() else None
+                end = datetime.strptime(to_entry.get().strip(), "%Y-%m-%d") + timedelta(days=1) \
+                    if to_entry.get().strip() else None
+            except ValueError:
+                return messagebox.showerror("Invalid Date", "Dates must be in YYYY-MM-DD format.", parent=win)
+            pager.reset(lambda after, before, limit: account.get_transactions_page(start, end, after, before, limit))
+
+        ctk.CTkButton(filter_frame, text="Apply", command=load, width=80).pack(side="left", padx=10)
+        load()
+
+
+# Message box title for each refused UPI request
+UPI_ERROR_TITLES = {PaymentResult.AUTH_FAILED: "Auth Failed", PaymentResult.FAILED: "Payment Failed"}
 
 
 class QuickPayFrame(ctk.CTkFrame):
@@ -676,7 +1131,8 @@ class QuickPayFrame(ctk.CTkFrame):
         self.amount_entry = ctk.CTkEntry(form_frame, width=300, height=35);
         self.amount_entry.pack(pady=(0, 20), padx=15)
 
-        ctk.CTkButton(dark_frame, text="Pay Now", command=self.pay, width=250, height=35).pack(pady=10)
+        self.pay_button = ctk.CTkButton(dark_frame, text="Pay Now", command=self.pay, width=250, height=35)
+        self.pay_button.pack(pady=10)
         ctk.CTkButton(dark_frame, text="< Back to Home", command=lambda: self.master.show_frame(WelcomeFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
@@ -694,21 +1150,19 @@ class QuickPayFrame(ctk.CTkFrame):
         except ValueError:
             return messagebox.showerror("Error", "Invalid amount.")
         phone = upi_id.split('@')[0];
-        sender = User.verify_upi_pin(self.db, phone, pin)
-        if not sender: return messagebox.showerror("Auth Failed", "Invalid UPI ID or PIN.")
-        recipient_phone = recipient_upi.split('@')[0];
-        recipient = User.get_user_by_phone(self.db, recipient_phone)
-        if not recipient: return messagebox.showerror("Error", "Recipient UPI ID not found.")
-        sender_account = sender.get_primary_account();
-        recipient_account = recipient.get_primary_account()
-        if not sender_account or not recipient_account: return messagebox.showerror("Error", "Account error.")
-        try:
-            sender_account.withdraw(amount, f"UPI Pay to {recipient.fullname}")
-            recipient_account.deposit(amount, f"UPI Rcvd from {sender.fullname}")
-            messagebox.showinfo("Success", f"Successfully paid ₹{amount:,.2f} to {recipient.fullname}.")
-            self.master.show_frame(WelcomeFrame)
-        except ValueError as e:
-            messagebox.showerror("Payment Failed", str(e))
+        recipient_phone = recipient_upi.split('@')[0]
+        self.master.tasks.submit(self._pay, phone, pin, recipient_phone, amount, on_success=self._on_paid,
+                                 key="quick-pay", busy=self.pay_button)
+
+    # Runs on a worker thread; returns the PaymentResult for _on_paid.
+    def _pay(self, phone, pin, recipient_phone, amount):
+        return UPIPaymentService(self.db).pay(phone, pin, recipient_phone, amount)
+
+    def _on_paid(self, result):
+        if not result.ok:
+            return messagebox.showerror(UPI_ERROR_TITLES.get(result.status, "Error"), result.message)
+        messagebox.showinfo("Success", result.message)
+        self.master.show_frame(WelcomeFrame)
 
     def clear_fields(self):
         self.upi_id_entry.delete(0, 'end')
@@ -749,23 +1203,24 @@ class ViewBalanceFrame(ctk.CTkFrame):
         self.pin_entry = ctk.CTkEntry(form_frame, width=300, height=35, show="*");
         self.pin_entry.pack(pady=(0, 20), padx=15)
 
-        ctk.CTkButton(dark_frame, text="View Balance", command=self.check_balance, width=250, height=35).pack(pady=10)
+        self.balance_button = ctk.CTkButton(dark_frame, text="View Balance", command=self.check_balance, width=250,
+                                            height=35)
+        self.balance_button.pack(pady=10)
         ctk.CTkButton(dark_frame, text="< Back to Home", command=lambda: self.master.show_frame(WelcomeFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
 
     def check_balance(self):
-        # ... (check_balance logic is unchanged) ...
         upi_id = self.upi_id_entry.get().strip();
         pin = self.pin_entry.get().strip()
         phone = upi_id.split('@')[0];
-        user = User.verify_upi_pin(self.db, phone, pin)
-        if not user: return messagebox.showerror("Auth Failed", "Invalid UPI ID or PIN.")
-        account = user.get_primary_account()
-        if account:
-            messagebox.showinfo("Balance", f"Your primary account balance is: ₹{account.balance:,.2f}")
-        else:
-            messagebox.showerror("Error", "No account found for this user.")
+        self.master.tasks.submit(UPIPaymentService(self.db).balance_enquiry, phone, pin,
+                                 on_success=self._on_balance, key="upi-balance", busy=self.balance_button)
+
+    def _on_balance(self, result):
+        if not result.ok:
+            return messagebox.showerror(UPI_ERROR_TITLES.get(result.status, "Error"), result.message)
+        messagebox.showinfo("Balance", result.message)
 
     def clear_fields(self):
         self.upi_id_entry.delete(0, 'end')
@@ -794,17 +1249,21 @@ class CustomerCareFrame(ctk.CTkFrame):
         self.textbox = ctk.CTkTextbox(dark_frame, width=500, height=200);
         self.textbox.pack(pady=10, padx=20)
 
-        ctk.CTkButton(dark_frame, text="Submit Feedback", command=self.submit, width=250, height=35).pack(pady=10)
+        self.submit_button = ctk.CTkButton(dark_frame, text="Submit Feedback", command=self.submit, width=250,
+                                           height=35)
+        self.submit_button.pack(pady=10)
         ctk.CTkButton(dark_frame, text="< Back to Home", command=lambda: self.master.show_frame(WelcomeFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
 
     def submit(self):
-        # ... (submit logic is unchanged) ...
         message = self.textbox.get("1.0", "end-1c").strip()
         if not message: return messagebox.showerror("Error", "Feedback cannot be empty.")
         user_id = self.master.current_user.id if self.master.current_user else None
-        submit_feedback(self.db, message, user_id)
+        self.master.tasks.submit(submit_feedback, self.db, message, user_id, on_success=self._on_submitted,
+                                 key="feedback", busy=self.submit_button)
+
+    def _on_submitted(self, _):
         messagebox.showinfo("Success", "Your feedback has been submitted. Thank you!")
         self.master.show_frame(WelcomeFrame)
 
@@ -856,16 +1315,21 @@ class ForgotPasswordFrame(ctk.CTkFrame):
         self.phone_entry = ctk.CTkEntry(form_frame, width=250, height=35);
         self.phone_entry.pack(pady=(0, 20), padx=15)
 
-        ctk.CTkButton(dark_frame, text="Verify", command=self.verify, width=250, height=35).pack(pady=10)
+        self.verify_button = ctk.CTkButton(dark_frame, text="Verify", command=self.verify, width=250, height=35)
+        self.verify_button.pack(pady=10)
         ctk.CTkButton(dark_frame, text="< Back to Login", command=lambda: self.master.show_frame(LoginFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
 
     def verify(self):
-        # ... (verify is unchanged) ...
         username = self.username_entry.get().strip();
         phone = self.phone_entry.get().strip()
-        if User.verify_phone_for_reset(self.db, username, phone):
+        self.master.tasks.submit(User.verify_phone_for_reset, self.db, username, phone,
+                                 on_success=lambda ok: self._on_verified(username, ok), key="reset-verify",
+                                 busy=self.verify_button)
+
+    def _on_verified(self, username, ok):
+        if ok:
             self.verified_username = username;
             self._show_reset_step()
         else:
@@ -895,16 +1359,19 @@ class ForgotPasswordFrame(ctk.CTkFrame):
         self.confirm_pass_entry = ctk.CTkEntry(form_frame, width=250, height=35, show="*");
         self.confirm_pass_entry.pack(pady=(0, 20), padx=15)
 
-        ctk.CTkButton(dark_frame, text="Reset Password", command=self.reset_password, width=250, height=35).pack(
-            padx=40, pady=(0, 20))
+        self.reset_button = ctk.CTkButton(dark_frame, text="Reset Password", command=self.reset_password, width=250,
+                                          height=35)
+        self.reset_button.pack(padx=40, pady=(0, 20))
 
     def reset_password(self):
-        # ... (reset_password is unchanged) ...
         new_pass = self.new_pass_entry.get();
         confirm_pass = self.confirm_pass_entry.get()
         if not new_pass or not confirm_pass: return messagebox.showerror("Error", "Password fields cannot be empty.")
         if new_pass != confirm_pass: return messagebox.showerror("Error", "Passwords do not match.")
-        User.update_password(self.db, self.verified_username, new_pass)
+        self.master.tasks.submit(User.update_password, self.db, self.verified_username, new_pass,
+                                 on_success=self._on_reset, key="reset-password", busy=self.reset_button)
+
+    def _on_reset(self, _):
         messagebox.showinfo("Success", "Password has been reset successfully. Please log in.")
         self.master.show_frame(LoginFrame)
 
@@ -937,16 +1404,20 @@ class AdminLoginFrame(ctk.CTkFrame):
         self.password_entry = ctk.CTkEntry(form_frame, show="*", width=250, height=35);
         self.password_entry.pack(pady=(0, 20), padx=15)
 
-        ctk.CTkButton(dark_frame, text="Login", command=self.login, width=250, height=35).pack(pady=10)
+        self.login_button = ctk.CTkButton(dark_frame, text="Login", command=self.login, width=250, height=35)
+        self.login_button.pack(pady=10)
         ctk.CTkButton(dark_frame, text="< Back to Home", command=lambda: self.master.show_frame(WelcomeFrame),
                       width=250, height=35, fg_color="transparent", border_width=1, border_color="gray50").pack(
             pady=(0, 20))
 
     def login(self):
-        # ... (login logic is unchanged) ...
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
-        if admin_login(self.db, username, password):
+        self.master.tasks.submit(admin_login, self.db, username, password, on_success=self._on_login,
+                                 key="admin-login", busy=self.login_button)
+
+    def _on_login(self, ok):
+        if ok:
             self.master.show_frame(AdminDashboardFrame)
         else:
             messagebox.showerror("Login Failed", "Invalid admin credentials.")
@@ -966,6 +1437,7 @@ class AdminDashboardFrame(ctk.CTkFrame):
         self.master = master;
         self.db = db;
         self.current_view = None
+        self.chart_photos = {}  # Analytics chart name -> PhotoImage, reused between visits
         self.grid_columnconfigure(1, weight=1);
         self.grid_rowconfigure(0, weight=1)
         self.sidebar = ctk.CTkFrame(self, width=200, corner_radius=0);
@@ -988,6 +1460,7 @@ class AdminDashboardFrame(ctk.CTkFrame):
         self.show_customer_management()
 
     def _clear_content(self):
+        self.master.tasks.cancel("admin-content")
         for widget in self.main_content.winfo_children(): widget.destroy()
 
     def show_customer_management(self):
@@ -997,64 +1470,50 @@ class AdminDashboardFrame(ctk.CTkFrame):
         controls_frame = ctk.CTkFrame(self.main_content, fg_color="transparent");
         controls_frame.pack(fill="x", pady=10)
         ctk.CTkButton(controls_frame, text="Delete Selected User", command=self.delete_selected_user).pack(side="left")
-        columns = ("id", "fullname", "username", "phone_number", "pan_number")
-        self.user_table = ttk.Treeview(self.main_content, columns=columns, show="headings")
-        for col in columns: self.user_table.heading(col, text=col.title().replace("_", " "))
-        self.user_table.pack(fill="both", expand=True, pady=10)
+        # Searching, sorting and paging all run in SQL, so the table stays small however many users there are
+        self.user_pages = PagedTable(
+            self.main_content, self.master.tasks,
+            lambda *page: search_users(self.db, *page, cache=True), USER_SORT_KEYS,
+            [(col, col.title().replace("_", " ")) for col in ("id", "fullname", "username", "phone_number",
+                                                              "pan_number")],
+            lambda user: (user['id'], user['fullname'], user['username'], user['phone_number'], user['pan_number']),
+            sort="fullname", task_key="admin-content")
+        self.user_table = self.user_pages.tree
+        self.user_pages.frame.pack(fill="both", expand=True)
         self.refresh_user_table()
 
     def refresh_user_table(self):
-        for i in self.user_table.get_children(): self.user_table.delete(i)
-        for user in get_all_users(self.db): self.user_table.insert("", "end", values=(user['id'], user['fullname'],
-                                                                                      user['username'],
-                                                                                      user['phone_number'],
-                                                                                      user['pan_number']))
+        self.user_pages.refresh()
 
     # --- NEW METHODS FOR VIEWING ACCOUNTS ---
     def show_accounts_view(self):
-        """Clears the main content and displays a table of all customer accounts."""
+        """Clears the main content and displays a paged table of customer accounts."""
         self._clear_content()
         ctk.CTkLabel(self.main_content, text="All Customer Accounts", font=ctk.CTkFont(size=24, weight="bold")).pack(
             anchor="w", pady=(0, 10))
 
-        # Create the Treeview widget to display accounts
-        columns = ("fullname", "account_number", "type", "balance")
-        self.account_table = ttk.Treeview(self.main_content, columns=columns, show="headings")
-
-        # Define column headings
-        self.account_table.heading("fullname", text="Customer Name")
-        self.account_table.heading("account_number", text="Account Number")
-        self.account_table.heading("type", text="Account Type")
-        self.account_table.heading("balance", text="Balance")
+        columns = [("fullname", "Customer Name"), ("account_number", "Account Number"), ("account_type", "Account Type"),
+                   ("balance", "Balance")]
+        self.account_pages = PagedTable(
+            self.main_content, self.master.tasks,
+            lambda *page: search_accounts(self.db, *page, cache=True), ACCOUNT_SORT_KEYS, columns,
+            # Format the balance with a currency symbol and comma separators
+            lambda acc: (acc['fullname'], acc['account_number'], acc['account_type'], f"₹{acc['balance']:,.2f}"),
+            sort="fullname", task_key="admin-content")
+        self.account_table = self.account_pages.tree
 
         # Configure column properties
         self.account_table.column("fullname", width=250)
         self.account_table.column("account_number", width=200)
-        self.account_table.column("type", width=120)
+        self.account_table.column("account_type", width=120)
         self.account_table.column("balance", width=150, anchor="e")  # Right-align the balance
 
-        self.account_table.pack(fill="both", expand=True, pady=10)
+        self.account_pages.frame.pack(fill="both", expand=True, pady=10)
         self.refresh_accounts_table()
 
     def refresh_accounts_table(self):
-        """Fetches all account data and populates the account table."""
-        # Clear any existing items in the table
-        for item in self.account_table.get_children():
-            self.account_table.delete(item)
-
-        # Get data using the new function
-        all_accounts = get_all_accounts_details(self.db)
-
-        # Insert each account into the table
-        for acc in all_accounts:
-            # Format the balance with a currency symbol and comma separators
-            balance_formatted = f"₹{acc['balance']:,.2f}"
-            self.account_table.insert("", "end", values=(
-                acc['fullname'],
-                acc['account_number'],
-                acc['account_type'],
-                balance_formatted
-            ))
+        """Reloads the current page of the account table."""
+        self.account_pages.refresh()
 
     # --- END OF NEW METHODS ---
 
@@ -1064,9 +1523,36 @@ class AdminDashboardFrame(ctk.CTkFrame):
         user_id = self.user_table.item(selected_item[0])['values'][0]
         if messagebox.askyesno("Confirm Deletion",
                                f"Are you sure you want to delete user ID {user_id}? This is irreversible."):
-            delete_user(self.db, user_id)
-            self.refresh_user_table()
-            messagebox.showinfo("Success", "User has been deleted.")
+            self.master.tasks.submit(delete_user, self.db, user_id, on_success=self._on_user_deleted,
+                                     key=("delete-user", user_id))
+
+    def _on_user_deleted(self, _):
+        self.refresh_user_table()
+        messagebox.showinfo("Success", "User has been deleted.")
+
+    def _show_key_figures(self, figures, plot_frame):
+        summary, balances, amounts = figures["summary"], figures["balances"], figures["amounts"]
+        strip = ctk.CTkFrame(self.main_content, fg_color="transparent")
+        strip.pack(fill="x", before=plot_frame)
+
+        def money(value):
+            return "-" if value is None else f"₹{value:,.0f}"
+
+        tiles = [
+            ("Customers", f"{summary['customers']:,}"),
+            ("Accounts", f"{summary['accounts']:,}"),
+            ("Total Balance", money(summary['total_balance'])),
+            ("Median / P90 / P99 Customer Balance",
+             " / ".join(money(balances[p]) for p in (50, 90, 99))),
+            ("Transactions", f"{summary['transactions']:,}"),
+            ("Median / P95 Transaction", " / ".join(money(amounts[p]) for p in (50, 95))),
+        ]
+        for column, (title, value) in enumerate(tiles):
+            tile = ctk.CTkFrame(strip, corner_radius=8)
+            tile.grid(row=0, column=column, padx=5, pady=5, sticky="nsew")
+            strip.grid_columnconfigure(column, weight=1)
+            ctk.CTkLabel(tile, text=title, font=ctk.CTkFont(size=11)).pack(padx=10, pady=(8, 0))
+            ctk.CTkLabel(tile, text=value, font=ctk.CTkFont(size=16, weight="bold")).pack(padx=10, pady=(0, 8))
 
     # Replace the existing show_analytics method in AdminDashboardFrame with this one.
 
@@ -1076,41 +1562,68 @@ class AdminDashboardFrame(ctk.CTkFrame):
             anchor="w")
         plot_frame = ctk.CTkFrame(self.main_content, fg_color="transparent");
         plot_frame.pack(fill="both", expand=True, pady=10)
-
-        balance_data = get_users_by_balance(self.db)
-        if balance_data:
-            df_balance = pd.DataFrame(balance_data)
-
-            # --- FIX APPLIED HERE ---
-            # Ensure the 'balance' column is a numeric type before plotting
-            df_balance['balance'] = pd.to_numeric(df_balance['balance'])
-            # --- END OF FIX ---
-
-            fig1, ax1 = plt.subplots(figsize=(6, 4))
-            df_balance.plot(kind='bar', x='fullname', y='balance', ax=ax1, legend=False, color='#3b8ed0')
-            ax1.set_title('Top 5 Customers by Balance');
-            ax1.set_ylabel('Balance (₹)');
-            ax1.set_xlabel('')
-            plt.tight_layout()
-            canvas1 = FigureCanvasTkAgg(fig1, master=plot_frame)
-            canvas1.draw();
-            canvas1.get_tk_widget().pack(side="left", fill="both", expand=True, padx=10)
-
-        txn_data = get_users_by_transaction_count(self.db)
-        if txn_data:
-            df_txn = pd.DataFrame(txn_data)
-
-            # --- FIX APPLIED HERE (for consistency) ---
-            # Also ensure the 'transaction_count' column is numeric
-            df_txn['transaction_count'] = pd.to_numeric(df_txn['transaction_count'])
-            # --- END OF FIX ---
-
-            fig2, ax2 = plt.subplots(figsize=(6, 4))
-            df_txn.plot(kind='bar', x='fullname', y='transaction_count', ax=ax2, legend=False, color='#5cb85c')
-            ax2.set_title('Top 5 Most Active Customers');
-            ax2.set_ylabel('Number of Transactions');
-            ax2.set_xlabel('')
-            plt.tight_layout()
-            canvas2 = FigureCanvasTkAgg(fig2, master=plot_frame)
-            canvas2.draw();
-            canvas2.get_tk_widget().pack(side="left", fill="both", expand=True, padx=10)
\ No newline at end of file
+        loading = ctk.CTkLabel(plot_frame, text="Loading analytics...")
+        loading.pack(pady=20)
+        width = max(self.main_content.winfo_width(), 800)  # Charts are drawn to fit the current content area
+
+        def fetch():
+            # Runs on a worker: queries, chart updates and rendering never block the Tk thread
+            with _ANALYTICS_LOCK:
+                return build()
+
+        def build():
+            charts = analytics_charts()
+            engine = analytics_engine(self.db)
+            engine.refresh()
+            today = datetime.now().date()
+            figures = {
+                "summary": engine.summary(),
+                "balances": engine.balance_percentiles((50, 90, 99), per_user=True),
+                "amounts": engine.amount_percentiles((50, 95)),
+            }
+            monthly = engine.volume("month", start=today.replace(year=today.year - 1, day=1))
+            balance_data = get_users_by_balance(self.db, cache=True)
+            txn_data = get_users_by_transaction_count(self.db, cache=True)
+
+            images = {}
+            if len(monthly["period"]):
+                charts["monthly"].update([str(month) for month in monthly["period"]], monthly["deposits"],
+                                         -monthly["withdrawals"])
+                images["monthly"] = charts["monthly"].render(width, 260)
+            if balance_data:
+                charts["balance"].update([row['fullname'] for row in balance_data],
+                                         [row['balance'] for row in balance_data])
+                images["balance"] = charts["balance"].render(width // 2 - 20, 360)
+            if txn_data:
+                charts["activity"].update([row['fullname'] for row in txn_data],
+                                          [row['transaction_count'] for row in txn_data])
+                images["activity"] = charts["activity"].render(width // 2 - 20, 360)
+            return figures, images
+
+        def show(data):
+            loading.destroy()
+            figures, images = data
+            self._show_key_figures(figures, plot_frame)
+            self._show_charts(plot_frame, images)
+
+        # Replacing any admin view still loading, so a slow result never lands on the wrong page.
+        self.master.tasks.submit(fetch, on_success=show, key="admin-content", replace=True)
+
+    def _show_charts(self, plot_frame, images):
+        # Each chart keeps one PhotoImage across visits; a new rendering of the same size is
+        # pasted into it rather than creating another Tk image.
+        top_row = ctk.CTkFrame(plot_frame, fg_color="transparent")
+        for name in ("monthly", "balance", "activity"):
+            image = images.get(name)
+            if image is None:
+                continue
+            photo = self.chart_photos.get(name)
+            if photo is None or (photo.width(), photo.height()) != image.size:
+                photo = self.chart_photos[name] = ImageTk.PhotoImage(image)
+            else:
+                photo.paste(image)
+            if name == "monthly":
+                ttk.Label(plot_frame, image=photo).pack(fill="x", padx=10, pady=(0, 10))
+            else:
+                ttk.Label(top_row, image=photo).pack(side="left", fill="both", expand=True, padx=10)
+        top_row.pack(fill="both", expand=True)
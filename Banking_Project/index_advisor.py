@@ -0,0 +1,118 @@
+# filename: index_advisor.py
+"""
+Index advisor: runs EXPLAIN on every SQL statement in the application code and
+reports full table/index scans and sorts.
+
+Usage (from the Banking_Project folder):
+    python index_advisor.py                      # scans models.py, gui.py and services.py
+    python index_advisor.py --backend sqlite models.py
+
+Plans depend on table sizes, so run it against a realistically sized database
+(see seed.py). Exits with status 1 when any statement still scans a whole table.
+"""
+import argparse
+import ast
+import re
+import sys
+
+from config import DB_BACKEND
+from database import DB
+
+DEFAULT_FILES = ("models.py", "gui.py", "services.py")
+# Application SQL is written in upper case, which keeps UI labels like "Select an account" out.
+SQL_STATEMENT = re.compile(r"^\s*(SELECT\b.*\bFROM|UPDATE\s+\w+\s+SET|DELETE\s+FROM)\b", re.S)
+# A %s placeholder right after LIMIT must be a number; any other becomes a string literal so
+# comparisons against indexed VARCHAR columns are not turned into type conversions.
+LIMIT_PLACEHOLDER = re.compile(r"\bLIMIT\s+%s", re.I)
+
+
+def _module_constants(trees):
+    # Module-level NAME = "string" assignments, used to resolve f-strings like f"SELECT {USER_COLUMNS} ..."
+    constants = {}
+    for tree in trees:
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) \
+                    and isinstance(node.value.value, str):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        constants[target.id] = node.value.value
+    return constants
+
+
+def _string_value(node, constants):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            elif isinstance(value.value, ast.Name) and value.value.id in constants:
+                parts.append(constants[value.value.id])
+            else:
+                return None  # Depends on a runtime value; cannot be explained statically
+        return "".join(parts)
+    return None
+
+
+def find_statements(paths):
+    """Returns (path, line, sql) for every SELECT/UPDATE/DELETE string literal in ``paths``."""
+    trees = {path: ast.parse(open(path, encoding="utf-8").read(), path) for path in paths}
+    constants = _module_constants(trees.values())
+    statements = []
+    for path, tree in trees.items():
+        # The literal pieces of an f-string are visited as part of the f-string itself.
+        pieces = {id(value) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for value in node.values}
+        for node in ast.walk(tree):
+            sql = None if id(node) in pieces else _string_value(node, constants)
+            if sql and SQL_STATEMENT.match(sql):
+                statements.append((path, node.lineno, sql))
+    return sorted(statements, key=lambda s: (s[0], s[1]))
+
+
+def _explainable(sql):
+    sql = LIMIT_PLACEHOLDER.sub("LIMIT 1", sql)
+    return sql.replace("%s", "'1'")
+
+
+def analyze(db: DB, statements):
+    """EXPLAINs each statement; returns a list of (path, line, sql, findings or error)."""
+    results = []
+    for path, line, sql in statements:
+        try:
+            findings = db.backend.plan_findings(db.explain(_explainable(sql)))
+        except db.backend.Error as err:
+            findings = [f"could not explain: {err}"]
+        results.append((path, line, sql, findings))
+    return results
+
+
+def report(results):
+    flagged = 0
+    for path, line, sql, findings in results:
+        statement = " ".join(sql.split())
+        status = "OK  " if not findings else "SCAN" if any("full table scan" in f for f in findings) else "NOTE"
+        flagged += status == "SCAN"
+        print(f"[{status}] {path}:{line}  {statement[:110]}")
+        for finding in findings:
+            print(f"         - {finding}")
+    print(f"\n{len(results)} statements explained, {flagged} with full table scans.")
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every SQL statement in the app and report full scans.")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default=DB_BACKEND)
+    args = parser.parse_args()
+
+    try:
+        db = DB(backend=args.backend)
+    except ConnectionError as err:
+        parser.exit(1, f"Could not connect to the database: {err}\n")
+    flagged = report(analyze(db, find_statements(args.files)))
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
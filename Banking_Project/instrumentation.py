@@ -0,0 +1,265 @@
+# filename: instrumentation.py
+"""
+SQL instrumentation for DB.
+
+QueryStats groups statements by their normalized text (literals and placeholders
+replaced by ?, IN lists and multi-row VALUES collapsed) and keeps, per statement:
+call count, errors, rows, total/min/max time, a latency histogram and the
+application functions that issued it. Statements slower than SLOW_QUERY_MS are
+also written to a bounded slow-query log together with their EXPLAIN plan.
+
+    db.stats.report()          # text table, most expensive statements first
+    db.stats.export("q.json")  # the same data as JSON
+    with db.stats.action("Admin: Top 5"):
+        ...                    # also totals statements and DB time per user action
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\bIN \((?:\?, )*\?\)", re.I), "IN (...)"),
+    (re.compile(r"\bVALUES \((?:\?, )*\?\)(?:, \((?:\?, )*\?\))+", re.I), "VALUES (...), ..."),
+]
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames skipped when attributing a statement to the application code that issued it.
+_INTERNAL_FILES = {os.path.join(_THIS_DIR, "database.py"), os.path.join(_THIS_DIR, "instrumentation.py"),
+                   contextmanager.__code__.co_filename}
+
+
+@lru_cache(maxsize=1024)
+def normalize(sql):
+    """Statement text with its literal values removed, used to group executions."""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _caller():
+    # "file.py:function" of the first frame outside the DB layer, e.g. "models.py:get_transactions".
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+class _Statement:
+    """Accumulated measurements for one normalized statement."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.callers = {}
+
+    def add(self, ms, rows, caller, failed):
+        self.calls += 1
+        self.errors += failed
+        self.rows += rows
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        self.histogram[_bucket(ms)] += 1
+        self.callers[caller] = self.callers.get(caller, 0) + 1
+
+    def percentile(self, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of calls."""
+        target = fraction * self.calls
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "statement": self.sql,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "min_ms": round(self.min_ms or 0.0, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "histogram": {label: count for label, count in zip(_BUCKET_LABELS, self.histogram) if count},
+            "callers": dict(sorted(self.callers.items(), key=lambda item: -item[1])),
+        }
+
+
+_BUCKET_LABELS = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+
+
+def _bucket(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS)
+
+
+class _Probe:
+    """Handed to the instrumented block so it can report how many rows it touched."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+
+class QueryStats:
+    """Thread-safe statement statistics and slow-query log for one DB."""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_log_size=SLOW_QUERY_LOG_SIZE, explain=None, enabled=True):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._explain = explain  # (sql, params) -> plan rows, for slow statements
+        self._statements = {}
+        self._actions = {}  # name -> [runs, statements, db ms]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    @contextmanager
+    def measure(self, sql, params=()):
+        """Times the block as one execution of ``sql``; set ``.rows`` on the yielded probe."""
+        probe = _Probe()
+        if not self.enabled:
+            yield probe
+            return
+        failed = True
+        start = time.perf_counter()
+        try:
+            yield probe
+            failed = False
+        finally:
+            self.record(sql, (time.perf_counter() - start) * 1000, probe.rows, failed, params)
+
+    def record(self, sql, ms, rows=0, failed=False, params=()):
+        key = normalize(sql)
+        caller = _caller()
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is None:
+                statement = self._statements[key] = _Statement(key)
+            statement.add(ms, max(rows, 0), caller, failed)
+        action = getattr(self._local, "action", None)
+        if action is not None:
+            action[1] += 1
+            action[2] += ms
+        if ms >= self.slow_ms and not failed:
+            self._log_slow(sql, params, ms, rows, caller)
+
+    def _log_slow(self, sql, params, ms, rows, caller):
+        plan = None
+        if self._explain is not None and re.match(r"\s*(SELECT|UPDATE|DELETE)\b", sql, re.I):
+            try:
+                plan = self._explain(sql, params)
+            except Exception as err:
+                plan = f"EXPLAIN failed: {err}"
+        self.slow_log.append({
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "ms": round(ms, 3),
+            "rows": rows,
+            "caller": caller,
+            "statement": " ".join(sql.split()),
+            "params": [str(p) for p in params],
+            "plan": plan,
+        })
+
+    @contextmanager
+    def action(self, name):
+        """Totals the statements run by this thread inside the block under ``name``."""
+        outer = getattr(self._local, "action", None)
+        current = self._local.action = [name, 0, 0.0]
+        try:
+            yield
+        finally:
+            self._local.action = outer
+            with self._lock:
+                totals = self._actions.setdefault(name, [0, 0, 0.0])
+                totals[0] += 1
+                totals[1] += current[1]
+                totals[2] += current[2]
+            if outer is not None:
+                outer[1] += current[1]
+                outer[2] += current[2]
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._actions.clear()
+            self.slow_log.clear()
+            self.started = time.time()
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    def snapshot(self):
+        """All measurements as plain data, statements sorted by total time."""
+        with self._lock:
+            statements = sorted((s.to_dict() for s in self._statements.values()), key=lambda s: -s["total_ms"])
+            actions = {name: {"runs": runs, "statements": count, "db_ms": round(ms, 3),
+                              "avg_db_ms": round(ms / runs, 3), "avg_statements": round(count / runs, 1)}
+                       for name, (runs, count, ms) in self._actions.items()}
+            slow = list(self.slow_log)
+        return {
+            "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "total_ms": round(sum(s["total_ms"] for s in statements), 3),
+            "statements": statements,
+            "actions": actions,
+            "slow_queries": slow,
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent, default=str)
+
+    def export(self, path):
+        """Writes the JSON snapshot to ``path`` (or a text report if it ends in .txt)."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report() if path.endswith(".txt") else self.to_json())
+
+    def report(self, top=20):
+        data = self.snapshot()
+        lines = [f"SQL statistics since {data['since']} - {data['total_ms']:,.1f} ms total DB time", "",
+                 f"{'calls':>7} {'total ms':>10} {'avg':>8} {'p95':>8} {'max':>9} {'rows':>9}  statement / callers"]
+        for s in data["statements"][:top]:
+            lines.append(f"{s['calls']:>7} {s['total_ms']:>10,.1f} {s['avg_ms']:>8.2f} {s['p95_ms']:>8g} "
+                         f"{s['max_ms']:>9.1f} {s['rows']:>9,}  {s['statement'][:100]}")
+            lines.append(f"{'':>56}  {', '.join(f'{c} x{n}' for c, n in s['callers'].items())}")
+        if data["actions"]:
+            lines += ["", f"{'runs':>7} {'avg stmts':>10} {'avg db ms':>10}  action"]
+            for name, a in sorted(data["actions"].items(), key=lambda item: -item[1]["db_ms"]):
+                lines.append(f"{a['runs']:>7} {a['avg_statements']:>10} {a['avg_db_ms']:>10.2f}  {name}")
+        if data["slow_queries"]:
+            lines += ["", f"Slow queries (>= {self.slow_ms} ms):"]
+            for q in data["slow_queries"]:
+                lines.append(f"  {q['at']} {q['ms']:>9.1f} ms  {q['caller']}  {q['statement'][:100]}")
+                for row in q["plan"] if isinstance(q["plan"], list) else [q["plan"]] if q["plan"] else []:
+                    lines.append(f"      {row}")
+        return "\n".join(lines)
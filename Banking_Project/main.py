@@ -1,13 +1,34 @@
 # filename: main.py
+import sys
+
+from profiling import STARTUP, ImportProfiler  # Imported first: its clock measures the whole startup
+
+# python main.py --import-profile prints how long each module took to import.
+IMPORT_PROFILE = ImportProfiler().install() if "--import-profile" in sys.argv else None
+
+from config import QUERY_STATS_EXPORT
 from database import DB  # <-- This line was corrected
 from gui import BankingApp
 
+STARTUP.mark("imports")
+if IMPORT_PROFILE:
+    print(IMPORT_PROFILE.report())
+
 if __name__ == '__main__':
     # 1. Establish the database connection
-    db_connection = DB()
+    try:
+        db_connection = DB()
+    except ConnectionError as err:
+        sys.exit(f"Could not connect to the database: {err}")
+    STARTUP.mark("database ready")
 
     # 2. Create an instance of the main GUI class
     app = BankingApp(db_connection)
+    STARTUP.mark("window built")
 
     # 3. Start the application's main loop
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+
+    # 4. Save the SQL statistics gathered during the session, if configured
+    if QUERY_STATS_EXPORT:
+        db_connection.stats.export(QUERY_STATS_EXPORT)
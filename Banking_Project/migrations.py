@@ -0,0 +1,255 @@
+# filename: migrations.py
+"""
+Versioned schema migrations.
+
+MIGRATIONS is an ordered list of (version, description, steps). A step is either
+an SQL statement (MySQL dialect, translated by the active backend) or a function
+that receives the DB. The schema_version table records which versions have been
+applied, so once a database is current, startup costs a single query.
+
+To change the schema, append a new entry with the next version number; never
+edit a migration that has already shipped.
+"""
+import hashlib
+import random
+import string
+from datetime import datetime
+
+from summaries import SUMMARY_TABLES, rebuild_summaries
+
+# Initial schema
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(255) UNIQUE NOT NULL,
+        fullname VARCHAR(255),
+        phone_number VARCHAR(20) UNIQUE NOT NULL,
+        pan_number VARCHAR(10) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        upi_pin_hash VARCHAR(255) NOT NULL,
+        created_at VARCHAR(255)
+    )""",
+    """CREATE TABLE IF NOT EXISTS accounts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        account_number VARCHAR(255) UNIQUE NOT NULL,
+        account_type VARCHAR(255) NOT NULL,
+        balance DECIMAL(15, 2) DEFAULT 0.00,
+        interest_rate DECIMAL(5, 4) DEFAULT 0.0000,
+        created_at VARCHAR(255),
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        account_id INT NOT NULL,
+        type VARCHAR(255) NOT NULL,
+        amount DECIMAL(15, 2) NOT NULL,
+        timestamp VARCHAR(255),
+        note TEXT,
+        related_account VARCHAR(255),
+        FOREIGN KEY (account_id) REFERENCES accounts (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS feedback (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        message TEXT NOT NULL,
+        timestamp VARCHAR(255),
+        status VARCHAR(50) DEFAULT 'New',
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL
+    )""",
+    # Admin table
+    """CREATE TABLE IF NOT EXISTS admins (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(255) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL
+    )""",
+]
+
+# Tables whose rows change when a row of the key table is deleted (ON DELETE CASCADE / SET NULL).
+DEPENDENT_TABLES = {
+    "users": ("accounts", "transactions", "feedback", "user_summary"),
+    "accounts": ("transactions",),
+}
+
+
+def seed_admin(db):
+    """Creates a default admin user if no admins exist."""
+    if not db.query("SELECT id FROM admins LIMIT 1"):
+        print("Creating default admin user...")
+        username = "admin"
+        password = "password"
+        pw_hash = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        db.execute("INSERT INTO admins (username, password_hash) VALUES (%s, %s)", (username, pw_hash))
+        print("Default Admin Created -> Username: admin, Password: password")
+
+
+def seed_customers(db):
+    """Creates 25 default customer users if the users table is empty."""
+    if db.query("SELECT id FROM users LIMIT 1"):
+        return  # Skip seeding if users already exist
+
+    print("Seeding default customer data...")
+
+    customer_names = [
+        "Akanksha Singh", "Akhil Dadhich", "Amisha Nath", "Aryan Nishen", "Bhavana Uliyar",
+        "Gaurav Kumar J", "Hareesh Nayak", "Kunaljit Roy", "Madhuchandra R", "Melvin Basutkar",
+        "Mohith Reddy PN", "Monisha K M", "Nanthitha M S", "Nikhil P", "Parvath J",
+        "Peram Varshitha", "Pratyush Jaishankar", "Rahul K S", "Ramya Hunagund", "Ritesh R",
+        "Siddalingesha G", "Sushma Dodamani", "Taran Vadivelan", "Vaishnavi M", "Vaishnavi Shrikanth"
+    ]
+
+    # Sample transactions for analytics: (customer index, type, amount, note)
+    sample_transactions = [
+        (0, 'DEPOSIT', 1500.00, 'Salary Credit'),
+        (0, 'WITHDRAW', 200.00, 'ATM Withdrawal'),
+        (0, 'DEPOSIT', 50.00, 'Cashback'),
+        (1, 'DEPOSIT', 5000.00, 'Initial Deposit'),
+        (1, 'WITHDRAW', 1000.00, 'Online Shopping'),
+        (2, 'WITHDRAW', 500.00, 'Bill Payment'),
+    ]
+
+    used_mobiles = set()
+    used_pans = set()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    user_rows = []
+
+    for full_name in customer_names:
+        # 1. Generate Username
+        name_parts = full_name.lower().split()
+        username = f"{name_parts[0]}.{name_parts[-1][0]}"
+
+        # 2. Generate unique 10-digit mobile number
+        while True:
+            mobile = str(random.randint(6, 9)) + "".join([str(random.randint(0, 9)) for _ in range(9)])
+            if mobile not in used_mobiles:
+                used_mobiles.add(mobile)
+                break
+
+        # 3. Generate unique 10-digit PAN number
+        while True:
+            pan = "".join(random.choices(string.ascii_uppercase, k=5)) + \
+                  "".join(random.choices(string.digits, k=4)) + \
+                  random.choice(string.ascii_uppercase)
+            if pan not in used_pans:
+                used_pans.add(pan)
+                break
+
+        # 4. Create password and UPI PIN
+        password = f"{username}.123"
+        upi_pin = mobile[:4]
+        pw_hash = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        upi_pin_hash = hashlib.sha256(upi_pin.encode("utf-8")).hexdigest()
+        user_rows.append((username, full_name, mobile, pan, pw_hash, upi_pin_hash, now))
+
+    # 5. Every customer gets a savings account of 32500, adjusted by their sample transactions
+    balances = [32500.00] * len(customer_names)
+    for index, ttype, amount, _ in sample_transactions:
+        balances[index] += amount if ttype == 'DEPOSIT' else -amount
+
+    with db.transaction():  # Seed everything in one commit
+        user_ids = db.insert_many(
+            "users", ("username", "fullname", "phone_number", "pan_number", "password_hash", "upi_pin_hash",
+                      "created_at"), user_rows, return_ids=True)
+        account_ids = db.insert_many(
+            "accounts", ("user_id", "account_number", "account_type", "balance", "created_at"),
+            ((user_id, f"SAV{user_id:011d}", "Savings", balance, now)
+             for user_id, balance in zip(user_ids, balances)), return_ids=True)
+
+        print("Adding sample transactions for analytics...")
+        db.execute_many(
+            "INSERT INTO transactions (account_id, type, amount, timestamp, note) VALUES (%s, %s, %s, %s, %s)",
+            ((account_ids[index], ttype, amount, now, note) for index, ttype, amount, note in sample_transactions))
+
+    print(f"Successfully seeded {len(customer_names)} customers and added sample transactions.")
+
+
+# (table, column) pairs that were created as VARCHAR and hold timestamps.
+TIMESTAMP_COLUMNS = [
+    ("users", "created_at"),
+    ("accounts", "created_at"),
+    ("transactions", "timestamp"),
+    ("feedback", "timestamp"),
+]
+
+
+def convert_timestamps(db):
+    """Normalizes timestamp columns to 'YYYY-MM-DD HH:MM:SS' and makes them DATETIME on MySQL."""
+    for table, column in TIMESTAMP_COLUMNS:
+        # Older rows were written either as 'YYYY-MM-DD HH:MM:SS' or as isoformat()
+        # ('YYYY-MM-DDTHH:MM:SS.ffffff'); both reduce to the first 19 characters.
+        db.execute(f"UPDATE {table} SET {column} = REPLACE(SUBSTR({column}, 1, 19), 'T', ' ') "
+                   f"WHERE {column} IS NOT NULL")
+        if db.backend.name == "mysql":
+            db.execute(f"ALTER TABLE {table} MODIFY {column} DATETIME")
+        # SQLite cannot change a column's type in place; its canonical datetime form is
+        # exactly this sortable text, so normalizing the values is all it needs.
+
+
+def index_foreign_keys(db):
+    """Indexes the foreign key columns used by lookups and cascades.
+
+    InnoDB creates these indexes automatically, so this only does work on SQLite.
+    """
+    if db.backend.name == "sqlite":
+        db.execute("CREATE INDEX idx_accounts_user ON accounts (user_id, id)")
+        db.execute("CREATE INDEX idx_feedback_user ON feedback (user_id)")
+
+
+MIGRATIONS = [
+    (1, "Initial schema", SCHEMA),
+    (2, "Default admin and customers", [seed_admin, seed_customers]),
+    (3, "Typed DATETIME timestamps and transaction date index", [
+        convert_timestamps,
+        "CREATE INDEX idx_transactions_account_time ON transactions (account_id, timestamp)",
+    ]),
+    # Recommended by index_advisor.py
+    (4, "Indexes for dashboard and admin lookups", [
+        index_foreign_keys,
+        "CREATE INDEX idx_users_fullname ON users (fullname)",
+    ]),
+    # Keyset-paged admin tables can be sorted by these columns without a sort
+    (5, "Indexes for sorting the admin account table", [
+        "CREATE INDEX idx_accounts_balance ON accounts (balance)",
+        "CREATE INDEX idx_accounts_type ON accounts (account_type)",
+    ]),
+    (6, "Precomputed analytics summaries", SUMMARY_TABLES + [rebuild_summaries]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(db):
+    """Returns the highest applied migration version (0 for a database that has never been migrated)."""
+    try:
+        return db.query("SELECT MAX(version) AS version FROM schema_version")[0]["version"] or 0
+    except db.backend.Error:
+        return 0  # schema_version does not exist yet
+
+
+def migrate(db):
+    """Applies every migration newer than the database's current version. Returns the new version."""
+    version = current_version(db)
+    if version >= LATEST_VERSION:
+        return version  # Fast path: nothing to do
+
+    db.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255),
+        applied_at VARCHAR(32)
+    )""")
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+        print(f"Applying migration {number}: {description}")
+        # MySQL commits DDL implicitly, so only data steps are atomic there; SQLite runs
+        # the whole migration, including the version row, in one transaction.
+        with db.transaction():
+            for step in steps:
+                if callable(step):
+                    step(db)
+                else:
+                    db.execute(step)
+            db.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, %s)",
+                       (number, description, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")))
+        version = number
+    return version
@@ -3,14 +3,40 @@
 # -----------------------------
 # Importing necessary modules
 # -----------------------------
-# mysql.connector.IntegrityError - handles unique constraint errors (like duplicate username)
 # hashlib - used for hashing passwords securely
 # datetime - to record timestamps
-# DB - custom database class (from database.py)
-from mysql.connector import IntegrityError
+# DB - custom database class (from database.py); db.IntegrityError handles unique
+#      constraint errors (like duplicate username) for whichever backend is in use
 import hashlib
 from datetime import datetime
 from database import DB
+from summaries import add_to_user_summary, add_to_daily_volume, remove_user_from_daily_volume
+from account_cache import cache_for
+from config import PAYMENT_QUEUE_ENABLED
+from payment_queue import queue_for
+
+# Every timestamp column is written in this one format. On MySQL the columns are
+# DATETIME; on SQLite this text form sorts chronologically, so both can range-scan
+# the (account_id, timestamp) index.
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def format_timestamp(value=None):
+    # Formats a datetime (or a date, taken as midnight) for storage; defaults to now (UTC).
+    # Strings (timestamps read back from SQLite) are assumed to be formatted already.
+    if isinstance(value, str):
+        return value
+    if value is None:
+        value = datetime.utcnow()
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+# Column projections for the hot paths: fetch only what the objects need, never SELECT *
+USER_COLUMNS = "id, username, fullname, phone_number"
+ACCOUNT_COLUMNS = "id, user_id, account_number, account_type, balance, interest_rate"
+TRANSACTION_COLUMNS = "id, account_id, type, amount, timestamp, note, related_account"
 
 
 # ====================================================================================================
@@ -51,18 +77,20 @@ class User:
     def register(cls, db: DB, username, fullname, phone, pan, password, upi_pin):
         pw_hash = cls.hash_password(password)
         pin_hash = cls.hash_password(upi_pin)
-        now = datetime.utcnow().isoformat()
+        now = format_timestamp()
         try:
-            # Inserting a new record into the database
-            last_id = db.execute(
-                "INSERT INTO users (username, fullname, phone_number, pan_number, password_hash, upi_pin_hash, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                (username, fullname, phone, pan, pw_hash, pin_hash, now)
-            )
-
-            # Default account created for each user (shows code reusability and abstraction)
-            create_account_for_user(db, last_id, "Savings", 500.0, 0.04)
+            # The user and their default account are committed together (or not at all)
+            with db.transaction():
+                # Inserting a new record into the database
+                last_id = db.execute(
+                    "INSERT INTO users (username, fullname, phone_number, pan_number, password_hash, upi_pin_hash, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    (username, fullname, phone, pan, pw_hash, pin_hash, now)
+                )
+
+                # Default account created for each user (shows code reusability and abstraction)
+                create_account_for_user(db, last_id, "Savings", 500.0, 0.04)
             return True
-        except IntegrityError:
+        except db.IntegrityError:
             # Exception handling if username already exists
             return False
 
@@ -73,7 +101,8 @@ class User:
     @classmethod
     def login(cls, db: DB, username, password):
         pw_hash = cls.hash_password(password)
-        rows = db.query("SELECT * FROM users WHERE username = %s AND password_hash = %s", (username, pw_hash))
+        rows = db.query(f"SELECT {USER_COLUMNS} FROM users WHERE username = %s AND password_hash = %s",
+                        (username, pw_hash))
         if rows:
             row = rows[0]
             return cls(db, row["id"], row["username"], row["fullname"], row["phone_number"])
@@ -84,7 +113,7 @@ class User:
     # -----------------------------
     @classmethod
     def get_user_by_phone(cls, db: DB, phone_number):
-        rows = db.query("SELECT * FROM users WHERE phone_number = %s", (phone_number,))
+        rows = db.query(f"SELECT {USER_COLUMNS} FROM users WHERE phone_number = %s", (phone_number,))
         if rows:
             row = rows[0]
             return cls(db, row["id"], row["username"], row["fullname"], row["phone_number"])
@@ -93,14 +122,17 @@ class User:
     @classmethod
     def verify_upi_pin(cls, db: DB, phone_number, pin):
         pin_hash = cls.hash_password(pin)
-        rows = db.query("SELECT * FROM users WHERE phone_number = %s AND upi_pin_hash = %s", (phone_number, pin_hash))
+        # One lookup returns the user directly (no second query by phone number)
+        rows = db.query(f"SELECT {USER_COLUMNS} FROM users WHERE phone_number = %s AND upi_pin_hash = %s",
+                        (phone_number, pin_hash))
         if rows:
-            return User.get_user_by_phone(db, phone_number)
+            row = rows[0]
+            return cls(db, row["id"], row["username"], row["fullname"], row["phone_number"])
         return None
 
     @classmethod
     def verify_phone_for_reset(cls, db: DB, username, phone_number):
-        return bool(db.query("SELECT * FROM users WHERE username = %s AND phone_number = %s", (username, phone_number)))
+        return bool(db.query("SELECT id FROM users WHERE username = %s AND phone_number = %s", (username, phone_number)))
 
     @classmethod
     def update_password(cls, db: DB, username, new_password):
@@ -111,8 +143,15 @@ class User:
     # Instance Methods
     # -----------------------------
     def get_accounts(self):
-        # Returns all accounts belonging to this user
-        return [Account.from_row(self.db, r) for r in self.db.query("SELECT * FROM accounts WHERE user_id = %s", (self.id,))]
+        # Returns all accounts belonging to this user, oldest first (so the first is the primary).
+        # Served from the account summary cache (account_cache.py) when it holds them. Inside a
+        # transaction the cache is bypassed: its reads must see its own uncommitted writes, and
+        # must not be cached in case it rolls back.
+        def load():
+            return self.db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE user_id = %s ORDER BY id",
+                                 (self.id,))
+        rows = load() if self.db.in_transaction() else cache_for(self.db).accounts_of(self.id, load)
+        return [Account.from_row(self.db, r) for r in rows]
 
     def get_primary_account(self):
         # Returns first account (primary)
@@ -139,6 +178,7 @@ class BankAccount:
         self.account_type = account_type
         self.balance = float(balance)
         self.interest_rate = float(interest_rate)
+        self.last_transaction = None  # Ledger row written by the latest deposit/withdraw, if any
 
         # Private member (Encapsulation)
         # Private variable is declared using __ (double underscore)
@@ -170,16 +210,17 @@ class BankAccount:
     # Deposit Method
     # -----------------------------
     # Demonstrates Abstraction (hides DB query details)
+    # Returns the recorded transaction row (None in demo mode); self.balance is updated too.
     def deposit(self, amount, note=None):
         if amount <= 0:
             raise ValueError("Amount must be positive")
-        self.balance += amount
 
         # If DB connection exists, update; else skip (for demo)
         if self.db is not None:
-            self.db.execute("UPDATE accounts SET balance = %s WHERE id = %s", (self.balance, self.id))
-            self._record_txn("DEPOSIT", amount, note)
+            # Balance update and ledger entry share a single commit
+            return self._post(amount, "DEPOSIT", note)
         else:
+            self.balance += amount
             print(f"[Demo Mode] Deposited {amount}. (No DB update performed.)")
 
     # -----------------------------
@@ -188,34 +229,95 @@ class BankAccount:
     def withdraw(self, amount, note=None):
         if amount <= 0:
             raise ValueError("Amount must be positive")
-        if amount > self.balance:
-            raise ValueError("Insufficient funds")
-        self.balance -= amount
 
         if self.db is not None:
-            self.db.execute("UPDATE accounts SET balance = %s WHERE id = %s", (self.balance, self.id))
-            self._record_txn("WITHDRAW", amount, note)
+            return self._post(-amount, "WITHDRAW", note)
         else:
+            if amount > self.balance:
+                raise ValueError("Insufficient funds")
+            self.balance -= amount
             print(f"[Demo Mode] Withdrew {amount}. (No DB update performed.)")
 
     # -----------------------------
-    # Protected Method
+    # Protected Methods
     # -----------------------------
     # Prefix with single underscore `_record_txn` → indicates it's for internal use
+    def _post(self, delta, ttype, note):
+        # One transaction of its own, or a group commit shared with other payments (payment_queue.py)
+        def post():
+            self._change_balance(delta)
+            return self._record_txn(ttype, abs(delta), note)
+        if uses_payment_queue(self.db):
+            return queue_for(self.db).submit(post, accounts=(self.id,)).result()
+        with self.db.transaction():
+            return post()
+
+    def _change_balance(self, delta):
+        # The balance is adjusted relative to the stored value (never overwritten with a
+        # value computed in Python), so concurrent sessions cannot lose each other's updates.
+        # Must run inside db.transaction() so the read-back sees this update.
+        apply_balance_delta(self.db, self.id, delta)
+        self.balance = float(self.db.query("SELECT balance FROM accounts WHERE id = %s", (self.id,))[0]["balance"])
+
     def _record_txn(self, ttype, amount, note=None, related_account=None):
-        now = datetime.utcnow().isoformat()
         if self.db is not None:
-            self.db.execute(
-                "INSERT INTO transactions (account_id, type, amount, timestamp, note, related_account) VALUES (%s, %s, %s, %s, %s, %s)",
-                (self.id, ttype, amount, now, note, related_account))
+            self.last_transaction = record_transaction(self.db, self.id, ttype, amount, note, related_account)
+            return self.last_transaction
         else:
             print(f"[Demo Mode] Transaction recorded: {ttype} of {amount}")
 
     # -----------------------------
     # Retrieve Transactions
     # -----------------------------
-    def get_transactions(self, limit=100):
-        return self.db.query("SELECT * FROM transactions WHERE account_id = %s ORDER BY timestamp DESC LIMIT %s", (self.id, limit))
+    # Newest first. start (inclusive) and end (exclusive) may be dates or datetimes;
+    # the filter is an index range scan on (account_id, timestamp).
+    # The newest few (no date range) come from the account's ring buffer in the account cache,
+    # except inside a transaction (see User.get_accounts).
+    def get_transactions(self, start=None, end=None, limit=100):
+        cache = cache_for(self.db)
+        if (start is None and end is None and limit is not None and limit <= cache.recent_size
+                and not self.db.in_transaction()):
+            return cache.recent_transactions(self.id, limit, lambda count: self.db.query(
+                *self._transactions_query(None, None, count)))
+        return self.db.query(*self._transactions_query(start, end, limit))
+
+    # Streams the same rows for statements and exports; limit=None returns the whole range.
+    def iter_transactions(self, start=None, end=None, limit=None, batch_size=500):
+        return self.db.iter_query(*self._transactions_query(start, end, limit), batch_size=batch_size)
+
+    # One page of a statement, for scrolling through any number of transactions. Pages are
+    # keyset-paginated on (timestamp, id): after=(timestamp, id) of the last row shown returns
+    # the next older page, before=(timestamp, id) of the first row the next newer one. Rows are
+    # always newest first, and every page is an index range scan however deep it is.
+    def get_transactions_page(self, start=None, end=None, after=None, before=None, limit=100):
+        return self.db.query(*self._transactions_query(start, end, limit, after, before))
+
+    def _transactions_query(self, start, end, limit, after=None, before=None):
+        sql = f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE account_id = %s"
+        params = [self.id]
+        if start is not None:
+            sql += " AND timestamp >= %s"
+            params.append(format_timestamp(start))
+        if end is not None:
+            sql += " AND timestamp < %s"
+            params.append(format_timestamp(end))
+        if after is not None:
+            timestamp = format_timestamp(after[0])
+            sql += " AND timestamp <= %s AND (timestamp < %s OR id < %s)"
+            params += [timestamp, timestamp, after[1]]
+        if before is not None:
+            # Read upwards from the key, then flip the page back to newest first
+            timestamp = format_timestamp(before[0])
+            sql += " AND timestamp >= %s AND (timestamp > %s OR id > %s)"
+            params += [timestamp, timestamp, before[1]]
+            sql = f"SELECT * FROM ({sql} ORDER BY timestamp ASC, id ASC LIMIT %s) AS page"
+            params.append(limit)
+            return sql + " ORDER BY timestamp DESC, id DESC", tuple(params)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return sql, tuple(params)
 
 
 # ====================================================================================================
@@ -248,54 +350,204 @@ class Account(BankAccount):
 # ====================================================================================================
 def create_account_for_user(db: DB, user_id, account_type='Checking', initial_deposit=0.0, interest_rate=0.0):
     acct_num = f"AC{int(datetime.utcnow().timestamp())}{user_id}"
-    now = datetime.utcnow().isoformat()
-    last_id = db.execute(
-        "INSERT INTO accounts (user_id, account_number, account_type, balance, interest_rate, created_at) VALUES (%s, %s, %s, %s, %s, %s)",
-        (user_id, acct_num, account_type, initial_deposit, interest_rate, now))
-    row = db.query("SELECT * FROM accounts WHERE id = %s", (last_id,))[0]
+    now = format_timestamp()
+    with db.transaction():
+        last_id = db.execute(
+            "INSERT INTO accounts (user_id, account_number, account_type, balance, interest_rate, created_at) VALUES (%s, %s, %s, %s, %s, %s)",
+            (user_id, acct_num, account_type, initial_deposit, interest_rate, now))
+        add_to_user_summary(db, last_id, balance=initial_deposit)
+        db.after_commit(cache_for(db).user_changed, user_id)
+    row = db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts WHERE id = %s", (last_id,))[0]
     return Account.from_row(db, row)
 
 
+def uses_payment_queue(db: DB):
+    # Only writes that would commit on their own may be handed to the queue: inside a caller's
+    # transaction, or with autocommit off, the write must join the caller's unit of work so that
+    # the caller's rollback() can still undo it.
+    return PAYMENT_QUEUE_ENABLED and db.autocommit and not db.in_transaction()
+
+
+def apply_balance_delta(db: DB, account_id, delta):
+    # Relative update; a debit only succeeds if it leaves the balance non-negative
+    cache = cache_for(db)
+    ticket = cache.write_started()
+    if delta >= 0:
+        db.execute("UPDATE accounts SET balance = balance + %s WHERE id = %s", (delta, account_id))
+    elif not db.execute_rowcount("UPDATE accounts SET balance = balance - %s WHERE id = %s AND balance >= %s",
+                                 (-delta, account_id, -delta)):
+        raise ValueError("Insufficient funds")
+    add_to_user_summary(db, account_id, balance=delta)
+    db.after_commit(cache.balance_changed, account_id, delta, ticket)
+
+
+def record_transaction(db: DB, account_id, ttype, amount, note=None, related_account=None):
+    # Writes one ledger row and returns it as a dict of TRANSACTION_COLUMNS, as if read back. It is
+    # also counted in the analytics summaries, so call it inside db.transaction() to keep them in step
+    now = format_timestamp()
+    cache = cache_for(db)
+    ticket = cache.write_started()
+    txn_id = db.execute(
+        "INSERT INTO transactions (account_id, type, amount, timestamp, note, related_account) VALUES (%s, %s, %s, %s, %s, %s)",
+        (account_id, ttype, amount, now, note, related_account))
+    add_to_user_summary(db, account_id, txns=1)
+    add_to_daily_volume(db, account_id, now, ttype, amount)
+    row = {"id": txn_id, "account_id": account_id, "type": ttype, "amount": amount, "timestamp": now, "note": note,
+           "related_account": related_account}
+    db.after_commit(cache.transaction_added, row, ticket)
+    return row
+
+
 def submit_feedback(db: DB, message, user_id=None):
-    now = datetime.utcnow().isoformat()
+    now = format_timestamp()
     db.execute("INSERT INTO feedback (user_id, message, timestamp) VALUES (%s, %s, %s)", (user_id, message, now))
 
 
+ALL_USERS_QUERY = "SELECT id, fullname, username, phone_number, pan_number FROM users ORDER BY fullname"
+
+
 def admin_login(db: DB, username, password):
     pw_hash = User.hash_password(password)
-    rows = db.query("SELECT * FROM admins WHERE username = %s AND password_hash = %s", (username, pw_hash))
+    rows = db.query("SELECT id FROM admins WHERE username = %s AND password_hash = %s", (username, pw_hash))
     return bool(rows)
 
 
-def get_all_users(db: DB):
-    return db.query("SELECT id, fullname, username, phone_number, pan_number FROM users ORDER BY fullname")
+# cache=True serves repeated admin views from DB's query cache until the tables change.
+def get_all_users(db: DB, cache=False):
+    return db.query(ALL_USERS_QUERY, cache=cache)
+
+
+# Streaming variant for the admin table and exports; memory use does not grow with the user count.
+def iter_all_users(db: DB, batch_size=1000):
+    return db.iter_query(ALL_USERS_QUERY, batch_size=batch_size)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Paged admin tables
+# ----------------------------------------------------------------------------------------------------
+# Sortable columns of each admin table, mapped to the ORDER BY key used for keyset paging. Every key
+# ends in a unique column, so (key of the last row shown) identifies exactly where the next page
+# starts, and each key is the order of an index, so a page never needs a sort.
+USER_SORT_KEYS = {
+    "id": ("id",),
+    "fullname": ("fullname", "id"),
+    "username": ("username",),
+    "phone_number": ("phone_number",),
+    "pan_number": ("pan_number",),
+}
+ACCOUNT_SORT_KEYS = {
+    "fullname": ("u.fullname", "a.user_id", "a.id"),
+    "account_number": ("a.account_number",),
+    "account_type": ("a.account_type", "a.id"),
+    "balance": ("a.balance", "a.id"),
+}
+
+
+def sort_key_of(row, key_columns):
+    """The keyset value of ``row`` for ``after=`` in search_users/search_accounts."""
+    return tuple(row[column.split(".")[-1]] for column in key_columns)
+
+
+def _prefix_match(columns, text):
+    # "starts with text" as an index range on each column (LIKE 'x%' cannot use an index on SQLite)
+    condition = " OR ".join(f"({column} >= %s AND {column} < %s)" for column in columns)
+    return condition, [text, text + "\uffff"] * len(columns)
+
+
+def _keyset_after(columns, values, descending):
+    # (c1, c2, ...) > (v1, v2, ...) written out so the leading column bounds an index range
+    op = "<" if descending else ">"
+    condition, params = f"{columns[-1]} {op} %s", [values[-1]]
+    for column, value in zip(reversed(columns[:-1]), reversed(values[:-1])):
+        condition = f"{column} {op} %s OR ({column} = %s AND ({condition}))"
+        params = [value, value] + params
+    return f"{columns[0]} {op}= %s AND ({condition})", [values[0]] + params
+
+
+def _page(db, sql, where, params, key_columns, descending, after, limit, cache):
+    if after is not None:
+        condition, after_params = _keyset_after(key_columns, after, descending)
+        where.append(condition)
+        params += after_params
+    if where:
+        sql += " WHERE " + " AND ".join(f"({condition})" for condition in where)
+    direction = " DESC" if descending else ""
+    sql += " ORDER BY " + ", ".join(column + direction for column in key_columns) + " LIMIT %s"
+    return db.query(sql, tuple(params) + (limit,), cache=cache)
+
+
+def search_users(db: DB, text="", sort="fullname", descending=False, after=None, limit=50, cache=False):
+    """One page of users whose name, username or phone number starts with ``text``."""
+    key_columns = USER_SORT_KEYS[sort]
+    where, params = [], []
+    if text:
+        condition, text_params = _prefix_match(("fullname", "username", "phone_number"), text)
+        where.append(condition)
+        params += text_params
+    return _page(db, "SELECT id, fullname, username, phone_number, pan_number FROM users", where, params,
+                 key_columns, descending, after, limit, cache)
+
+
+def search_accounts(db: DB, text="", sort="fullname", descending=False, after=None, limit=50, cache=False):
+    """One page of accounts, with their owner's name, whose number or owner name starts with ``text``."""
+    key_columns = ACCOUNT_SORT_KEYS[sort]
+    where, params = [], []
+    if text:
+        # Owner names are matched through a subquery so both branches are index lookups on accounts
+        name_match, name_params = _prefix_match(("fullname",), text)
+        number_match, number_params = _prefix_match(("a.account_number",), text)
+        where.append(f"a.user_id IN (SELECT id FROM users WHERE {name_match}) OR {number_match}")
+        params += name_params + number_params
+    return _page(db, "SELECT a.id, a.user_id, u.fullname, a.account_number, a.account_type, a.balance "
+                     "FROM accounts a JOIN users u ON a.user_id = u.id", where, params,
+                 key_columns, descending, after, limit, cache)
 
 
 def delete_user(db: DB, user_id):
-    db.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    # The user's accounts and transactions cascade away with them, and user_summary with them;
+    # daily_volume is shared between customers, so their share is subtracted from it.
+    with db.transaction():
+        remove_user_from_daily_volume(db, user_id)
+        db.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        db.after_commit(cache_for(db).user_changed, user_id)
 
 
-def get_users_by_balance(db: DB, limit=5):
+# The Top 5 charts read the precomputed user_summary (see summaries.py) in index order.
+def get_users_by_balance(db: DB, limit=5, cache=False):
     return db.query("""
-        SELECT u.fullname, SUM(a.balance) as balance
-        FROM users u
-        JOIN accounts a ON u.id = a.user_id
-        GROUP BY u.id
-        ORDER BY balance DESC
+        SELECT u.fullname, s.total_balance as balance
+        FROM user_summary s
+        JOIN users u ON u.id = s.user_id
+        ORDER BY s.total_balance DESC
         LIMIT %s
-    """, (limit,))
+    """, (limit,), cache=cache)
 
 
-def get_users_by_transaction_count(db: DB, limit=5):
+def get_users_by_transaction_count(db: DB, limit=5, cache=False):
     return db.query("""
-        SELECT u.fullname, COUNT(t.id) as transaction_count
-        FROM users u
-        JOIN accounts a ON u.id = a.user_id
-        JOIN transactions t ON a.id = t.account_id
-        GROUP BY u.id
-        ORDER BY transaction_count DESC
+        SELECT u.fullname, s.txn_count as transaction_count
+        FROM user_summary s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.txn_count > 0
+        ORDER BY s.txn_count DESC
         LIMIT %s
-    """, (limit,))
+    """, (limit,), cache=cache)
+
+
+def get_daily_volume(db: DB, start=None, end=None, cache=False):
+    # Days with transactions, oldest first; start (inclusive) and end (exclusive) are dates
+    where, params = [], []
+    if start is not None:
+        where.append("day >= %s")
+        params.append(format_timestamp(start)[:10])
+    if end is not None:
+        where.append("day < %s")
+        params.append(format_timestamp(end)[:10])
+    sql = ("SELECT day, SUM(txn_count) AS txn_count, SUM(deposits) AS deposits, SUM(withdrawals) AS withdrawals "
+           "FROM daily_volume")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return db.query(sql + " GROUP BY day ORDER BY day", tuple(params), cache=cache)
 
 
 # ====================================================================================================
@@ -0,0 +1,235 @@
+# filename: payment_queue.py
+"""
+Group commit for deposits, withdrawals and transfers.
+
+Committing a transaction waits for the database to flush its log, so posting
+payments one transaction at a time is bound by commit latency however cheap
+each payment is. PaymentQueue instead hands operations to a few worker
+threads, and each worker commits a batch of them together: up to
+PAYMENT_BATCH_SIZE operations, or whatever arrived within
+PAYMENT_BATCH_DELAY_MS of the first one.
+
+    payments = queue_for(db)
+    future = payments.submit(post, accounts=(account.id,))
+    row = future.result()       # Returns once the batch has committed, or raises
+
+Inside a batch every operation runs in its own savepoint, so one that fails
+(e.g. insufficient funds) is rolled back and reported through its future
+without affecting the rest. The accounts an operation names are locked in
+ascending id order before any of them run, so two batches touching the same
+accounts queue behind each other instead of deadlocking. If the batch itself
+cannot commit, every operation in it fails with that error.
+
+BankAccount.deposit()/withdraw() and TransferService use the queue when
+PAYMENT_QUEUE_ENABLED is set, the DB autocommits and they are not already
+inside a transaction.
+
+The queue only holds a weak reference to its DB. Once the DB is garbage
+collected (or close() is called) the workers stop.
+"""
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+from config import PAYMENT_BATCH_SIZE, PAYMENT_BATCH_DELAY_MS, PAYMENT_WORKERS
+
+_STOP = object()
+
+
+class _Operation:
+    __slots__ = ("fn", "args", "accounts", "future")
+
+    def __init__(self, fn, args, accounts):
+        self.fn = fn
+        self.args = args
+        self.accounts = accounts
+        self.future = Future()
+
+
+class PaymentQueue:
+    """Worker threads that run submitted operations in group-committed batches."""
+
+    def __init__(self, db, batch_size=PAYMENT_BATCH_SIZE, max_delay_ms=PAYMENT_BATCH_DELAY_MS,
+                 workers=PAYMENT_WORKERS):
+        if batch_size < 1 or workers < 1:
+            raise ValueError("Batch size and worker count must be at least 1")
+        self._db = weakref.ref(db)
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self._pending = queue.SimpleQueue()
+        self._outstanding = 0  # Submitted operations whose futures are not resolved yet
+        self._closed = False
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._run, name=f"payments-{i}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+        # Statistics
+        self._batches = 0
+        self._operations = 0
+        self._failed = 0
+        self._failed_batches = 0
+        self._largest_batch = 0
+
+    def submit(self, fn, *args, accounts=()):
+        """Queues ``fn(*args)`` to run inside a batch transaction; returns a Future of its result.
+
+        ``accounts`` are the ids of the accounts the operation writes. The operation must do its
+        work through the queue's DB on the calling (worker) thread, as the models' helpers do.
+        """
+        operation = _Operation(fn, args, tuple(accounts))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Payment queue is closed")
+            self._outstanding += 1
+            self._pending.put(operation)
+        return operation.future
+
+    @property
+    def db(self):
+        return self._db()
+
+    def close(self, wait=True):
+        """Stops the workers once the operations already queued have run."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._workers:
+                self._pending.put(_STOP)
+        db = self._db()
+        if db is not None:
+            with _QUEUES_LOCK:
+                if _QUEUES.get(db) is self:
+                    del _QUEUES[db]
+        if wait and threading.current_thread() not in self._workers:
+            for worker in self._workers:
+                worker.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "batches": self._batches,
+                "operations": self._operations,
+                "failed": self._failed,
+                "failed_batches": self._failed_batches,
+                "average_batch": self._operations / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+            }
+
+    # -----------------------------
+    # Workers
+    # -----------------------------
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit(batch)
+            del batch  # Its operations reference the DB; don't keep it alive while waiting
+            if stop:
+                return
+
+    def _next_batch(self):
+        # Blocks for the first operation, then takes more until the batch is full or the delay is up.
+        # A lone caller is not made to wait: the delay only applies while other operations are in
+        # flight, since their callers are the ones likely to submit again shortly.
+        first = self._pending.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        if self._outstanding <= 1 and self._pending.empty():
+            return batch, False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                operation = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if operation is _STOP:
+                return batch, True
+            batch.append(operation)
+        return batch, False
+
+    def _commit(self, batch):
+        running = [operation for operation in batch if operation.future.set_running_or_notify_cancel()]
+        if len(running) < len(batch):
+            with self._lock:
+                self._outstanding -= len(batch) - len(running)  # Cancelled while queued
+        batch = running
+        if not batch:
+            return
+        outcomes = []  # (future, result, error) of each operation, set once the batch has committed
+        db = self._db()
+        try:
+            if db is None:
+                raise RuntimeError("The payment queue's database has been closed")
+            with db.transaction():
+                self._lock_accounts(db, sorted({account for operation in batch for account in operation.accounts}))
+                for operation in batch:
+                    try:
+                        with db.transaction():  # Savepoint: a failure only undoes this operation
+                            result = operation.fn(*operation.args)
+                    except Exception as err:
+                        outcomes.append((operation.future, None, err))
+                    else:
+                        outcomes.append((operation.future, result, None))
+        except Exception as err:
+            failed = {future for future, _, error in outcomes if error is not None}
+            for operation in batch:
+                if operation.future not in failed:
+                    operation.future.set_exception(err)
+            for future, _, error in outcomes:
+                if error is not None:
+                    future.set_exception(error)
+            self._count(batch, len(batch), failed_batch=True)
+            return
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        self._count(batch, sum(error is not None for _, _, error in outcomes))
+
+    @staticmethod
+    def _lock_accounts(db, account_ids):
+        # Row locks in ascending id order up front, so concurrent batches cannot deadlock on each
+        # other. SQLite's BEGIN IMMEDIATE has already locked the whole database.
+        if not db.backend.for_update:
+            return
+        chunk = min(db.backend.max_params, 1000)
+        for start in range(0, len(account_ids), chunk):
+            part = account_ids[start:start + chunk]
+            db.query(f"SELECT id FROM accounts WHERE id IN ({', '.join(['%s'] * len(part))}) ORDER BY id"
+                     + db.backend.for_update, tuple(part))
+
+    def _count(self, batch, failed, failed_batch=False):
+        with self._lock:
+            self._outstanding -= len(batch)
+            self._batches += 1
+            self._operations += len(batch)
+            self._failed += failed
+            self._failed_batches += failed_batch
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+
+_QUEUES = weakref.WeakKeyDictionary()
+_QUEUES_LOCK = threading.Lock()
+
+
+def queue_for(db):
+    """The PaymentQueue of ``db`` (one per DB instance), started on first use.
+
+    Its workers are stopped when ``db`` is garbage collected.
+    """
+    with _QUEUES_LOCK:
+        payments = _QUEUES.get(db)
+        if payments is None:
+            payments = _QUEUES[db] = PaymentQueue(db)
+            weakref.finalize(db, payments.close, False)
+        return payments
@@ -0,0 +1,135 @@
+# filename: profiling.py
+"""
+Lightweight startup profiling.
+
+STARTUP is created when this module is first imported, so main.py imports it
+before anything else and its clock starts with the process. Code marks the
+milestones it reaches (``STARTUP.mark("database ready")``) and times individual
+steps (``with STARTUP.span("build WelcomeFrame"): ...``); report() shows both.
+
+ImportProfiler is a built-in equivalent of ``python -X importtime``: once
+installed it times every module imported afterwards (``python main.py
+--import-profile``).
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Records milestones and timed steps relative to when it was created."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []  # (label, seconds since start)
+        self.spans = []  # (label, seconds taken)
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.start))
+
+    def elapsed(self, label):
+        """Seconds from start to the first mark named ``label``, or None if not reached yet."""
+        return next((at for name, at in self.marks if name == label), None)
+
+    @contextmanager
+    def span(self, label):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((label, time.perf_counter() - began))
+
+    def report(self):
+        lines = ["Startup timing", f"  {'at ms':>9} {'+ms':>9}  milestone"]
+        previous = 0.0
+        for label, at in self.marks:
+            lines.append(f"  {at * 1000:>9.1f} {(at - previous) * 1000:>9.1f}  {label}")
+            previous = at
+        if self.spans:
+            lines.append(f"  {'ms':>9} {'':>9}  step")
+            for label, took in self.spans:
+                lines.append(f"  {took * 1000:>9.1f} {'':>9}  {label}")
+        return "\n".join(lines)
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module(); everything else is delegated."""
+
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        began = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._name, time.perf_counter() - began)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler:
+    """Meta path hook recording self and cumulative import time per module, like -X importtime."""
+
+    def __init__(self):
+        self.imports = []  # (name, self seconds, cumulative seconds, nesting depth) in completion order
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        # Let the real finders locate the module, then time its loader.
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    def _enter(self):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # Time spent in nested imports
+
+    def _exit(self, name, cumulative):
+        stack = self._local.stack
+        nested = stack.pop()
+        if stack:
+            stack[-1] += cumulative
+        self.imports.append((name, cumulative - nested, cumulative, len(stack)))
+
+    def total(self):
+        return sum(cumulative for _, _, cumulative, depth in self.imports if depth == 0)
+
+    def report(self, top=25):
+        """The ``top`` slowest modules (including what they import), then the full -X importtime style tree."""
+        lines = [f"Import time: {self.total() * 1000:,.1f} ms in {len(self.imports)} modules", "",
+                 f"{'cumulative ms':>14} {'self ms':>8}  slowest imports"]
+        for name, own, cumulative, _ in sorted(self.imports, key=lambda i: -i[2])[:top]:
+            lines.append(f"{cumulative * 1000:>14.1f} {own * 1000:>8.1f}  {name}")
+        lines += ["", "import time: self [us] | cumulative | imported package"]
+        for name, own, cumulative, depth in self.imports:
+            lines.append(f"import time: {own * 1e6:>9.0f} | {cumulative * 1e6:>10.0f} | {'  ' * depth}{name}")
+        return "\n".join(lines)
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,253 @@
+# filename: seed.py
+"""
+Generates synthetic customers, accounts and transactions at production scale,
+for profiling the admin views and analytics.
+
+Usage (from the Banking_Project folder):
+    python seed.py --users 1000000 --transactions-per-account 10 --seed 42
+
+Generation is vectorized with NumPy and deterministic for a given --seed and
+--now (the moment the generated timestamps run up to, by default today at
+midnight); pass the same --now to reproduce a dataset on a later day.
+Rows are bulk-loaded with DB.insert_many, committing once per batch of users,
+and the analytics summaries are rebuilt once at the end.
+Every synthetic customer can log in with their username and SYNTHETIC_PASSWORD;
+their UPI PIN is the first four digits of their phone number (as for the
+default customers created by migrations.py).
+"""
+import argparse
+import hashlib
+import string
+import time
+
+import numpy as np
+
+from config import DB_BACKEND
+from database import DB
+from summaries import rebuild_summaries
+
+SYNTHETIC_PASSWORD = "password.123"
+# Synthetic usernames are the prefix and the zero-padded sequence number, e.g. user000000042
+SYNTHETIC_PREFIX = "user"
+SYNTHETIC_DIGITS = 9
+
+FIRST_NAMES = np.array(["Aarav", "Aditi", "Ananya", "Arjun", "Deepa", "Divya", "Farhan", "Gauri", "Harsha",
+                        "Ishaan", "Kavya", "Kiran", "Lakshmi", "Manoj", "Meera", "Naveen", "Neha", "Pooja",
+                        "Pranav", "Rahul", "Riya", "Sanjay", "Sneha", "Suresh", "Tanvi", "Varun", "Vikram"])
+LAST_NAMES = np.array(["Bhat", "Das", "Gowda", "Iyer", "Joshi", "Kapoor", "Khan", "Kumar", "Menon", "Nair",
+                       "Patel", "Pillai", "Rao", "Reddy", "Shah", "Sharma", "Shetty", "Singh", "Verma"])
+NOTES = np.array(["Salary Credit", "ATM Withdrawal", "Cashback", "Online Shopping", "Bill Payment",
+                  "Rent", "Groceries", "Fuel", "Refund", "Transfer"])
+ACCOUNT_TYPES = [("SAV", "Savings"), ("SAL", "Salary")]
+LETTERS = np.array(list(string.ascii_uppercase))
+
+# Phone numbers and PANs are produced by an affine permutation of the customer's
+# sequence number (k -> (A * k + B) mod N with gcd(A, N) == 1). That is a bijection,
+# so values are unique without any retry loop. Sequence numbers continue after the
+# highest synthetic username already loaded, so repeated runs never collide with each
+# other, and any that would clash with a customer created another way are skipped.
+_PERMUTATION_A = 2654435761
+_PHONE_SPACE = 4 * 10 ** 9  # 10-digit numbers starting with 6-9
+_PHONE_B = 1234567891
+_PAN_SPACE = 26 ** 6 * 10 ** 4  # AAAAA9999A
+_PAN_B = 987654321987
+
+
+class SyntheticDataGenerator:
+    """Vectorized, seeded generator for users, accounts and transactions."""
+
+    def __init__(self, seed=42, days=365, now=None):
+        self.rng = np.random.default_rng(seed)
+        self.days = days
+        # Timestamps fall in the ``days`` before ``now`` (a date, datetime or ISO string; default today
+        # at midnight), never the wall clock, so the same arguments always give the same rows.
+        self.now = np.datetime64(now if now is not None else "today", "s")
+        # Hash each possible 4-digit UPI PIN once instead of once per user.
+        self._pin_hashes = np.array([hashlib.sha256(f"{pin:04d}".encode("utf-8")).hexdigest()
+                                     for pin in range(10000)])
+        self._password_hash = hashlib.sha256(SYNTHETIC_PASSWORD.encode("utf-8")).hexdigest()
+
+    def keys(self, k):
+        """The unique columns (username, phone number, PAN) of sequence numbers ``k``; uses no randomness."""
+        phones = 6 * 10 ** 9 + (_PERMUTATION_A * k + _PHONE_B) % _PHONE_SPACE
+        pan_codes = (_PERMUTATION_A * k + _PAN_B) % _PAN_SPACE
+        return {
+            "username": np.char.add(SYNTHETIC_PREFIX, np.char.zfill(k.astype(str), SYNTHETIC_DIGITS)),
+            "phone_number": phones.astype(str),
+            "pan_number": self._pans(pan_codes),
+        }
+
+    def users(self, k):
+        """Returns user rows for the sequence numbers in array ``k`` as column arrays."""
+        count = len(k)
+        columns = self.keys(k)
+        columns.update({
+            "fullname": np.char.add(np.char.add(self.rng.choice(FIRST_NAMES, count), " "),
+                                    self.rng.choice(LAST_NAMES, count)),
+            "password_hash": np.full(count, self._password_hash),
+            "upi_pin_hash": self._pin_hashes[columns["phone_number"].astype(np.int64) // 10 ** 6],
+            "created_at": self._timestamps(count),
+        })
+        return columns
+
+    def transactions(self, accounts, per_account):
+        """Returns transaction column arrays for ``per_account`` rows per account, plus each account's net change.
+
+        The "account_id" column holds the account's position (0 .. accounts - 1) until the
+        real ids are known.
+        """
+        n = accounts * per_account
+        owner = np.repeat(np.arange(accounts, dtype=np.int64), per_account)
+        is_deposit = self.rng.random(n) < 0.6
+        amounts = np.round(self.rng.lognormal(mean=7.0, sigma=1.2, size=n), 2)
+        signed = np.where(is_deposit, amounts, -amounts)
+        net = np.bincount(owner, weights=signed, minlength=accounts)
+        columns = {
+            "account_id": owner,
+            "type": np.where(is_deposit, "DEPOSIT", "WITHDRAW"),
+            "amount": amounts,
+            "timestamp": self._timestamps(n),
+            "note": self.rng.choice(NOTES, n),
+        }
+        return columns, net
+
+    def opening_balances(self, net):
+        """Opening balances large enough that no account ends up negative after its ``net`` change."""
+        base = np.round(self.rng.uniform(1000, 100000, len(net)), 2)
+        return np.round(base + np.maximum(0.0, -net), 2)
+
+    def _pans(self, codes):
+        last = LETTERS[codes % 26]
+        codes = codes // 26
+        digits = np.char.zfill((codes % 10 ** 4).astype(str), 4)
+        codes = codes // 10 ** 4
+        head = LETTERS[codes % 26]
+        for _ in range(4):
+            codes = codes // 26
+            head = np.char.add(LETTERS[codes % 26], head)
+        return np.char.add(np.char.add(head, digits), last)
+
+    def _timestamps(self, count):
+        offsets = self.rng.integers(0, self.days * 86400, count).astype("timedelta64[s]")
+        return np.char.replace(np.datetime_as_string(self.now - offsets, unit="s"), "T", " ")
+
+
+def _rows(columns, names):
+    # Converts column arrays to row tuples of plain Python values for the DB driver.
+    return zip(*(columns[name].tolist() for name in names))
+
+
+def _next_sequence(db):
+    # One past the highest synthetic username loaded so far. The names sort in sequence order, so
+    # this reads the username index backwards, skipping any real username that merely falls in range.
+    rows = db.iter_query("SELECT username FROM users WHERE username >= %s AND username <= %s ORDER BY username DESC",
+                         (SYNTHETIC_PREFIX + "0" * SYNTHETIC_DIGITS, SYNTHETIC_PREFIX + "9" * SYNTHETIC_DIGITS),
+                         batch_size=100)
+    try:
+        for row in rows:
+            digits = row["username"][len(SYNTHETIC_PREFIX):]
+            if len(digits) == SYNTHETIC_DIGITS and digits.isdigit():
+                return int(digits) + 1
+    finally:
+        rows.close()
+    return 0
+
+
+def _existing(db, column, values):
+    # The subset of ``values`` already present in users.``column``
+    found = []
+    chunk = min(db.backend.max_params, 1000)
+    for start in range(0, len(values), chunk):
+        part = values[start:start + chunk]
+        found += [row[column] for row in db.query(
+            f"SELECT {column} FROM users WHERE {column} IN ({', '.join(['%s'] * len(part))})", tuple(part))]
+    return found
+
+
+def _free_sequence(db, generator, first, count):
+    # ``count`` sequence numbers from ``first`` on whose unique columns are all unused, and the next one
+    chosen = []
+    while count:
+        k = np.arange(first, first + count, dtype=np.int64)
+        first += count
+        clash = np.zeros(len(k), dtype=bool)
+        for column, values in generator.keys(k).items():
+            clash |= np.isin(values, _existing(db, column, values.tolist()))
+        chosen.append(k[~clash])
+        count = int(clash.sum())
+    return np.concatenate(chosen), first
+
+
+def seed(db: DB, users, accounts_per_user=1, transactions_per_account=10, seed=42, days=365, batch_size=50000,
+         now=None):
+    """Generates and bulk-loads the requested dataset, one committed batch of users at a time."""
+    generator = SyntheticDataGenerator(seed, days, now)
+    sequence = _next_sequence(db)
+    user_columns = ("username", "fullname", "phone_number", "pan_number", "password_hash", "upi_pin_hash",
+                    "created_at")
+    txn_columns = ("account_id", "type", "amount", "timestamp", "note")
+    totals = {"users": 0, "accounts": 0, "transactions": 0}
+    began = time.perf_counter()
+
+    for offset in range(0, users, batch_size):
+        count = min(batch_size, users - offset)
+        with db.transaction():
+            k, sequence = _free_sequence(db, generator, sequence, count)
+            user_data = generator.users(k)
+            user_ids = np.array(db.insert_many("users", user_columns, _rows(user_data, user_columns),
+                                               return_ids=True), dtype=np.int64)
+
+            for prefix, account_type in ACCOUNT_TYPES[:accounts_per_user]:
+                # Transactions are generated first so each account can be inserted with its final balance.
+                txn_data, net = generator.transactions(count, transactions_per_account)
+                balances = (generator.opening_balances(net) + net).round(2)
+                account_ids = np.array(db.insert_many(
+                    "accounts", ("user_id", "account_number", "account_type", "balance", "created_at"),
+                    zip(user_ids.tolist(), np.char.add(prefix, np.char.zfill(user_ids.astype(str), 11)).tolist(),
+                        [account_type] * count, balances.tolist(), user_data["created_at"].tolist()),
+                    return_ids=True), dtype=np.int64)
+
+                txn_data["account_id"] = account_ids[txn_data["account_id"]]
+                totals["transactions"] += db.insert_many("transactions", txn_columns, _rows(txn_data, txn_columns),
+                                                         chunk_size=5000)
+                totals["accounts"] += count
+
+        totals["users"] += count
+        elapsed = time.perf_counter() - began
+        print(f"  {totals['users']:,}/{users:,} users, {totals['accounts']:,} accounts, "
+              f"{totals['transactions']:,} transactions ({elapsed:,.1f}s)")
+
+    # Bulk-loaded rows bypass the incremental maintenance in models.py
+    print("  Rebuilding analytics summaries...")
+    rebuild_summaries(db)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic customers, accounts and transactions.")
+    parser.add_argument("--users", type=int, default=10000, help="number of customers to create")
+    parser.add_argument("--accounts-per-user", type=int, choices=(1, 2), default=1,
+                        help="1 = Savings only, 2 = Savings and Salary")
+    parser.add_argument("--transactions-per-account", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365, help="spread transaction timestamps over this many days")
+    parser.add_argument("--seed", type=int, default=42, help="random seed; the same seed gives the same data")
+    parser.add_argument("--now", help="timestamps run up to this date or datetime, e.g. 2025-06-30 "
+                                      "(default: today at midnight); keep it fixed to reproduce a dataset")
+    parser.add_argument("--batch-size", type=int, default=50000, help="customers per committed batch")
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default=DB_BACKEND)
+    args = parser.parse_args()
+
+    try:
+        db = DB(backend=args.backend)
+    except ConnectionError as err:
+        parser.exit(1, f"Could not connect to the database: {err}\n")
+    print(f"Seeding {args.users:,} synthetic customers...")
+    began = time.perf_counter()
+    totals = seed(db, args.users, args.accounts_per_user, args.transactions_per_account, args.seed, args.days,
+                  args.batch_size, args.now)
+    print(f"Done in {time.perf_counter() - began:,.1f}s: {totals['users']:,} users, {totals['accounts']:,} accounts, "
+          f"{totals['transactions']:,} transactions. Password for all synthetic users: {SYNTHETIC_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# filename: services.py
+"""
+Money-movement services built on top of the models.
+
+Each operation runs as a single database transaction (or a savepoint inside a
+group commit, see payment_queue.py), so either every balance change and ledger
+row is committed or none of them is.
+"""
+from database import DB
+from models import BankAccount, User, apply_balance_delta, record_transaction, uses_payment_queue
+from payment_queue import queue_for
+
+
+class TransferResult:
+    """Outcome of a completed transfer, with both accounts' balances and ledger rows after it."""
+
+    def __init__(self, amount, source_account_number, source_balance, target_account_number, target_balance,
+                 source_transaction=None, target_transaction=None):
+        self.amount = amount
+        self.source_account_number = source_account_number
+        self.source_balance = source_balance
+        self.target_account_number = target_account_number
+        self.target_balance = target_balance
+        self.source_transaction = source_transaction
+        self.target_transaction = target_transaction
+
+
+class TransferService:
+    """Moves money between two accounts atomically.
+
+    The debit and credit are relative ``UPDATE``s (``balance = balance - x``), the
+    debit is guarded by ``balance >= x``, and both rows are updated in ascending id
+    order so two opposite transfers always lock the same row first and cannot
+    deadlock. Both ledger rows are written in the same transaction.
+    """
+
+    def __init__(self, db: DB):
+        self.db = db
+
+    def transfer(self, source: BankAccount, target: BankAccount, amount, debit_note=None, credit_note=None):
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+        if source.id == target.id:
+            raise ValueError("Cannot transfer to the same account.")
+
+        debit, credit, balances = self._execute(source.id, source.account_number, target.id, target.account_number,
+                                                amount, debit_note, credit_note)
+        source.balance = balances[source.id]
+        target.balance = balances[target.id]
+        return TransferResult(amount, source.account_number, source.balance, target.account_number, target.balance,
+                              debit, credit)
+
+    def _execute(self, source_id, source_number, target_id, target_number, amount, debit_note, credit_note):
+        # Returns (debit row, credit row, {account id: balance after}). Runs in its own transaction,
+        # or in a group commit with other payments when the payment queue is in use.
+        args = (source_id, source_number, target_id, target_number, amount, debit_note, credit_note)
+        if uses_payment_queue(self.db):
+            return queue_for(self.db).submit(self._transfer, *args, accounts=(source_id, target_id)).result()
+        with self.db.transaction():
+            return self._transfer(*args)
+
+    def _transfer(self, source_id, source_number, target_id, target_number, amount, debit_note, credit_note):
+        self._post(source_id, target_id, amount)
+        debit = record_transaction(self.db, source_id, "WITHDRAW", amount, debit_note, target_number)
+        credit = record_transaction(self.db, target_id, "DEPOSIT", amount, credit_note, source_number)
+        balances = {row["id"]: float(row["balance"]) for row in self.db.query(
+            "SELECT id, balance FROM accounts WHERE id IN (%s, %s)", (source_id, target_id))}
+        return debit, credit, balances
+
+    def _post(self, source_id, target_id, amount):
+        # Lock (update) the lower id first; an insufficient-funds debit raises and rolls back.
+        for account_id in sorted((source_id, target_id)):
+            apply_balance_delta(self.db, account_id, -amount if account_id == source_id else amount)
+
+
+class PaymentResult:
+    """Outcome of a UPI payment or balance enquiry.
+
+    ``status`` is PAID (or OK for an enquiry) on success, otherwise one of the refusal
+    statuses, and ``message`` is the text to show the user either way.
+    """
+
+    PAID = "paid"
+    OK = "ok"
+    AUTH_FAILED = "auth_failed"
+    RECIPIENT_NOT_FOUND = "recipient_not_found"
+    NO_ACCOUNT = "no_account"
+    FAILED = "failed"
+
+    def __init__(self, status, message, amount=None, sender_name=None, recipient_name=None, balance=None,
+                 debit=None, credit=None):
+        self.status = status
+        self.message = message
+        self.amount = amount
+        self.sender_name = sender_name
+        self.recipient_name = recipient_name
+        self.balance = balance  # Payer's balance after a payment, or for a balance enquiry
+        self.debit = debit  # Ledger rows written by a payment
+        self.credit = credit
+
+    @property
+    def ok(self):
+        return self.status in (self.PAID, self.OK)
+
+
+# Both parties and their primary (oldest) accounts in one indexed lookup: users by their unique
+# phone numbers, accounts by (user_id, id). No row means an unknown payer phone or a wrong PIN.
+RESOLVE_PAYMENT_QUERY = """
+    SELECT s.fullname AS sender_name, sa.id AS sender_account_id, sa.account_number AS sender_account_number,
+           r.fullname AS recipient_name, ra.id AS recipient_account_id,
+           ra.account_number AS recipient_account_number
+    FROM users s
+    LEFT JOIN accounts sa ON sa.id = (SELECT MIN(id) FROM accounts WHERE user_id = s.id)
+    LEFT JOIN users r ON r.phone_number = %s
+    LEFT JOIN accounts ra ON ra.id = (SELECT MIN(id) FROM accounts WHERE user_id = r.id)
+    WHERE s.phone_number = %s AND s.upi_pin_hash = %s
+"""
+
+
+class UPIPaymentService(TransferService):
+    """UPI payments between users' primary accounts, identified by phone number and PIN.
+
+    A payment is one query resolving the PIN and both parties, then one transaction (or
+    group commit) posting the transfer (see TransferService), instead of separate lookups
+    per user and account. Refusals are returned as a PaymentResult rather than raised.
+    """
+
+    def pay(self, sender_phone, pin, recipient_phone, amount):
+        if amount <= 0:
+            return PaymentResult(PaymentResult.FAILED, "Amount must be positive", amount)
+        rows = self.db.query(RESOLVE_PAYMENT_QUERY, (recipient_phone, sender_phone, User.hash_password(pin)))
+        if not rows:
+            return PaymentResult(PaymentResult.AUTH_FAILED, "Invalid UPI ID or PIN.", amount)
+        parties = rows[0]
+        if parties["recipient_name"] is None:
+            return PaymentResult(PaymentResult.RECIPIENT_NOT_FOUND, "Recipient UPI ID not found.", amount,
+                                 parties["sender_name"])
+        if parties["sender_account_id"] is None or parties["recipient_account_id"] is None:
+            return PaymentResult(PaymentResult.NO_ACCOUNT, "Account error.", amount, parties["sender_name"],
+                                 parties["recipient_name"])
+        if parties["sender_account_id"] == parties["recipient_account_id"]:
+            return PaymentResult(PaymentResult.FAILED, "Cannot transfer to the same account.", amount,
+                                 parties["sender_name"], parties["recipient_name"])
+
+        source = parties["sender_account_id"]
+        try:
+            debit, credit, balances = self._execute(
+                source, parties["sender_account_number"], parties["recipient_account_id"],
+                parties["recipient_account_number"], amount, f"UPI Pay to {parties['recipient_name']}",
+                f"UPI Rcvd from {parties['sender_name']}")
+        except ValueError as err:  # Insufficient funds
+            return PaymentResult(PaymentResult.FAILED, str(err), amount, parties["sender_name"],
+                                 parties["recipient_name"])
+        return PaymentResult(PaymentResult.PAID, f"Successfully paid ₹{amount:,.2f} to {parties['recipient_name']}.",
+                             amount, parties["sender_name"], parties["recipient_name"], balances[source], debit, credit)
+
+    def balance_enquiry(self, phone, pin):
+        """The balance of the primary account of the user with this phone number and PIN.
+
+        The PIN is always checked against the database; the balance is read through the account
+        summary cache, like every other balance read.
+        """
+        user = User.verify_upi_pin(self.db, phone, pin)
+        if user is None:
+            return PaymentResult(PaymentResult.AUTH_FAILED, "Invalid UPI ID or PIN.")
+        account = user.get_primary_account()
+        if account is None:
+            return PaymentResult(PaymentResult.NO_ACCOUNT, "No account found for this user.")
+        return PaymentResult(PaymentResult.OK, f"Your primary account balance is: ₹{account.balance:,.2f}",
+                             sender_name=user.fullname, balance=account.balance)
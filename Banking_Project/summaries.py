@@ -0,0 +1,163 @@
+# filename: summaries.py
+"""
+Precomputed aggregates for the admin analytics.
+
+user_summary holds each customer's total balance and transaction count, and
+daily_volume the number and value of transactions per day, split over
+DAILY_VOLUME_SHARDS rows per day by account id. models.py keeps them current:
+every balance change and ledger row also adds its delta here, inside the same
+transaction, so the analytics read a few indexed rows instead of aggregating
+every account and transaction.
+
+The deltas are not written as they happen. They are merged per transaction and
+written just before it commits (DB.before_commit), user_summary rows in user id
+order and then daily_volume rows in (day, shard) order, so concurrent
+transactions lock summary rows in one order and cannot deadlock on them, and
+hold them only for the moment before commit.
+
+Rows written without going through models.py (seed.py's bulk load, manual
+SQL) are not counted until the tables are rebuilt from scratch:
+    python summaries.py --rebuild
+"""
+import argparse
+import time
+
+from config import DB_BACKEND, DAILY_VOLUME_SHARDS
+
+SUMMARY_TABLES = [
+    """CREATE TABLE IF NOT EXISTS user_summary (
+        user_id INT PRIMARY KEY,
+        total_balance DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+        txn_count INT NOT NULL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS daily_volume (
+        day DATE NOT NULL,
+        shard INT NOT NULL,
+        txn_count INT NOT NULL DEFAULT 0,
+        deposits DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+        withdrawals DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+        PRIMARY KEY (day, shard)
+    )""",
+    # The Top 5 charts read these in index order
+    "CREATE INDEX idx_user_summary_balance ON user_summary (total_balance)",
+    "CREATE INDEX idx_user_summary_txns ON user_summary (txn_count)",
+]
+
+
+# Kinds of pending summary delta
+USER, DAY = "user", "day"
+
+
+def add_to_user_summary(db, account_id, balance=0, txns=0):
+    """Adds a balance change and/or a number of transactions to the owner of ``account_id``."""
+    db.before_commit(_write_summaries, (USER, account_id, float(balance), txns))
+
+
+def add_to_daily_volume(db, account_id, timestamp, ttype, amount):
+    """Counts one ledger row of ``account_id`` in the volume of the day it was written ('YYYY-MM-DD HH:MM:SS')."""
+    amount = float(amount)
+    db.before_commit(_write_summaries, (DAY, (timestamp[:10], account_id % DAILY_VOLUME_SHARDS), 1,
+                                        amount if ttype == "DEPOSIT" else 0.0, amount if ttype == "WITHDRAW" else 0.0))
+
+
+def remove_user_from_daily_volume(db, user_id):
+    """Takes a customer's transactions out of daily_volume; call it in the transaction deleting the customer."""
+    for row in db.query(f"""
+        SELECT DATE(t.timestamp) AS day, t.account_id % {DAILY_VOLUME_SHARDS} AS shard, COUNT(*) AS txn_count,
+               SUM(CASE WHEN t.type = 'DEPOSIT' THEN t.amount ELSE 0 END) AS deposits,
+               SUM(CASE WHEN t.type = 'WITHDRAW' THEN t.amount ELSE 0 END) AS withdrawals
+        FROM accounts a
+        JOIN transactions t ON t.account_id = a.id
+        WHERE a.user_id = %s AND t.timestamp IS NOT NULL
+        GROUP BY DATE(t.timestamp), t.account_id % {DAILY_VOLUME_SHARDS}
+    """, (user_id,)):
+        db.before_commit(_write_summaries, (DAY, (str(row["day"])[:10], int(row["shard"])), -row["txn_count"],
+                                            -float(row["deposits"]), -float(row["withdrawals"])))
+
+
+def _write_summaries(db, deltas):
+    # Runs just before commit with every delta of the transaction: merges them per row and writes
+    # each row once, in a fixed order.
+    users, days = {}, {}
+    owners = _owners(db, {delta[1] for delta in deltas if delta[0] == USER})
+    for kind, key, *values in deltas:
+        if kind == USER:
+            key = owners.get(key)  # None if the account was deleted in this transaction
+            if key is None:
+                continue
+        totals = (users if kind == USER else days).setdefault(key, [0] * len(values))
+        for i, value in enumerate(values):
+            totals[i] += value
+
+    for user_id in sorted(users):
+        balance, txns = users[user_id]
+        db.execute("INSERT INTO user_summary (user_id, total_balance, txn_count) VALUES (%s, %s, %s) "
+                   + db.backend.add_on_conflict("user_id", ("total_balance", "txn_count")),
+                   (user_id, round(balance, 2), txns))
+    for day, shard in sorted(days):
+        count, deposits, withdrawals = days[day, shard]
+        db.execute("INSERT INTO daily_volume (day, shard, txn_count, deposits, withdrawals) VALUES (%s, %s, %s, %s, %s) "
+                   + db.backend.add_on_conflict("day, shard", ("txn_count", "deposits", "withdrawals")),
+                   (day, shard, count, round(deposits, 2), round(withdrawals, 2)))
+        if count < 0:  # Rows were removed; a shard left without transactions is dropped, as a rebuild would
+            db.execute("DELETE FROM daily_volume WHERE day = %s AND shard = %s AND txn_count <= 0", (day, shard))
+
+
+def _owners(db, account_ids):
+    # account id -> user id
+    owners = {}
+    account_ids = sorted(account_ids)
+    chunk = min(db.backend.max_params, 1000)
+    for start in range(0, len(account_ids), chunk):
+        part = account_ids[start:start + chunk]
+        for row in db.query(f"SELECT id, user_id FROM accounts WHERE id IN ({', '.join(['%s'] * len(part))})",
+                            tuple(part)):
+            owners[row["id"]] = row["user_id"]
+    return owners
+
+
+def rebuild_summaries(db):
+    """Recomputes both tables from accounts and transactions in one transaction."""
+    with db.transaction():
+        db.execute("DELETE FROM user_summary")
+        db.execute("""
+            INSERT INTO user_summary (user_id, total_balance, txn_count)
+            SELECT a.user_id, SUM(a.balance), COALESCE(SUM(t.txn_count), 0)
+            FROM accounts a
+            LEFT JOIN (SELECT account_id, COUNT(*) AS txn_count FROM transactions GROUP BY account_id) t
+                ON t.account_id = a.id
+            GROUP BY a.user_id
+        """)
+        db.execute("DELETE FROM daily_volume")
+        db.execute(f"""
+            INSERT INTO daily_volume (day, shard, txn_count, deposits, withdrawals)
+            SELECT DATE(timestamp), account_id % {DAILY_VOLUME_SHARDS}, COUNT(*),
+                   SUM(CASE WHEN type = 'DEPOSIT' THEN amount ELSE 0 END),
+                   SUM(CASE WHEN type = 'WITHDRAW' THEN amount ELSE 0 END)
+            FROM transactions
+            WHERE timestamp IS NOT NULL
+            GROUP BY DATE(timestamp), account_id % {DAILY_VOLUME_SHARDS}
+        """)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the precomputed analytics tables.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute user_summary and daily_volume")
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default=DB_BACKEND)
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do (use --rebuild)")
+
+    from database import DB  # Imported here: database.py imports this module through migrations.py
+    try:
+        db = DB(backend=args.backend)
+    except ConnectionError as err:
+        parser.exit(1, f"Could not connect to the database: {err}\n")
+    began = time.perf_counter()
+    rebuild_summaries(db)
+    print(f"Rebuilt user_summary and daily_volume in {time.perf_counter() - began:,.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# filename: tasks.py
+"""
+Runs blocking work (database calls) off the Tk main thread.
+
+Tk widgets may only be touched from the thread running mainloop(), so workers
+never call back into the GUI directly: finished tasks are put on a queue that
+the main thread drains with after(), and the success/error callbacks run there.
+
+    app.tasks.submit(User.login, db, username, password,
+                     on_success=self._on_login, key="login", busy=self.login_button)
+
+Tasks sharing a ``key`` are coalesced: while one is in flight, submitting the
+same key again joins it instead of running the work twice (or, with
+``replace=True``, cancels it and starts the new one).
+"""
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from config import TASK_WORKERS, TASK_POLL_MS
+
+
+class TaskHandle:
+    """A submitted task. cancel() stops its callbacks from running."""
+
+    def __init__(self, runner, key, busy):
+        self.key = key
+        self.future = None
+        self.cancelled = False
+        self._runner = runner
+        self._busy = busy
+        self._callbacks = []  # (on_success, on_error) pairs of every caller that joined this task
+
+    def cancel(self):
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()  # Only stops it if a worker has not picked it up yet
+        self._runner._finished(self)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class TaskRunner:
+    """A thread pool whose results are delivered back on the Tk main thread."""
+
+    def __init__(self, root, max_workers=TASK_WORKERS, poll_ms=TASK_POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._results = queue.SimpleQueue()
+        self._in_flight = {}  # key -> TaskHandle
+        self._pending = 0  # Tasks whose results have not been delivered yet
+        self._busy = {}  # widget -> number of running tasks that disabled it
+        self._polling = None
+        self._closed = False
+
+    def submit(self, fn, *args, on_success=None, on_error=None, key=None, replace=False, busy=None):
+        """Runs ``fn(*args)`` on a worker thread; returns its TaskHandle.
+
+        ``on_success(result)`` or ``on_error(exception)`` is then called on the main thread.
+        Without ``on_error``, errors are reported with a message box. ``busy`` is a widget, or
+        a list of widgets, to disable while the task runs.
+        """
+        if self._closed:
+            raise RuntimeError("TaskRunner has been shut down")
+        if key is not None and key in self._in_flight:
+            handle = self._in_flight[key]
+            if not replace:
+                handle._callbacks.append((on_success, on_error))
+                return handle
+            handle.cancel()
+
+        widgets = [] if busy is None else busy if isinstance(busy, (list, tuple)) else [busy]
+        handle = TaskHandle(self, key, widgets)
+        handle._callbacks.append((on_success, on_error))
+        if key is not None:
+            self._in_flight[key] = handle
+        self._pending += 1
+        self._set_busy(widgets, True)
+        handle.future = self._executor.submit(self._run, handle, fn, args)
+        self._schedule_poll()
+        return handle
+
+    def cancel(self, key):
+        """Cancels the in-flight task with ``key``, if there is one."""
+        handle = self._in_flight.get(key)
+        if handle is not None:
+            handle.cancel()
+
+    def shutdown(self):
+        """Cancels everything outstanding; running workers finish but their results are dropped."""
+        self._closed = True
+        for handle in list(self._in_flight.values()):
+            handle.cancel()
+        if self._polling is not None:
+            self.root.after_cancel(self._polling)
+            self._polling = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_busy(self):
+        return self._pending > 0
+
+    # -----------------------------
+    # Worker side
+    # -----------------------------
+    def _run(self, handle, fn, args):
+        if handle.cancelled:
+            return
+        try:
+            result, error = fn(*args), None
+        except Exception as err:
+            result, error = None, err
+        self._results.put((handle, result, error))
+
+    # -----------------------------
+    # Main-thread side
+    # -----------------------------
+    def _schedule_poll(self):
+        if self._polling is None and not self._closed:
+            self._polling = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = None
+        try:
+            while True:
+                try:
+                    handle, result, error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if handle.cancelled:
+                    continue
+                self._finished(handle)
+                for on_success, on_error in handle._callbacks:
+                    # A failing callback is logged (as Tk logs callback errors) without holding up the rest
+                    try:
+                        if error is None:
+                            if on_success is not None:
+                                on_success(result)
+                        elif on_error is not None:
+                            on_error(error)
+                        else:
+                            self._report(error)
+                    except Exception:
+                        traceback.print_exc()
+        finally:
+            if self._pending:
+                self._schedule_poll()
+
+    def _finished(self, handle):
+        # Called once per handle, when its result is delivered or it is cancelled.
+        if handle.key is not None and self._in_flight.get(handle.key) is handle:
+            del self._in_flight[handle.key]
+        if handle._busy is not None:
+            self._pending -= 1
+            self._set_busy(handle._busy, False)
+            handle._busy = None
+
+    def _set_busy(self, widgets, busy):
+        for widget in widgets:
+            count = self._busy.get(widget, 0) + (1 if busy else -1)
+            if count > 0:
+                self._busy[widget] = count
+            else:
+                self._busy.pop(widget, None)
+            if (busy and count == 1) or (not busy and count <= 0):
+                try:
+                    widget.configure(state="disabled" if busy else "normal")
+                except Exception:  # The widget was destroyed while the task ran
+                    pass
+        try:
+            self.root.configure(cursor="watch" if self._pending else "")
+        except Exception:
+            pass
+
+    @staticmethod
+    def _report(error):
+        messagebox.showerror("Error", str(error))
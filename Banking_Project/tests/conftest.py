@@ -0,0 +1,33 @@
+# filename: tests/conftest.py
+"""Shared fixtures: every test gets a freshly migrated (and seeded) SQLite database."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from database import DB  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "bank.db")
+    monkeypatch.setattr(database, "SQLITE_PATH", path)
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    db = DB(backend="sqlite")
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def queue_enabled(monkeypatch):
+    """Routes deposits, withdrawals and transfers through the payment queue."""
+    import models
+    monkeypatch.setattr(models, "PAYMENT_QUEUE_ENABLED", True)
+
@@ -0,0 +1,133 @@
+# filename: tests/test_account_cache.py
+"""The account summary cache must agree with the database, however writes and reads interleave."""
+import threading
+
+import pytest
+
+from account_cache import cache_for
+from models import User
+from services import TransferService
+
+
+def balance_of(db, account_id):
+    return float(db.query("SELECT balance FROM accounts WHERE id = %s", (account_id,))[0]["balance"])
+
+
+def customers(db, count):
+    rows = db.query("SELECT id, username, fullname, phone_number FROM users ORDER BY id LIMIT %s", (count,))
+    return [User(db, r["id"], r["username"], r["fullname"], r["phone_number"]) for r in rows]
+
+
+def assert_consistent(db, users):
+    for user in users:
+        account = user.get_primary_account()
+        assert account.balance == balance_of(db, account.id)
+        cached = account.get_transactions(limit=100)
+        stored = account.get_transactions_page(limit=100)
+        assert [row["id"] for row in cached] == [row["id"] for row in stored]
+
+
+def test_reads_are_served_from_the_cache(db):
+    user, = customers(db, 1)
+    account = user.get_primary_account()
+    account.get_transactions(limit=10)
+    account.deposit(50)
+    hits = cache_for(db).stats()["hits"]
+    assert user.get_primary_account().balance == balance_of(db, account.id)
+    assert account.get_transactions(limit=1)[0]["amount"] == pytest.approx(50)
+    assert cache_for(db).stats()["hits"] == hits + 2
+
+
+def test_rolled_back_write_leaves_the_cache_alone(db):
+    user, = customers(db, 1)
+    account = user.get_primary_account()
+    before = account.balance
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            account.deposit(500)
+            raise RuntimeError("roll back")
+    assert user.get_primary_account().balance == before
+    assert_consistent(db, [user])
+
+
+def test_reads_inside_a_rolled_back_transaction_are_not_cached(db):
+    user, = customers(db, 1)
+    account = user.get_primary_account()
+    before = account.balance
+    committed = [row["id"] for row in account.get_transactions(limit=10)]  # Loads the ring buffer
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            account.deposit(500)
+            assert user.get_primary_account().balance == pytest.approx(before + 500)  # Reads its own write
+            assert account.get_transactions(limit=10)[0]["amount"] == pytest.approx(500)
+            raise RuntimeError("roll back")
+    cache_for(db).clear()
+    user.get_primary_account()
+    account.get_transactions(limit=10)  # Reload both into the cache, then read inside a block again
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            account.deposit(500)
+            user.get_accounts()
+            account.get_transactions(limit=10)
+            raise RuntimeError("roll back")
+    assert user.get_primary_account().balance == before
+    assert [row["id"] for row in account.get_transactions(limit=10)] == committed
+    assert_consistent(db, [user])
+
+
+def test_reads_in_an_autocommit_off_unit_of_work_are_not_cached(db):
+    user, = customers(db, 1)
+    before = user.get_primary_account().balance
+    db.autocommit = False
+    account = user.get_primary_account()
+    account.deposit(500)
+    assert user.get_primary_account().balance == pytest.approx(before + 500)
+    account.get_transactions(limit=10)
+    db.rollback()
+    db.autocommit = True
+    assert user.get_primary_account().balance == before
+    assert_consistent(db, [user])
+
+
+@pytest.mark.parametrize("queued", [False, True], ids=["direct", "payment-queue"])
+def test_concurrent_deposits_keep_the_cache_consistent(db, request, queued):
+    if queued:
+        request.getfixturevalue("queue_enabled")
+    users = customers(db, 3)
+    expected = {user.id: user.get_primary_account().balance + 8 * 20 * 2 for user in users}
+
+    def depositor(user):
+        for _ in range(20):
+            user.get_primary_account().deposit(2)  # Reads through the cache between writes
+            user.get_primary_account().get_transactions(limit=5)
+
+    threads = [threading.Thread(target=depositor, args=(user,)) for user in users for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for user in users:
+        assert user.get_primary_account().balance == pytest.approx(expected[user.id])
+    assert_consistent(db, users)
+
+
+def test_concurrent_transfers_keep_the_cache_consistent(db):
+    users = customers(db, 4)
+    total = sum(user.get_primary_account().balance for user in users)
+
+    def transferrer(offset):
+        service = TransferService(db)
+        for i in range(15):
+            source = users[(offset + i) % len(users)].get_primary_account()
+            target = users[(offset + i + 1) % len(users)].get_primary_account()
+            service.transfer(source, target, 1)
+
+    threads = [threading.Thread(target=transferrer, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(user.get_primary_account().balance for user in users) == pytest.approx(total)
+    assert_consistent(db, users)
@@ -0,0 +1,60 @@
+# filename: tests/test_analytics.py
+"""AnalyticsEngine: an incremental refresh() must end up where a full reload() does."""
+import numpy as np
+import pytest
+
+from analytics import AnalyticsEngine
+from models import Account, ACCOUNT_COLUMNS, create_account_for_user, delete_user
+from services import TransferService
+
+
+def accounts(db, limit):
+    rows = db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts ORDER BY id LIMIT %s", (limit,))
+    return [Account.from_row(db, row) for row in rows]
+
+
+def assert_same(refreshed, reloaded):
+    for name in ("account_ids", "account_users", "balances", "txn_ids", "txn_accounts", "amounts", "kinds", "times"):
+        np.testing.assert_array_equal(getattr(refreshed._data, name), getattr(reloaded._data, name), err_msg=name)
+    assert refreshed.summary() == reloaded.summary()
+    for period in ("day", "month"):
+        ours, theirs = refreshed.volume(period), reloaded.volume(period)
+        for column in ours:
+            np.testing.assert_array_equal(ours[column], theirs[column])
+    for by in ("balance", "count", "volume"):
+        assert refreshed.top_users(5, by=by) == reloaded.top_users(5, by=by)
+    assert refreshed.balance_percentiles(per_user=True) == reloaded.balance_percentiles(per_user=True)
+
+
+def reloaded(db):
+    engine = AnalyticsEngine(db, batch_size=7)
+    engine.reload()
+    return engine
+
+
+def test_refresh_matches_reload_after_payments(db):
+    engine = AnalyticsEngine(db, batch_size=7)  # Small batches: several chunks per stream
+    before = engine.summary()["transactions"]
+    a, b, c = accounts(db, 3)
+    a.deposit(250)
+    b.withdraw(75.5)
+    TransferService(db).transfer(c, a, 12)
+    create_account_for_user(db, c.user_id, "Checking", initial_deposit=40)
+    added = db.query("SELECT COUNT(*) AS n FROM transactions")[0]["n"] - before
+    assert added >= 4  # Deposit, withdrawal and both transfer legs
+    assert engine.refresh() == added
+    assert_same(engine, reloaded(db))
+    assert engine.refresh() == 0
+    assert_same(engine, reloaded(db))
+
+
+def test_refresh_matches_reload_after_a_user_is_deleted(db):
+    engine = AnalyticsEngine(db)
+    engine.refresh()  # First refresh loads everything
+    a, b = accounts(db, 2)
+    TransferService(db).transfer(a, b, 30)
+    delete_user(db, a.user_id)
+    engine.refresh()
+    assert_same(engine, reloaded(db))
+    assert engine.summary()["accounts"] == 24
+
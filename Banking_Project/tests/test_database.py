@@ -0,0 +1,162 @@
+# filename: tests/test_database.py
+"""DB: transactions, bulk inserts and the query cache, on SQLite."""
+import pytest
+
+import database
+from database import DB
+
+
+def usernames(db, ids):
+    rows = db.query(f"SELECT id, username FROM users WHERE id IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+    return {row["id"]: row["username"] for row in rows}
+
+
+def user_row(n):
+    return (f"bulk.{n}", f"Bulk {n}", f"5{n:09d}", f"BULK{n:05d}X"[:10], "pw", "pin")
+
+
+USER_COLUMNS = ("username", "fullname", "phone_number", "pan_number", "password_hash", "upi_pin_hash")
+
+
+@pytest.mark.parametrize("consecutive", [True, False], ids=["multi-row", "row-by-row"])
+def test_insert_many_returns_the_ids_of_the_inserted_rows(db, monkeypatch, consecutive):
+    monkeypatch.setattr(db.backend, "consecutive_ids", consecutive)
+    rows = [user_row(n) for n in range(25)]
+    ids = db.insert_many("users", USER_COLUMNS, iter(rows), chunk_size=7, return_ids=True)
+    assert len(ids) == len(set(ids)) == len(rows)
+    names = usernames(db, ids)
+    assert [names[i] for i in ids] == [row[0] for row in rows]
+
+
+def test_insert_many_counts_rows(db):
+    assert db.insert_many("users", USER_COLUMNS, (user_row(n) for n in range(10)), chunk_size=4) == 10
+
+
+def test_connection_errors_are_raised_to_the_caller(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "SQLITE_PATH", str(tmp_path / "missing" / "bank.db"))
+    with pytest.raises(ConnectionError):
+        database.DB(backend="sqlite")
+
+
+# -----------------------------
+# Transactions
+# -----------------------------
+def balance(db, account_id=1):
+    return float(db.query("SELECT balance FROM accounts WHERE id = %s", (account_id,))[0]["balance"])
+
+
+def add(db, amount, account_id=1):
+    db.execute("UPDATE accounts SET balance = balance + %s WHERE id = %s", (amount, account_id))
+
+
+def test_nested_savepoint_rollback_keeps_the_outer_writes(db):
+    before = balance(db)
+    with db.transaction():
+        add(db, 10)
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                add(db, 1000)
+                with db.transaction():
+                    add(db, 5000)
+                raise RuntimeError("undo the inner block")
+        add(db, 1)
+        assert balance(db) == before + 11
+    assert balance(db) == before + 11
+
+
+def test_failed_transaction_rolls_back_everything(db):
+    before = balance(db)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            add(db, 10)
+            with db.transaction():
+                add(db, 20)
+            raise RuntimeError("undo everything")
+    assert balance(db) == before
+
+
+def test_commit_hooks_only_run_on_commit(db):
+    calls = []
+
+    def flush(db, items):
+        calls.append(("before", items))
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.before_commit(flush, "rolled back")
+            db.after_commit(calls.append, "rolled back")
+            raise RuntimeError
+    assert calls == []
+
+    with db.transaction():
+        db.before_commit(flush, 1)
+        with pytest.raises(RuntimeError):
+            with db.transaction():  # Hooks registered in a rolled-back savepoint are dropped
+                db.before_commit(flush, "savepoint")
+                db.after_commit(calls.append, "savepoint")
+                raise RuntimeError
+        db.before_commit(flush, 2)
+        db.after_commit(calls.append, "committed")
+        assert calls == []
+    assert calls == [("before", [1, 2]), "committed"]
+
+
+def test_commit_hooks_run_at_once_outside_a_transaction(db):
+    calls = []
+    db.after_commit(calls.append, "now")
+    db.before_commit(lambda db, items: calls.append(items), "item")
+    assert calls == ["now", ["item"]]
+
+
+def test_failing_before_commit_hook_rolls_the_transaction_back(db):
+    before = balance(db)
+
+    def fail(db, items):
+        raise ValueError("summary write failed")
+
+    with pytest.raises(ValueError):
+        with db.transaction():
+            add(db, 10)
+            db.before_commit(fail, None)
+    assert balance(db) == before
+    assert not db.in_transaction()
+
+
+# -----------------------------
+# Autocommit off
+# -----------------------------
+@pytest.fixture
+def manual(db_path):
+    manual = DB(backend="sqlite", autocommit=False)
+    yield manual
+    manual.close()
+
+
+def test_reads_do_not_open_a_unit_of_work(manual):
+    balance(manual)
+    assert not manual.in_transaction()
+    add(manual, 1)
+    assert manual.in_transaction()
+    manual.rollback()
+
+
+def test_unit_of_work_commits_and_rolls_back(db, manual):
+    before = balance(db)
+    add(manual, 5)
+    assert balance(manual) == before + 5  # Sees its own write
+    assert balance(db) == before  # Others do not, until commit
+    manual.commit()
+    assert balance(db) == before + 5
+    add(manual, 7)
+    manual.rollback()
+    assert balance(db) == before + 5
+
+
+def test_close_rolls_back_an_open_unit_of_work(db, manual):
+    before = balance(db)
+    add(manual, 100)
+    manual.close()
+    assert not manual.in_transaction()
+    assert manual.pool_stats()["in_use"] == 0
+    add(db, 1)  # Would wait on SQLite's write lock if the unit of work were still open
+    assert balance(db) == before + 1
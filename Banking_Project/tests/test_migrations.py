@@ -0,0 +1,34 @@
+# filename: tests/test_migrations.py
+"""migrations.py: a fresh database is built to the latest version, and migrating again is free."""
+from database import DB
+from migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate
+
+
+def statement_calls(db):
+    return sum(s["calls"] for s in db.stats.snapshot()["statements"])
+
+
+def test_fresh_database_is_at_the_latest_version(db):
+    assert current_version(db) == LATEST_VERSION
+    versions = [row["version"] for row in db.query("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [number for number, _, _ in MIGRATIONS]
+    assert len(db.query("SELECT id FROM users")) == 25  # Default customers
+
+
+def test_migrating_an_up_to_date_database_is_a_no_op(db, capsys):
+    calls = statement_calls(db)
+    assert migrate(db) == LATEST_VERSION
+    assert statement_calls(db) == calls + 1  # The version check only
+    assert "Applying migration" not in capsys.readouterr().out
+
+
+def test_reopening_does_not_reapply_migrations(db, capsys):
+    users = len(db.query("SELECT id FROM users"))
+    capsys.readouterr()
+    again = DB(backend="sqlite")
+    try:
+        assert "Applying migration" not in capsys.readouterr().out
+        assert len(again.query("SELECT id FROM users")) == users
+        assert len(again.query("SELECT version FROM schema_version")) == len(MIGRATIONS)
+    finally:
+        again.close()
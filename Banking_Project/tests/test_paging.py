@@ -0,0 +1,87 @@
+# filename: tests/test_paging.py
+"""Keyset paging visits every row exactly once, in order, even where the sort key has ties."""
+import pytest
+
+from models import (Account, ACCOUNT_COLUMNS, ACCOUNT_SORT_KEYS, USER_SORT_KEYS, search_accounts, search_users,
+                    sort_key_of)
+
+TIMESTAMPS = ["2025-01-01 09:00:00", "2025-01-02 09:00:00", "2025-01-02 09:00:00", "2025-01-03 12:30:00"]
+
+
+@pytest.fixture
+def account(db):
+    account = Account.from_row(db, db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts ORDER BY id LIMIT 1")[0])
+    # 23 rows sharing 3 timestamps, inserted out of timestamp order
+    db.insert_many("transactions", ("account_id", "type", "amount", "timestamp", "note"),
+                   ((account.id, "DEPOSIT", n + 1, TIMESTAMPS[n % len(TIMESTAMPS)], f"row {n}") for n in range(23)))
+    return account
+
+
+def key(row):
+    return str(row["timestamp"]), row["id"]
+
+
+def test_paging_older_visits_every_transaction_once(account):
+    everything = account.get_transactions_page(limit=None)
+    assert [key(row) for row in everything] == sorted((key(row) for row in everything), reverse=True)
+    seen, after = [], None
+    while True:
+        page = account.get_transactions_page(after=after, limit=4)
+        if not page:
+            break
+        seen += page
+        after = key(page[-1])
+    assert [row["id"] for row in seen] == [row["id"] for row in everything]
+
+
+def test_paging_newer_visits_every_transaction_once(account):
+    everything = account.get_transactions_page(limit=None)
+    oldest = everything[-3:]  # Start at the oldest page and walk back up
+    seen, before = list(oldest), key(oldest[0])
+    while True:
+        page = account.get_transactions_page(before=before, limit=4)
+        if not page:
+            break
+        assert [key(row) for row in page] == sorted((key(row) for row in page), reverse=True)
+        seen = page + seen
+        before = key(page[0])
+    assert [row["id"] for row in seen] == [row["id"] for row in everything]
+
+
+def test_paging_within_a_date_range(account):
+    inside = account.get_transactions_page(start="2025-01-02", end="2025-01-03", limit=None)
+    assert {str(row["timestamp"]) for row in inside} == {"2025-01-02 09:00:00"}
+    first = account.get_transactions_page(start="2025-01-02", end="2025-01-03", limit=5)
+    rest = account.get_transactions_page(start="2025-01-02", end="2025-01-03", after=key(first[-1]), limit=None)
+    assert [row["id"] for row in first + rest] == [row["id"] for row in inside]
+
+
+def walk(search, db, sort, descending, limit=4):
+    key_columns = (ACCOUNT_SORT_KEYS if search is search_accounts else USER_SORT_KEYS)[sort]
+    seen, after = [], None
+    while True:
+        page = search(db, sort=sort, descending=descending, after=after, limit=limit)
+        if not page:
+            return seen
+        seen += page
+        after = sort_key_of(page[-1], key_columns)
+
+
+@pytest.mark.parametrize("sort", sorted(ACCOUNT_SORT_KEYS))
+@pytest.mark.parametrize("descending", [False, True], ids=["asc", "desc"])
+def test_account_pages_cover_every_account_once(db, sort, descending):
+    # Seeded accounts are all Savings and mostly share one balance: ties on the leading column
+    expected = search_accounts(db, sort=sort, descending=descending, limit=1000)
+    assert len(expected) == 25
+    assert [row["id"] for row in walk(search_accounts, db, sort, descending)] == [row["id"] for row in expected]
+
+
+@pytest.mark.parametrize("descending", [False, True], ids=["asc", "desc"])
+def test_user_pages_cover_users_with_equal_names(db, descending):
+    db.insert_many("users", ("username", "fullname", "phone_number", "pan_number", "password_hash", "upi_pin_hash"),
+                   ((f"twin.{n}", "Akhil Dadhich", f"50000000{n:02d}", f"TWINS{n:04d}X", "pw", "pin")
+                    for n in range(6)))
+    expected = search_users(db, sort="fullname", descending=descending, limit=1000)
+    assert [row["id"] for row in walk(search_users, db, "fullname", descending)] == [row["id"] for row in expected]
+    names = [(row["fullname"], row["id"]) for row in expected]
+    assert names == sorted(names, reverse=descending)
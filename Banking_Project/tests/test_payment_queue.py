@@ -0,0 +1,117 @@
+# filename: tests/test_payment_queue.py
+"""PaymentQueue group commit, and when deposits/withdrawals/transfers may use it."""
+import gc
+import threading
+
+import pytest
+
+import payment_queue
+from database import DB
+from models import Account, ACCOUNT_COLUMNS, uses_payment_queue
+from payment_queue import PaymentQueue, queue_for
+from services import TransferService
+
+
+def balance_of(db, account_id):
+    return float(db.query("SELECT balance FROM accounts WHERE id = %s", (account_id,))[0]["balance"])
+
+
+def accounts(db, limit):
+    rows = db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts ORDER BY id LIMIT %s", (limit,))
+    return [Account.from_row(db, row) for row in rows]
+
+
+def test_queue_is_opt_in(db):
+    assert not uses_payment_queue(db)
+
+
+def test_queue_is_only_used_outside_a_unit_of_work(db, queue_enabled):
+    assert uses_payment_queue(db)
+    with db.transaction():
+        assert not uses_payment_queue(db)
+    db.autocommit = False
+    assert not uses_payment_queue(db)
+
+
+def test_rollback_with_autocommit_off_undoes_payments(db, db_path, queue_enabled):
+    a, b = accounts(db, 2)
+    before = balance_of(db, a.id), balance_of(db, b.id)
+    manual = DB(backend="sqlite", autocommit=False)
+    try:
+        source, target = accounts(manual, 2)
+        source.deposit(100)
+        source.withdraw(30)
+        TransferService(manual).transfer(source, target, 20)
+        assert balance_of(db, a.id) == before[0]  # Not committed yet
+        manual.rollback()
+    finally:
+        manual.close()
+    assert (balance_of(db, a.id), balance_of(db, b.id)) == before
+
+
+def test_commit_with_autocommit_off_keeps_payments(db, queue_enabled):
+    a, = accounts(db, 1)
+    before = balance_of(db, a.id)
+    manual = DB(backend="sqlite", autocommit=False)
+    try:
+        source, = accounts(manual, 1)
+        source.deposit(100)
+        manual.commit()
+    finally:
+        manual.close()
+    assert balance_of(db, a.id) == pytest.approx(before + 100)
+
+
+def test_failed_operation_only_fails_its_own_future(db):
+    a, b = accounts(db, 2)
+    before = balance_of(db, a.id), balance_of(db, b.id)
+    payments = PaymentQueue(db, batch_size=8, max_delay_ms=200, workers=1)
+    gate = threading.Event()
+    try:
+        blocker = payments.submit(gate.wait)  # Holds the worker so the next three share a batch
+        deposit = payments.submit(a.deposit, 10, accounts=(a.id,))
+        overdraft = payments.submit(b.withdraw, 10 ** 9, accounts=(b.id,))
+        withdrawal = payments.submit(b.withdraw, 5, accounts=(b.id,))
+        gate.set()
+        blocker.result()
+        assert deposit.result(timeout=5)["amount"] == pytest.approx(10)
+        with pytest.raises(ValueError):
+            overdraft.result(timeout=5)
+        assert withdrawal.result(timeout=5)["amount"] == pytest.approx(5)
+    finally:
+        payments.close()
+    assert (balance_of(db, a.id), balance_of(db, b.id)) == pytest.approx((before[0] + 10, before[1] - 5))
+    assert payments.stats()["failed"] == 1
+
+
+def test_concurrent_payments_through_the_queue(db, queue_enabled):
+    pool = accounts(db, 4)
+    total = sum(balance_of(db, account.id) for account in pool)
+
+    def worker(offset):
+        service = TransferService(db)
+        for i in range(20):
+            service.transfer(pool[(offset + i) % 4], pool[(offset + i + 1) % 4], 1)
+        pool[offset % 4].deposit(1)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(balance_of(db, account.id) for account in pool) == pytest.approx(total + 8)
+    assert queue_for(db).stats()["operations"] == 8 * 21
+
+
+def test_workers_stop_when_the_db_is_collected(db_path):
+    db = DB(backend="sqlite")
+    payments = queue_for(db)
+    a, = accounts(db, 1)
+    payments.submit(a.deposit, 1, accounts=(a.id,)).result(timeout=5)
+    workers = list(payments._workers)
+    del a, db
+    gc.collect()
+    for worker in workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+    assert payments not in payment_queue._QUEUES.values()
@@ -0,0 +1,77 @@
+# filename: tests/test_query_cache.py
+"""DB.query(cache=True): results are reused until a write to a table they read."""
+from database import QueryCache
+
+FEEDBACK = "SELECT id, message FROM feedback ORDER BY id"
+JOINED = "SELECT u.id, COUNT(a.id) AS accounts FROM users u JOIN accounts a ON a.user_id = u.id GROUP BY u.id"
+
+
+def hits(db):
+    return db.cache_stats()["hits"]
+
+
+def test_cached_query_is_reused(db):
+    first = db.query(FEEDBACK, cache=True)
+    assert db.query(FEEDBACK, cache=True) is first
+    assert hits(db) == 1
+
+
+def test_write_to_a_read_table_invalidates(db):
+    db.query(FEEDBACK, cache=True)
+    db.query(JOINED, cache=True)
+    db.execute("INSERT INTO feedback (message) VALUES (%s)", ("hello",))
+    assert [row["message"] for row in db.query(FEEDBACK, cache=True)] == ["hello"]
+    db.query(JOINED, cache=True)
+    assert hits(db) == 1  # The join, which does not read feedback
+
+
+def test_write_to_a_joined_table_invalidates(db):
+    before = db.query(JOINED, cache=True)
+    db.execute("INSERT INTO accounts (user_id, account_number, account_type) VALUES (1, 'X1', 'Checking')")
+    after = db.query(JOINED, cache=True)
+    assert after is not before
+    assert {row["id"]: row["accounts"] for row in after}[1] == 2
+
+
+def test_cascading_delete_invalidates_dependent_tables(db):
+    db.query(JOINED, cache=True)
+    db.execute("DELETE FROM users WHERE id = 1")  # Cascades to accounts
+    assert 1 not in {row["id"] for row in db.query(JOINED, cache=True)}
+
+
+def test_transactions_bypass_the_cache_and_invalidate_on_commit(db):
+    db.query(FEEDBACK, cache=True)
+    with db.transaction():
+        db.execute("INSERT INTO feedback (message) VALUES (%s)", ("inside",))
+        assert len(db.query(FEEDBACK, cache=True)) == 1  # Reads its own write, not the cached result
+        assert db.cache_stats()["entries"] == 0
+    assert len(db.query(FEEDBACK, cache=True)) == 1
+
+
+def test_rolled_back_write_is_not_cached(db):
+    db.query(FEEDBACK, cache=True)
+    try:
+        with db.transaction():
+            db.execute("INSERT INTO feedback (message) VALUES (%s)", ("rolled back",))
+            db.query(FEEDBACK, cache=True)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert db.query(FEEDBACK, cache=True) == []
+
+
+def test_result_read_before_a_write_is_not_stored():
+    cache = QueryCache(ttl=60, size=10, max_rows=100)
+    tables = frozenset({"feedback"})
+    versions = cache.versions(tables)  # Taken before the query runs
+    cache.invalidate(tables)  # A write lands while it runs
+    cache.put("key", tables, [{"id": 1}], versions)
+    assert cache.get("key") is None
+    cache.put("key", tables, [{"id": 1}], cache.versions(tables))
+    assert cache.get("key") == [{"id": 1}]
+
+
+def test_ddl_clears_the_cache(db):
+    db.query(FEEDBACK, cache=True)
+    db.execute("CREATE TABLE scratch (id INT)")
+    assert db.cache_stats()["entries"] == 0
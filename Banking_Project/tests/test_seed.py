@@ -0,0 +1,38 @@
+# filename: tests/test_seed.py
+"""seed.py: synthetic data is reproducible for a given --seed and --now."""
+import database
+from database import DB
+from seed import seed
+
+# Only the synthetic rows: the default customers created by migrations.py get random phone numbers
+SYNTHETIC = "JOIN users u ON u.id = a.user_id WHERE u.username LIKE 'user%'"
+QUERIES = [
+    "SELECT username, fullname, phone_number, pan_number, created_at FROM users WHERE username LIKE 'user%' "
+    "ORDER BY id",
+    f"SELECT a.account_number, a.account_type, a.balance, a.created_at FROM accounts a {SYNTHETIC} ORDER BY a.id",
+    f"SELECT t.type, t.amount, t.timestamp, t.note FROM transactions t JOIN accounts a ON a.id = t.account_id "
+    f"{SYNTHETIC} ORDER BY t.id",
+]
+
+
+def seeded(tmp_path, monkeypatch, name, now):
+    monkeypatch.setattr(database, "SQLITE_PATH", str(tmp_path / name))
+    db = DB(backend="sqlite")
+    seed(db, 40, accounts_per_user=2, transactions_per_account=3, seed=7, days=30, batch_size=15, now=now)
+    try:
+        return [db.query(sql) for sql in QUERIES]
+    finally:
+        db.close()
+
+
+def test_same_seed_and_now_give_the_same_rows(tmp_path, monkeypatch):
+    first = seeded(tmp_path, monkeypatch, "a.db", "2025-06-30")
+    assert first == seeded(tmp_path, monkeypatch, "b.db", "2025-06-30")
+    assert max(row["timestamp"] for row in first[2]) < "2025-06-30"
+
+
+def test_now_moves_the_timestamps(tmp_path, monkeypatch):
+    first = seeded(tmp_path, monkeypatch, "a.db", "2025-06-30")
+    later = seeded(tmp_path, monkeypatch, "b.db", "2025-07-30")
+    assert [row["amount"] for row in first[2]] == [row["amount"] for row in later[2]]
+    assert first[2] != later[2]
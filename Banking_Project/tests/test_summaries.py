@@ -0,0 +1,91 @@
+# filename: tests/test_summaries.py
+"""The incrementally maintained summaries must always equal a full rebuild_summaries()."""
+import threading
+
+from models import Account, ACCOUNT_COLUMNS, create_account_for_user, delete_user
+from services import TransferService
+from summaries import rebuild_summaries
+
+
+def snapshot(db):
+    users = {r["user_id"]: (round(float(r["total_balance"]), 2), r["txn_count"])
+             for r in db.query("SELECT user_id, total_balance, txn_count FROM user_summary")}
+    volume = {(str(r["day"]), r["shard"]): (r["txn_count"], round(float(r["deposits"]), 2),
+                                            round(float(r["withdrawals"]), 2))
+              for r in db.query("SELECT day, shard, txn_count, deposits, withdrawals FROM daily_volume")}
+    return users, volume
+
+
+def assert_matches_rebuild(db):
+    maintained = snapshot(db)
+    rebuild_summaries(db)
+    assert maintained == snapshot(db)
+
+
+def accounts(db, limit):
+    rows = db.query(f"SELECT {ACCOUNT_COLUMNS} FROM accounts ORDER BY id LIMIT %s", (limit,))
+    return [Account.from_row(db, row) for row in rows]
+
+
+def test_seeded_database_matches_rebuild(db):
+    assert_matches_rebuild(db)
+
+
+def test_payments_match_rebuild(db):
+    a, b = accounts(db, 2)
+    a.deposit(125.50, "Salary")
+    b.withdraw(40, "ATM")
+    TransferService(db).transfer(a, b, 10.25)
+    create_account_for_user(db, a.user_id, "Checking", initial_deposit=300)
+    assert_matches_rebuild(db)
+
+
+def test_rolled_back_savepoint_is_not_counted(db):
+    a, = accounts(db, 1)
+    with db.transaction():
+        a.deposit(5)
+        try:
+            with db.transaction():
+                a.deposit(1000)
+                raise RuntimeError("undo the inner deposit")
+        except RuntimeError:
+            pass
+    try:
+        with db.transaction():
+            a.withdraw(1)
+            raise RuntimeError("undo everything")
+    except RuntimeError:
+        pass
+    assert_matches_rebuild(db)
+
+
+def test_concurrent_payments_match_rebuild(db):
+    pool = accounts(db, 6)
+
+    def worker(offset):
+        service = TransferService(db)
+        for i in range(30):
+            source, target = pool[(offset + i) % len(pool)], pool[(offset + i + 1) % len(pool)]
+            if i % 3 == 0:
+                source.deposit(3)
+            elif i % 3 == 1:
+                source.withdraw(1)
+            else:
+                service.transfer(source, target, 2)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert_matches_rebuild(db)
+
+
+def test_deleted_user_is_removed_from_summaries(db):
+    a, b = accounts(db, 2)
+    a.deposit(75)
+    TransferService(db).transfer(a, b, 20)
+    delete_user(db, a.user_id)
+    assert not db.query("SELECT user_id FROM user_summary WHERE user_id = %s", (a.user_id,))
+    assert db.query("SELECT user_id FROM user_summary WHERE user_id = %s", (b.user_id,))
+    assert_matches_rebuild(db)
@@ -0,0 +1,67 @@
+# filename: tests/test_tasks.py
+"""TaskRunner, driven by a stand-in for the Tk root so no display is needed."""
+import threading
+
+from tasks import TaskRunner
+
+
+class FakeRoot:
+    """Collects after() callbacks; run() plays the Tk event loop until nothing is scheduled."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, fn):
+        self.scheduled.append(fn)
+        return len(self.scheduled)
+
+    def after_cancel(self, ident):
+        pass
+
+    def configure(self, **options):
+        pass
+
+    def run(self, until):
+        while self.scheduled and not until():
+            self.scheduled.pop(0)()
+            threading.Event().wait(0.01)
+
+
+def test_a_failing_callback_does_not_stall_the_others(capsys):
+    root = FakeRoot()
+    runner = TaskRunner(root, max_workers=2)
+    delivered = []
+    release = threading.Event()
+
+    def fail(result):
+        raise RuntimeError("callback failed")
+
+    runner.submit(lambda: 1, on_success=fail)
+    runner.submit(lambda: 2, on_success=delivered.append)
+    runner.submit(lambda: release.wait(5) and 3, on_success=delivered.append)
+    root.run(until=lambda: len(delivered) == 1)
+    release.set()
+    root.run(until=lambda: len(delivered) == 2)
+    assert sorted(delivered) == [2, 3]
+    assert not runner.is_busy()
+    assert "callback failed" in capsys.readouterr().err
+    runner.shutdown()
+
+
+def test_tasks_with_the_same_key_are_joined():
+    root = FakeRoot()
+    runner = TaskRunner(root)
+    release = threading.Event()
+    calls, delivered = [], []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "done"
+
+    first = runner.submit(work, on_success=delivered.append, key="k")
+    assert runner.submit(work, on_success=delivered.append, key="k") is first
+    release.set()
+    root.run(until=lambda: len(delivered) == 2)
+    assert delivered == ["done", "done"] and len(calls) == 1
+    runner.shutdown()
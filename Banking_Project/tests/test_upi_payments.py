@@ -0,0 +1,67 @@
+# filename: tests/test_upi_payments.py
+"""UPIPaymentService: payment outcomes and the cached balance enquiry."""
+import pytest
+
+from account_cache import cache_for
+from services import PaymentResult, UPIPaymentService
+
+
+def balance_of(db, account_id):
+    return float(db.query("SELECT balance FROM accounts WHERE id = %s", (account_id,))[0]["balance"])
+
+
+@pytest.fixture
+def parties(db):
+    # Seeded customers' UPI PIN is the first four digits of their phone number
+    rows = db.query("""SELECT u.phone_number, MIN(a.id) AS account_id FROM users u
+                       JOIN accounts a ON a.user_id = u.id GROUP BY u.id, u.phone_number ORDER BY u.id LIMIT 2""")
+    return [(row["phone_number"], row["phone_number"][:4], row["account_id"]) for row in rows]
+
+
+def test_pay_moves_money_between_primary_accounts(db, parties):
+    (payer, pin, source), (payee, _, target) = parties
+    before = balance_of(db, source), balance_of(db, target)
+    result = UPIPaymentService(db).pay(payer, pin, payee, 100)
+    assert result.status == PaymentResult.PAID and result.ok
+    assert result.balance == pytest.approx(before[0] - 100)
+    assert (balance_of(db, source), balance_of(db, target)) == pytest.approx((before[0] - 100, before[1] + 100))
+
+
+def test_pay_through_the_payment_queue(db, parties, queue_enabled):
+    (payer, pin, source), (payee, _, _) = parties
+    before = balance_of(db, source)
+    assert UPIPaymentService(db).pay(payer, pin, payee, 10).status == PaymentResult.PAID
+    assert balance_of(db, source) == pytest.approx(before - 10)
+
+
+@pytest.mark.parametrize("change, status", [
+    ({"pin": "0000x"}, PaymentResult.AUTH_FAILED),
+    ({"recipient": "0000000000"}, PaymentResult.RECIPIENT_NOT_FOUND),
+    ({"recipient": None}, PaymentResult.FAILED),  # Paying oneself
+    ({"amount": 10 ** 9}, PaymentResult.FAILED),  # Insufficient funds
+    ({"amount": -5}, PaymentResult.FAILED),
+])
+def test_refused_payments_change_nothing(db, parties, change, status):
+    (payer, pin, source), (payee, _, target) = parties
+    before = balance_of(db, source), balance_of(db, target)
+    recipient = change.get("recipient", payee) or payer
+    result = UPIPaymentService(db).pay(payer, change.get("pin", pin), recipient, change.get("amount", 50))
+    assert result.status == status and not result.ok
+    assert (balance_of(db, source), balance_of(db, target)) == before
+
+
+def test_balance_enquiry_reads_through_the_cache(db, parties):
+    (payer, pin, source), (payee, _, _) = parties
+    service = UPIPaymentService(db)
+    assert service.balance_enquiry(payer, pin).balance == pytest.approx(balance_of(db, source))
+    service.pay(payer, pin, payee, 25)
+    hits = cache_for(db).stats()["hits"]
+    result = service.balance_enquiry(payer, pin)
+    assert result.status == PaymentResult.OK
+    assert result.balance == pytest.approx(balance_of(db, source))
+    assert cache_for(db).stats()["hits"] == hits + 1
+
+
+def test_balance_enquiry_checks_the_pin(db, parties):
+    (payer, _, _), _ = parties
+    assert UPIPaymentService(db).balance_enquiry(payer, "0000x").status == PaymentResult.AUTH_FAILED